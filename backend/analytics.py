@@ -0,0 +1,149 @@
+"""
+Sales time series for Smart Medicine Delivery Network
+Reads the sales_rollups table at hour or day grain (weeks are summed from
+days), fills empty buckets with zeros and downsamples to a target number
+of points for charting.
+"""
+
+from datetime import datetime, timezone
+
+from db import ALL_CATEGORIES, SALES_GRAINS
+
+WEEK_SECONDS = 7 * 86400
+# Unix time 0 was a Thursday; shifting by 3 days puts week buckets on Mondays.
+WEEK_OFFSET_SECONDS = 3 * 86400
+
+MAX_BUCKETS = 5000
+# 9999-12-31T23:59:59Z, the last second datetime can render.
+MAX_TIMESTAMP = 253402300799
+DEFAULT_RANGE_DAYS = 30
+
+
+class AnalyticsError(ValueError):
+    """Invalid time-series request parameters."""
+
+
+def parse_timestamp(value, name):
+    """Epoch seconds, 'YYYY-MM-DD' or ISO datetime (naive values are UTC) -> epoch seconds."""
+    if value is None or str(value).strip() == '':
+        return None
+    text = str(value).strip()
+    if text.lstrip('-').isdigit():
+        ts = int(text)
+    else:
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            raise AnalyticsError(f'{name} must be an epoch timestamp or ISO date')
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        ts = int(parsed.timestamp())
+    if not 0 <= ts <= MAX_TIMESTAMP:
+        raise AnalyticsError(f'{name} must be between 1970 and 9999')
+    return ts
+
+
+def choose_granularity(start_ts, end_ts):
+    span = end_ts - start_ts
+    if span <= 2 * 86400:
+        return 'hour'
+    if span <= 180 * 86400:
+        return 'day'
+    return 'week'
+
+
+def bucket_start(ts, granularity):
+    if granularity == 'week':
+        return (ts + WEEK_OFFSET_SECONDS) // WEEK_SECONDS * WEEK_SECONDS - WEEK_OFFSET_SECONDS
+    width = SALES_GRAINS[granularity]
+    return ts // width * width
+
+
+def bucket_width(granularity):
+    return WEEK_SECONDS if granularity == 'week' else SALES_GRAINS[granularity]
+
+
+def _fetch_buckets(cur, granularity, start_ts, end_ts, pharmacy_id, category):
+    grain = 'day' if granularity == 'week' else granularity
+    if granularity == 'week':
+        bucket_sql = f"((bucket_ts + {WEEK_OFFSET_SECONDS}) / {WEEK_SECONDS}) * {WEEK_SECONDS} - {WEEK_OFFSET_SECONDS}"
+    else:
+        bucket_sql = "bucket_ts"
+
+    # Plain integer range on the primary key / bucket index: no per-row date functions.
+    sql = f"""
+        SELECT {bucket_sql} AS bucket, SUM(orders_count) AS orders_count, SUM(revenue) AS revenue,
+               SUM(items_count) AS items_count
+        FROM sales_rollups
+        WHERE grain = ? AND category = ? AND bucket_ts >= ? AND bucket_ts < ?
+    """
+    params = [grain, category or ALL_CATEGORIES, bucket_start(start_ts, grain), end_ts]
+    if pharmacy_id is not None:
+        sql += " AND pharmacy_id = ?"
+        params.append(pharmacy_id)
+    sql += " GROUP BY bucket"
+    cur.execute(sql, params)
+    return {r['bucket']: (r['orders_count'], r['revenue'], r['items_count']) for r in cur.fetchall()}
+
+
+def _point(ts, orders_count, revenue, items_count):
+    return {
+        'ts': ts,
+        'start': datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(),
+        'orders': orders_count,
+        'revenue': round(revenue, 2),
+        'items': items_count,
+        'avg_basket': round(revenue / orders_count, 2) if orders_count else 0.0,
+    }
+
+
+def sales_timeseries(cur, start_ts, end_ts, granularity=None, pharmacy_id=None, category=None, max_points=None):
+    """
+    Revenue, order count, items and average basket per bucket over [start_ts, end_ts).
+    Every bucket in the range is present; with max_points, consecutive buckets
+    are merged so at most that many points are returned.
+    """
+    if end_ts <= start_ts:
+        raise AnalyticsError('end must be after start')
+    granularity = granularity or choose_granularity(start_ts, end_ts)
+    if granularity not in ('hour', 'day', 'week'):
+        raise AnalyticsError('granularity must be hour, day or week')
+
+    width = bucket_width(granularity)
+    first = bucket_start(start_ts, granularity)
+    bucket_count = (end_ts - first + width - 1) // width
+    if bucket_count > MAX_BUCKETS:
+        raise AnalyticsError(f'Range too large for {granularity} buckets (max {MAX_BUCKETS})')
+
+    found = _fetch_buckets(cur, granularity, start_ts, end_ts, pharmacy_id, category)
+    series = [(first + i * width,) + found.get(first + i * width, (0, 0.0, 0)) for i in range(bucket_count)]
+
+    step = 1
+    if max_points and len(series) > max_points:
+        step = -(-len(series) // max_points)
+        merged = []
+        for i in range(0, len(series), step):
+            chunk = series[i:i + step]
+            merged.append(
+                (chunk[0][0], sum(c[1] for c in chunk), sum(c[2] for c in chunk), sum(c[3] for c in chunk))
+            )
+        series = merged
+
+    points = [_point(*row) for row in series]
+    total_orders = sum(r[1] for r in series)
+    total_revenue = sum(r[2] for r in series)
+    return {
+        'granularity': granularity,
+        'bucket_seconds': width * step,
+        'start': start_ts,
+        'end': end_ts,
+        'pharmacy_id': pharmacy_id,
+        'category': category or None,
+        'totals': {
+            'orders': total_orders,
+            'revenue': round(total_revenue, 2),
+            'items': sum(r[3] for r in series),
+            'avg_basket': round(total_revenue / total_orders, 2) if total_orders else 0.0,
+        },
+        'points': points,
+    }
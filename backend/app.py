@@ -1,9 +1,18 @@
 import os
+import threading
 
-from flask import Flask, jsonify, send_from_directory, abort, make_response
+from flask import Flask, jsonify, abort
 from flask_cors import CORS
-from config import DevelopmentConfig
+from auth_tokens import init_token_auth
+from catalog_snapshot import SNAPSHOT_BROTLI_QUALITY, SNAPSHOT_PREFIX, init_catalog_snapshot
+from config import activate_config
 from db import init_db
+from http_client import dependency_report
+from jobs import job_counts, start_job_workers
+from rate_limit import init_rate_limiting, rate_limit_report
+from static_assets import StaticSite
+from stripe_webhooks import start_stripe_event_workers
+from support_answers import answer_report
 
 from routes.auth_routes import auth
 from routes.pharmacies_routes import pharmacies
@@ -13,68 +22,141 @@ from routes.seller_routes import seller
 from routes.delivery_routes import delivery
 from routes.admin_routes import admin
 from routes.support_routes import support
+from routes.media_routes import media
+import tasks  # noqa: F401  (registers job handlers)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIST_DIR = os.path.join(BASE_DIR, "..", "frontend", "dist")
 
-app = Flask(__name__, static_folder=FRONTEND_DIST_DIR, static_url_path="/")
-app.config.from_object(DevelopmentConfig)
-CORS(app)
-init_db()
-
-# Register blueprints with prefixes
-app.register_blueprint(auth, url_prefix='/auth')
-app.register_blueprint(pharmacies, url_prefix='/pharmacies')
-app.register_blueprint(medicines, url_prefix='/medicines')
-app.register_blueprint(orders, url_prefix='/orders')
-app.register_blueprint(seller, url_prefix='/seller')
-app.register_blueprint(delivery, url_prefix='/delivery')
-app.register_blueprint(admin, url_prefix='/admin')
-app.register_blueprint(support, url_prefix='/support')
-
-
-@app.route('/health')
-def health():
-    return jsonify({'status': 'ok', 'message': 'Backend Running'})
-
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve_frontend(path):
-    api_prefixes = ('auth', 'pharmacies', 'medicines', 'orders', 'seller', 'delivery', 'admin', 'support')
-    if path.split('/')[0] in api_prefixes:
-        abort(404)
-
-    index_file = os.path.join(FRONTEND_DIST_DIR, 'index.html')
-    if not os.path.exists(index_file):
-        return (
-            jsonify(
-                {
-                    'ok': False,
-                    'message': 'Frontend build not found. Build frontend first.',
-                    'required_file': index_file,
-                    'steps': [
-                        'cd frontend',
-                        'npm install',
-                        'npm run build',
-                    ],
-                }
-            ),
-            503,
-        )
-
-    if path and os.path.exists(os.path.join(app.static_folder, path)):
-        response = make_response(send_from_directory(app.static_folder, path))
-        # Fingerprinted asset files can be cached aggressively.
-        if path.startswith('assets/'):
-            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
-        return response
-
-    response = make_response(send_from_directory(app.static_folder, 'index.html'))
-    # Avoid stale HTML so latest CSS/JS chunk filenames are always fetched.
-    response.headers['Cache-Control'] = 'no-store'
-    return response
+_process_lock = threading.Lock()
+_process_pid = None
+_default_app = None
+_default_app_lock = threading.Lock()
+
+
+def start_process_resources():
+    """
+    Start this process's background workers (job queue, Stripe inbox) once.
+    Threads do not survive fork, so pre-fork servers call this in each worker
+    after forking (serve.py's post_fork); otherwise the first request does.
+    """
+    global _process_pid
+    pid = os.getpid()
+    if _process_pid == pid:
+        return
+    with _process_lock:
+        if _process_pid != pid:
+            start_stripe_event_workers()
+            start_job_workers()
+            _process_pid = pid
+
+
+def create_app(config_name=None):
+    """
+    Build the Flask app for 'development', 'production' or 'testing' (default:
+    APP_ENV, then 'development'). Safe to call in a pre-fork master: schema
+    setup and the in-memory frontend build happen here, once, and are shared
+    by forked workers; threads are only started per process by
+    start_process_resources().
+    """
+    config_class = activate_config(config_name)
+    # The frontend is served by serve_frontend from memory, not by Flask's static route (which would shadow it).
+    app = Flask(__name__, static_folder=None)
+    app.config.from_object(config_class)
+    CORS(app)
+    init_db()
+    init_rate_limiting(app)
+    init_token_auth(app)
+    app.before_request(start_process_resources)
+    static_site = StaticSite(
+        FRONTEND_DIST_DIR, generated_prefixes=(SNAPSHOT_PREFIX,), generated_brotli_quality=SNAPSHOT_BROTLI_QUALITY
+    )
+    init_catalog_snapshot(static_site)
+
+    # Register blueprints with prefixes
+    app.register_blueprint(auth, url_prefix='/auth')
+    app.register_blueprint(pharmacies, url_prefix='/pharmacies')
+    app.register_blueprint(medicines, url_prefix='/medicines')
+    app.register_blueprint(orders, url_prefix='/orders')
+    app.register_blueprint(seller, url_prefix='/seller')
+    app.register_blueprint(delivery, url_prefix='/delivery')
+    app.register_blueprint(admin, url_prefix='/admin')
+    app.register_blueprint(support, url_prefix='/support')
+    app.register_blueprint(media, url_prefix='/media')
+    _register_core_routes(app, static_site)
+    return app
+
+
+def _register_core_routes(app, static_site):
+    @app.route('/health')
+    def health():
+        return jsonify({'status': 'ok', 'message': 'Backend Running'})
+
+    @app.route('/health/upstreams')
+    def upstream_health():
+        return jsonify({'ok': True, 'dependencies': dependency_report()})
+
+    @app.route('/health/jobs')
+    def job_health():
+        return jsonify({'ok': True, 'jobs': job_counts()})
+
+    @app.route('/health/support-chat')
+    def support_chat_health():
+        return jsonify({'ok': True, 'answers': answer_report()})
+
+    @app.route('/health/rate-limits')
+    def rate_limit_health():
+        return jsonify({'ok': True, 'rate_limits': rate_limit_report()})
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve_frontend(path):
+        api_prefixes = ('auth', 'pharmacies', 'medicines', 'orders', 'seller', 'delivery', 'admin', 'support', 'media')
+        if path.split('/')[0] in api_prefixes:
+            abort(404)
+
+        if path:
+            response = static_site.response(path)
+            if response is not None:
+                return response
+            if static_site.is_generated(path):
+                # A missing data file is a 404, never the SPA shell (clients would parse HTML as data).
+                abort(404)
+
+        if not static_site.has_index:
+            return (
+                jsonify(
+                    {
+                        'ok': False,
+                        'message': 'Frontend build not found. Build frontend first.',
+                        'required_file': static_site.index_file,
+                        'steps': [
+                            'cd frontend',
+                            'npm install',
+                            'npm run build',
+                        ],
+                    }
+                ),
+                503,
+            )
+
+        # SPA fallback. index.html is sent with no-cache, so clients revalidate and pick up new chunk names.
+        return static_site.response('index.html')
+
+
+def __getattr__(name):
+    # `from app import app` (scripts, `flask --app app`) gets a default app built on first use,
+    # so importing this module has no side effects.
+    global _default_app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _default_app_lock:
+        if _default_app is None:
+            _default_app = create_app()
+    return _default_app
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=8000)
+    dev_app = create_app()
+    start_process_resources()
+    dev_app.run(debug=dev_app.config['DEBUG'], host='0.0.0.0', port=8000)
@@ -0,0 +1,214 @@
+"""
+Signed session tokens for Smart Medicine Delivery Network
+Access and refresh tokens are HMAC-SHA256 signed JSON claims, so requests are
+authenticated without a users lookup. Logged-out and used refresh tokens go
+in the shared revoked_tokens table until they expire; each process keeps an
+in-memory copy that is refreshed from the table at most once a second, so a
+logout reaches other worker processes within that interval.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify, request
+
+from config import DEFAULT_SECRET_KEY, Config
+from db import get_connection
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+_secret = None  # set from the app's config by init_token_auth()
+_revoked = {}  # jti -> exp, this process's copy of revoked_tokens
+_revoked_lock = threading.Lock()
+_last_revoked_id = 0
+_next_revocation_sync = 0.0
+REVOCATION_SYNC_SECONDS = 1.0
+REVOCATION_PRUNE_EVERY = 100
+
+
+def _reset_after_fork():
+    # A thread in the parent may have held the lock at fork time.
+    global _revoked_lock
+    _revoked_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class TokenError(ValueError):
+    """Raised for malformed, tampered, expired, revoked or wrong-type tokens."""
+
+
+class TokenSecretError(RuntimeError):
+    """Raised when tokens are used without a usable signing secret."""
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(body):
+    """Signature of the ASCII token body, as base64url bytes."""
+    if _secret is None:
+        raise TokenSecretError('Token signing is not configured')
+    return base64.urlsafe_b64encode(hmac.new(_secret, body, hashlib.sha256).digest()).rstrip(b'=')
+
+
+def create_token(user_id, token_type=ACCESS, ttl_seconds=None, **claims):
+    if ttl_seconds is None:
+        ttl_seconds = Config.ACCESS_TOKEN_TTL_SECONDS if token_type == ACCESS else Config.REFRESH_TOKEN_TTL_SECONDS
+    now = int(time.time())
+    payload = {'sub': user_id, 'typ': token_type, 'iat': now, 'exp': now + int(ttl_seconds), 'jti': secrets.token_hex(8)}
+    payload.update(claims)
+    body = _b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    return f"{body}.{_sign(body.encode('ascii')).decode('ascii')}"
+
+
+def issue_tokens(user_id, **claims):
+    """Fresh access + refresh pair, shaped for login/signup/refresh responses."""
+    return {
+        'access_token': create_token(user_id, ACCESS, **claims),
+        'refresh_token': create_token(user_id, REFRESH, **claims),
+        'token_type': 'Bearer',
+        'expires_in': Config.ACCESS_TOKEN_TTL_SECONDS,
+    }
+
+
+def verify_token(token, token_type=ACCESS):
+    """
+    Return the token's claims. Signature, expiry and revocation checks only;
+    the revocation list is read from memory and refreshed from the database
+    at most once per REVOCATION_SYNC_SECONDS.
+    """
+    try:
+        # Tokens are base64url text; anything else (non-ASCII, not a string) is simply invalid.
+        body, sep, signature = (token or '').encode('ascii').partition(b'.')
+    except (AttributeError, UnicodeError):
+        raise TokenError('Invalid token')
+    if not sep or not hmac.compare_digest(signature, _sign(body)):
+        raise TokenError('Invalid token')
+    try:
+        claims = json.loads(_b64decode(body.decode('ascii')))
+    except ValueError:
+        raise TokenError('Invalid token')
+    if not isinstance(claims, dict):
+        raise TokenError('Invalid token')
+    if claims.get('typ') != token_type:
+        raise TokenError('Wrong token type')
+    now = time.time()
+    if claims.get('exp', 0) <= now:
+        raise TokenError('Token expired')
+    if now >= _next_revocation_sync:
+        _sync_revocations(now)
+    if claims.get('jti') in _revoked:
+        raise TokenError('Token revoked')
+    return claims
+
+
+def _sync_revocations(now):
+    """Copy tokens revoked by any process since the last sync into _revoked."""
+    global _last_revoked_id, _next_revocation_sync
+    if not _revoked_lock.acquire(blocking=False):
+        return  # another thread is syncing; this request sees the list as it is
+    try:
+        if now < _next_revocation_sync:
+            return
+        conn = get_connection(readonly=True)
+        try:
+            rows = conn.execute(
+                "SELECT id, jti, expires_at FROM revoked_tokens WHERE id > ? ORDER BY id", (_last_revoked_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            _revoked[row['jti']] = row['expires_at']
+            _last_revoked_id = row['id']
+        _next_revocation_sync = now + REVOCATION_SYNC_SECONDS
+    finally:
+        _revoked_lock.release()
+
+
+def revoke_token(claims):
+    """
+    Reject this token until it would have expired anyway. Returns False when
+    it was already revoked (by any process), so single-use tokens can be
+    claimed atomically.
+    """
+    now = time.time()
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)", (claims['jti'], claims['exp'])
+        )
+        newly_revoked = cur.rowcount == 1
+        if newly_revoked and cur.lastrowid % REVOCATION_PRUNE_EVERY == 0:
+            cur.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+        conn.commit()
+    finally:
+        conn.close()
+    with _revoked_lock:
+        _revoked[claims['jti']] = claims['exp']
+        if len(_revoked) > 1000:
+            for jti in [j for j, exp in _revoked.items() if exp <= now]:
+                del _revoked[jti]
+    return newly_revoked
+
+
+def init_token_auth(app):
+    """
+    Verify `Authorization: Bearer <access token>` on every request and expose
+    g.user_id / g.token_claims. Requests without a token pass through with
+    g.user_id = None; a present but invalid token is rejected with 401.
+
+    The signing secret is AUTH_TOKEN_SECRET, else SECRET_KEY, read from the
+    app's config. Outside debug/testing the public default SECRET_KEY is not
+    accepted: tokens are neither issued nor verified (503) until one is set.
+    """
+    global _secret
+    secret = app.config.get('AUTH_TOKEN_SECRET') or app.config.get('SECRET_KEY') or ''
+    if secret and (secret != DEFAULT_SECRET_KEY or app.debug or app.testing):
+        _secret = secret.encode('utf-8')
+    else:
+        _secret = None
+        print("[AUTH] no AUTH_TOKEN_SECRET or SECRET_KEY set: token login is disabled")
+
+    @app.errorhandler(TokenSecretError)
+    def _token_secret_missing(err):
+        return jsonify({'ok': False, 'message': str(err)}), 503
+
+    @app.before_request
+    def _load_token_identity():
+        g.user_id = None
+        g.token_claims = None
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return None
+        try:
+            claims = verify_token(header[7:].strip())
+        except TokenError as err:
+            return jsonify({'ok': False, 'message': str(err)}), 401
+        g.user_id = claims['sub']
+        g.token_claims = claims
+        return None
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.get('user_id') is None:
+            return jsonify({'ok': False, 'message': 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
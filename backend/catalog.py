@@ -0,0 +1,181 @@
+"""
+Catalog versioning for Smart Medicine Delivery Network
+Triggers bump catalog_version whenever catalog-facing medicine columns change.
+Derived data (chat prompt blocks, search indexes) is built once per version
+and shared across requests and threads. Per-row row_version values and
+tombstones back the incremental change feed read by read_catalog_changes().
+"""
+
+import threading
+import time
+
+from config import Config
+from db import CHANGE_FEED_TABLES, get_connection
+
+SUPPORT_SYSTEM_PROMPT = (
+    'You are MediHub AI Support for an online medicine marketplace. '
+    'Give concise and practical answers in Hinglish. '
+    'Use available catalog context for product recommendations and mention category names when useful. '
+    'Do not provide medical diagnosis. Suggest consulting a doctor for severe symptoms.'
+)
+SUPPORT_SYSTEM_MESSAGE = {'role': 'system', 'content': SUPPORT_SYSTEM_PROMPT}
+
+_version_lock = threading.Lock()
+_cached_version = None
+_version_checked_at = 0.0
+
+_derived_lock = threading.Lock()
+_derived = {}  # key -> (version, built_at, value)
+
+
+def read_catalog_version(cur):
+    cur.execute("SELECT version FROM catalog_version WHERE id = 1")
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def get_catalog_version():
+    """
+    Current catalog version. The database is consulted at most once every
+    CATALOG_VERSION_CHECK_SECONDS; in between this is an in-memory read.
+    """
+    global _cached_version, _version_checked_at
+    now = time.monotonic()
+    if _cached_version is not None and now - _version_checked_at < Config.CATALOG_VERSION_CHECK_SECONDS:
+        return _cached_version
+
+    with _version_lock:
+        if _cached_version is None or time.monotonic() - _version_checked_at >= Config.CATALOG_VERSION_CHECK_SECONDS:
+            conn = get_connection()
+            _cached_version = read_catalog_version(conn.cursor())
+            conn.close()
+            _version_checked_at = time.monotonic()
+        return _cached_version
+
+
+def refresh_catalog_version():
+    """Force the next get_catalog_version() to re-read the database (call after catalog writes)."""
+    global _version_checked_at
+    with _version_lock:
+        _version_checked_at = 0.0
+
+
+def cached_for_catalog(key, builder, max_age=None):
+    """
+    Return builder() cached under `key` until the catalog version changes or the
+    value is older than max_age seconds (defaults to CATALOG_SNAPSHOT_MAX_AGE_SECONDS).
+    """
+    version = get_catalog_version()
+    max_age = Config.CATALOG_SNAPSHOT_MAX_AGE_SECONDS if max_age is None else max_age
+    entry = _derived.get(key)
+    if entry and entry[0] == version and time.monotonic() - entry[1] < max_age:
+        return entry[2]
+
+    with _derived_lock:
+        entry = _derived.get(key)
+        if entry and entry[0] == version and time.monotonic() - entry[1] < max_age:
+            return entry[2]
+        value = builder()
+        _derived[key] = (version, time.monotonic(), value)
+        return value
+
+
+def _build_support_context(limit):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT name, category, price
+        FROM medicines
+        ORDER BY stock_qty DESC, name ASC
+        LIMIT ?
+        """,
+        (limit,),
+    )
+    rows = cur.fetchall()
+    conn.close()
+
+    lines = []
+    for r in rows:
+        name = (r['name'] or '').strip()
+        category = (r['category'] or 'General').strip()
+        price = float(r['price'] or 0)
+        lines.append(f"- {name} | category: {category} | price: Rs {price:.2f}")
+    catalog_text = "\n".join(lines)
+
+    # Prebuilt leading messages; callers copy the tuple into a fresh list per request.
+    return (
+        SUPPORT_SYSTEM_MESSAGE,
+        {'role': 'system', 'content': f'Catalog snapshot:\n{catalog_text}'},
+    )
+
+
+def get_support_prompt_prefix(limit=60):
+    """System + catalog snapshot messages for /support/chat, shared per catalog version."""
+    return cached_for_catalog(('support_prompt', limit), lambda: _build_support_context(limit))
+
+
+def read_catalog_changes(cur, since, limit):
+    """
+    Medicines, pharmacies and tombstones with row_version > since, oldest
+    first, at most `limit` in total. All reads share one transaction so the
+    page and the returned version are consistent. Clients store next_since
+    and ask again while has_more is true.
+    """
+    cur.execute("BEGIN")
+    try:
+        cur.execute("SELECT version FROM row_version_seq WHERE id = 1")
+        row = cur.fetchone()
+        version = int(row['version']) if row else 0
+        if since > version:
+            # The client's copy came from a different database (restore or reset): start over.
+            return {'version': version, 'reset': True}
+
+        medicine_columns = ', '.join(f'm.{c}' for c in CHANGE_FEED_TABLES['medicines'])
+        cur.execute(
+            f"""
+            SELECT m.id, {medicine_columns}, m.row_version, p.name AS pharmacy_name
+            FROM medicines m
+            LEFT JOIN pharmacies p ON p.id = m.pharmacy_id
+            WHERE m.row_version > ?
+            ORDER BY m.row_version
+            LIMIT ?
+            """,
+            (since, limit + 1),
+        )
+        changes = [('medicines', r['row_version'], r) for r in cur.fetchall()]
+        cur.execute(
+            f"""
+            SELECT id, {', '.join(CHANGE_FEED_TABLES['pharmacies'])}, row_version
+            FROM pharmacies WHERE row_version > ? ORDER BY row_version LIMIT ?
+            """,
+            (since, limit + 1),
+        )
+        changes += [('pharmacies', r['row_version'], r) for r in cur.fetchall()]
+        cur.execute(
+            """
+            SELECT entity, entity_id, row_version FROM catalog_tombstones
+            WHERE row_version > ? ORDER BY row_version LIMIT ?
+            """,
+            (since, limit + 1),
+        )
+        changes += [('deleted', r['row_version'], r) for r in cur.fetchall()]
+    finally:
+        cur.execute("COMMIT")
+
+    changes.sort(key=lambda change: change[1])
+    has_more = len(changes) > limit
+    page = changes[:limit]
+    result = {
+        'version': version,
+        'reset': False,
+        'has_more': has_more,
+        'next_since': page[-1][1] if has_more else version,
+        'medicines': [r for kind, _, r in page if kind == 'medicines'],
+        'pharmacies': [r for kind, _, r in page if kind == 'pharmacies'],
+        'deleted': {table: [] for table in CHANGE_FEED_TABLES},
+    }
+    for kind, _, r in page:
+        if kind == 'deleted':
+            result['deleted'].setdefault(r['entity'], []).append(r['entity_id'])
+    return result
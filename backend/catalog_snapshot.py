@@ -0,0 +1,173 @@
+"""
+Static catalog snapshot for Smart Medicine Delivery Network
+Popular medicines and each category's medicines are written as compact,
+content-hashed JSON files under the frontend build (assets/catalog/) once per
+catalog version and served from memory by the static site with immutable
+caching. First paint fetches the tiny manifest from /medicines/snapshot and
+then only these files, so the common page load does not query SQLite.
+
+Worker processes build their manifests independently but write to the same
+directory, and the static site loads files it has not seen from disk, so any
+worker can serve a file named in another worker's manifest. Every build
+touches the files it names; files no build has named for two max ages are
+swept from disk and memory.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from catalog import cached_for_catalog
+from config import Config
+from db import VELOCITY_WINDOWS, get_connection
+
+SNAPSHOT_PREFIX = 'assets/catalog/'
+# Built inside a request, so trade a little size for much faster compression than the build-time default.
+SNAPSHOT_BROTLI_QUALITY = 5
+
+_site = None
+_sweep_lock = threading.Lock()
+
+
+def init_catalog_snapshot(site):
+    """
+    Publish snapshot files into `site` (a static_assets.StaticSite created with
+    SNAPSHOT_PREFIX among its generated_prefixes). Files left by earlier runs are
+    removed once they are older than any live process could still be serving.
+    """
+    global _site
+    _site = site
+    _sweep(keep=())
+
+
+def _sweep(keep):
+    """
+    Remove snapshot files not named by any build for two max ages. Each worker
+    rebuilds at least once per max age, touching what its manifest names, so a
+    file still in some live manifest is never this old.
+    """
+    snapshot_dir = os.path.join(_site.root, SNAPSHOT_PREFIX)
+    cutoff = time.time() - 2 * Config.CATALOG_SNAPSHOT_MAX_AGE_SECONDS
+    with _sweep_lock:
+        on_disk = set()
+        if os.path.isdir(snapshot_dir):
+            for name in os.listdir(snapshot_dir):
+                rel_path = f"{SNAPSHOT_PREFIX}{name}"
+                path = os.path.join(snapshot_dir, name)
+                try:
+                    if rel_path not in keep and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        continue
+                except OSError:
+                    continue
+                on_disk.add(rel_path)
+        # Also forget files another worker swept.
+        for rel_path in _site.generated_paths():
+            if rel_path.startswith(SNAPSHOT_PREFIX) and rel_path not in on_disk and rel_path not in keep:
+                _site.discard(rel_path)
+
+
+def _slug(name, used):
+    slug = re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-') or 'uncategorized'
+    candidate, n = slug, 2
+    while candidate in used:
+        candidate, n = f"{slug}-{n}", n + 1
+    used.add(candidate)
+    return candidate
+
+
+def _read_catalog():
+    since = (datetime.now(timezone.utc).date() - timedelta(days=VELOCITY_WINDOWS[-1] - 1)).isoformat()
+    conn = get_connection(readonly=True)
+    try:
+        rows = conn.execute(
+            """
+            SELECT m.id, m.category, m.name, m.use_for, m.strength, m.unit, m.price, m.mrp, m.offer_text,
+                   m.image_url, m.available, m.stock_qty, m.pharmacy_id, p.name AS pharmacy_name,
+                   COALESCE(s.units, 0) AS recent_units
+            FROM medicines m
+            JOIN pharmacies p ON p.id = m.pharmacy_id
+            LEFT JOIN (
+                SELECT medicine_id, SUM(units) AS units FROM medicine_daily_sales WHERE day >= ? GROUP BY medicine_id
+            ) s ON s.medicine_id = m.id
+            WHERE p.is_approved = 1
+            ORDER BY m.name ASC, m.id ASC
+            """,
+            (since,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return rows
+
+
+def _encode(payload):
+    data = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return data, hashlib.sha256(data).hexdigest()[:16]
+
+
+def _write_file(rel_path, data):
+    path = os.path.join(_site.root, rel_path)
+    if os.path.exists(path):
+        try:
+            # Mark it as still referenced for _sweep().
+            os.utime(path)
+            return
+        except OSError:
+            pass  # swept in the meantime: write it again
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _publish(files):
+    """Write (or touch) and serve `files`, then sweep files no recent build has named."""
+    for rel_path, data in files.items():
+        _write_file(rel_path, data)
+        # Names are content hashes: a file already served is already correct.
+        if _site.get(rel_path) is None:
+            _site.publish(rel_path, SNAPSHOT_BROTLI_QUALITY)
+    _sweep(keep=set(files))
+
+
+def _build_snapshot():
+    from routes.medicines_routes import serialize_medicine_row
+
+    rows = _read_catalog()
+    by_category = {}
+    for r in rows:
+        by_category.setdefault((r['category'] or '').strip(), []).append(serialize_medicine_row(r))
+    popular_rows = sorted(rows, key=lambda r: -r['recent_units'])[:Config.CATALOG_SNAPSHOT_POPULAR]
+
+    files = {}
+    data, digest = _encode({'items': [serialize_medicine_row(r) for r in popular_rows]})
+    popular_path = f"{SNAPSHOT_PREFIX}popular.{digest}.json"
+    files[popular_path] = data
+
+    categories, used = [], set()
+    for name in sorted(by_category):
+        data, digest = _encode({'category': name, 'items': by_category[name]})
+        rel_path = f"{SNAPSHOT_PREFIX}category-{_slug(name, used)}.{digest}.json"
+        files[rel_path] = data
+        categories.append({'name': name, 'count': len(by_category[name]), 'url': f"/{rel_path}"})
+
+    _publish(files)
+    snapshot_hash = hashlib.sha256('\n'.join(sorted(files)).encode('utf-8')).hexdigest()[:16]
+    print(f"[CATALOG] snapshot {snapshot_hash}: {len(rows)} medicines, {len(categories)} categories")
+    return {
+        'hash': snapshot_hash,
+        'popular': f"/{popular_path}",
+        'categories': categories,
+    }
+
+
+def get_catalog_snapshot():
+    """Manifest of the current snapshot files, rebuilt when the catalog version changes."""
+    if _site is None:
+        return None
+    return cached_for_catalog('static_snapshot', _build_snapshot)
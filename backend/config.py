@@ -4,10 +4,28 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Public placeholder: fine for local development, never for signing real tokens.
+DEFAULT_SECRET_KEY = 'dev-secret-key-change-in-production'
+
 
 class Config:
     """Base configuration"""
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    SECRET_KEY = os.environ.get('SECRET_KEY') or DEFAULT_SECRET_KEY
+
+    # Signed session tokens (falls back to SECRET_KEY when no dedicated secret is set)
+    AUTH_TOKEN_SECRET = os.environ.get('AUTH_TOKEN_SECRET', '')
+    ACCESS_TOKEN_TTL_SECONDS = int(os.environ.get('ACCESS_TOKEN_TTL_SECONDS', '900'))
+    REFRESH_TOKEN_TTL_SECONDS = int(os.environ.get('REFRESH_TOKEN_TTL_SECONDS', str(30 * 24 * 3600)))
+
+    # Password hashing (tune cost with scripts/tune_password_hashing.py); hashing runs on
+    # PASSWORD_HASH_WORKERS threads with at most PASSWORD_HASH_MAX_QUEUE requests waiting
+    PASSWORD_HASH_SCHEME = os.environ.get('PASSWORD_HASH_SCHEME', 'scrypt')
+    PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', '16384'))
+    PASSWORD_SCRYPT_R = int(os.environ.get('PASSWORD_SCRYPT_R', '8'))
+    PASSWORD_SCRYPT_P = int(os.environ.get('PASSWORD_SCRYPT_P', '1'))
+    PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', '600000'))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '16'))
     DEBUG = os.environ.get('DEBUG', 'False') == 'True'
     
     # Maps API
@@ -15,6 +33,7 @@ class Config:
     MAPBOX_API_KEY = os.environ.get('MAPBOX_API_KEY', '')
     
     # OTP / SMS
+    OTP_TTL_SECONDS = int(os.environ.get('OTP_TTL_SECONDS', '600'))
     TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', '')
     TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '')
     TWILIO_PHONE_NUMBER = os.environ.get('TWILIO_PHONE_NUMBER', '')
@@ -24,11 +43,71 @@ class Config:
     RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', '')
     STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY', '')
     STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY', '')
+    STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
+    STRIPE_WEBHOOK_TOLERANCE_SECONDS = int(os.environ.get('STRIPE_WEBHOOK_TOLERANCE_SECONDS', '300'))
+    STRIPE_EVENT_WORKERS = int(os.environ.get('STRIPE_EVENT_WORKERS', '1'))
+    STRIPE_EVENT_POLL_SECONDS = float(os.environ.get('STRIPE_EVENT_POLL_SECONDS', '5'))
+    STRIPE_EVENT_LEASE_SECONDS = int(os.environ.get('STRIPE_EVENT_LEASE_SECONDS', '60'))
+    STRIPE_EVENT_MAX_ATTEMPTS = int(os.environ.get('STRIPE_EVENT_MAX_ATTEMPTS', '5'))
+    STRIPE_EVENT_RETRY_BASE_SECONDS = float(os.environ.get('STRIPE_EVENT_RETRY_BASE_SECONDS', '5'))
+    STRIPE_EVENT_RETRY_MAX_SECONDS = float(os.environ.get('STRIPE_EVENT_RETRY_MAX_SECONDS', '300'))
 
     # AI / LLM
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
     GROQ_MODEL = os.environ.get('GROQ_MODEL', 'llama-3.1-8b-instant')
-    
+    GROQ_TIMEOUT_SECONDS = float(os.environ.get('GROQ_TIMEOUT_SECONDS', '8'))
+    GROQ_API_URL = os.environ.get('GROQ_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+    # 'retrieval' sends only BM25-selected catalog rows; 'snapshot' sends the static top-60 list
+    SUPPORT_CONTEXT_MODE = os.environ.get('SUPPORT_CONTEXT_MODE', 'retrieval')
+    SUPPORT_RETRIEVAL_K = int(os.environ.get('SUPPORT_RETRIEVAL_K', '12'))
+    SUPPORT_PROMPT_TOKEN_BUDGET = int(os.environ.get('SUPPORT_PROMPT_TOKEN_BUDGET', '400'))
+    SUPPORT_ANSWER_CACHE_SIZE = int(os.environ.get('SUPPORT_ANSWER_CACHE_SIZE', '2000'))
+    SUPPORT_ANSWER_CACHE_TTL_SECONDS = float(os.environ.get('SUPPORT_ANSWER_CACHE_TTL_SECONDS', '1800'))
+    # Intent router + answer cache in front of Groq; benchmarks of the upstream path turn it off
+    SUPPORT_LOCAL_ANSWERS = os.environ.get('SUPPORT_LOCAL_ANSWERS', 'True') == 'True'
+
+    # Outbound HTTP (shared sessions, retries, circuit breakers)
+    MAPS_TIMEOUT_SECONDS = float(os.environ.get('MAPS_TIMEOUT_SECONDS', '3'))
+    UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', '10'))
+    UPSTREAM_MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', '2'))
+    UPSTREAM_BACKOFF_BASE_SECONDS = float(os.environ.get('UPSTREAM_BACKOFF_BASE_SECONDS', '0.2'))
+    UPSTREAM_BACKOFF_MAX_SECONDS = float(os.environ.get('UPSTREAM_BACKOFF_MAX_SECONDS', '2'))
+    UPSTREAM_BREAKER_FAILURES = int(os.environ.get('UPSTREAM_BREAKER_FAILURES', '5'))
+    UPSTREAM_BREAKER_RESET_SECONDS = float(os.environ.get('UPSTREAM_BREAKER_RESET_SECONDS', '30'))
+
+    # Background jobs
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+    JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '2'))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '60'))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+    JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', '5'))
+    JOB_RETRY_MAX_SECONDS = float(os.environ.get('JOB_RETRY_MAX_SECONDS', '600'))
+
+    # Catalog caches (chat prompt snapshot and other per-catalog-version data)
+    CATALOG_VERSION_CHECK_SECONDS = float(os.environ.get('CATALOG_VERSION_CHECK_SECONDS', '5'))
+    CATALOG_SNAPSHOT_MAX_AGE_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_MAX_AGE_SECONDS', '600'))
+    CATALOG_CHANGES_MAX_LIMIT = int(os.environ.get('CATALOG_CHANGES_MAX_LIMIT', '5000'))
+    CATALOG_SNAPSHOT_POPULAR = int(os.environ.get('CATALOG_SNAPSHOT_POPULAR', '24'))
+
+    # Rate limiting: per-IP limits per blueprint ('support') or endpoint ('auth.login'),
+    # written as requests/seconds; 'sqlite' store shares buckets across processes
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True') == 'True'
+    RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'memory')
+    RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED', 'False') == 'True'
+    RATE_LIMITS = os.environ.get(
+        'RATE_LIMITS',
+        'support=30/60,auth=30/60,medicines=240/60,auth.login_phone_legacy=5/300',
+    )
+    RATE_LIMIT_LOGIN_PER_EMAIL = os.environ.get('RATE_LIMIT_LOGIN_PER_EMAIL', '10/300')
+    RATE_LIMIT_OTP_PER_PHONE = os.environ.get('RATE_LIMIT_OTP_PER_PHONE', '3/600')
+    SUPPORT_CHAT_MAX_IN_FLIGHT = int(os.environ.get('SUPPORT_CHAT_MAX_IN_FLIGHT', '8'))
+
+    # Inventory insights
+    INVENTORY_LOW_STOCK_DAYS = float(os.environ.get('INVENTORY_LOW_STOCK_DAYS', '7'))
+    INVENTORY_TOP_SELLERS = int(os.environ.get('INVENTORY_TOP_SELLERS', '10'))
+    INVENTORY_PATCH_MAX_ROWS = int(os.environ.get('INVENTORY_PATCH_MAX_ROWS', '50000'))
+    INVENTORY_PATCH_CHUNK_ROWS = int(os.environ.get('INVENTORY_PATCH_CHUNK_ROWS', '2000'))
+
     # Database
     DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///dev.db')
     
@@ -46,6 +125,36 @@ class Config:
     FREE_DELIVERY_RADIUS_KM = float(os.environ.get('FREE_DELIVERY_RADIUS_KM', '2.5'))
     EXPRESS_DELIVERY_MINUTES = int(os.environ.get('EXPRESS_DELIVERY_MINUTES', '20'))
     EXPRESS_DELIVERY_CHARGE = float(os.environ.get('EXPRESS_DELIVERY_CHARGE', '30'))
+    STANDARD_DELIVERY_MINUTES = int(os.environ.get('STANDARD_DELIVERY_MINUTES', '45'))
+    DELIVERY_MINUTES_PER_KM = float(os.environ.get('DELIVERY_MINUTES_PER_KM', '4'))
+
+    # Pricing engine: how long compiled pricing_rules stay cached in memory
+    PRICING_RULES_TTL_SECONDS = int(os.environ.get('PRICING_RULES_TTL_SECONDS', '300'))
+
+    # Image proxy (/media): upstream medicine images cached on local disk
+    MEDIA_PROXY_IMAGES = os.environ.get('MEDIA_PROXY_IMAGES', 'True') == 'True'
+    MEDIA_CACHE_DIR = os.environ.get('MEDIA_CACHE_DIR', 'media_cache')
+    MEDIA_MAX_BYTES = int(os.environ.get('MEDIA_MAX_BYTES', str(5 * 1024 * 1024)))
+    MEDIA_FETCH_TIMEOUT_SECONDS = float(os.environ.get('MEDIA_FETCH_TIMEOUT_SECONDS', '8'))
+    MEDIA_FAILURE_TTL_SECONDS = int(os.environ.get('MEDIA_FAILURE_TTL_SECONDS', '300'))
+    # Off by default: image URLs are seller-supplied, so the proxy must not reach internal hosts
+    MEDIA_ALLOW_PRIVATE_HOSTS = os.environ.get('MEDIA_ALLOW_PRIVATE_HOSTS', 'False') == 'True'
+
+    # Frontend build served from memory with pre-compressed variants
+    STATIC_COMPRESS_MIN_BYTES = int(os.environ.get('STATIC_COMPRESS_MIN_BYTES', '1024'))
+    STATIC_BROTLI_QUALITY = int(os.environ.get('STATIC_BROTLI_QUALITY', '11'))
+    STATIC_RECHECK_SECONDS = float(os.environ.get('STATIC_RECHECK_SECONDS', '5'))
+
+    # Production server (serve.py): pre-fork gunicorn master, threaded workers recycled
+    # after SERVER_MAX_REQUESTS (+ random jitter) requests; SERVER_WORKERS=0 means one per CPU
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:8000')
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', '0'))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', '8'))
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', '5000'))
+    SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', '500'))
+    SERVER_TIMEOUT_SECONDS = int(os.environ.get('SERVER_TIMEOUT_SECONDS', '60'))
+    SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT_SECONDS', '30'))
+    SERVER_KEEPALIVE_SECONDS = int(os.environ.get('SERVER_KEEPALIVE_SECONDS', '5'))
 
 
 class DevelopmentConfig(Config):
@@ -65,3 +174,35 @@ class TestingConfig(Config):
     USE_MOCK_OTP = True
     USE_MOCK_PAYMENT = True
     USE_MOCK_MAPS = True
+
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+# Config's own settings, so activate_config() can undo an earlier selection.
+_base_settings = {key: value for key, value in vars(Config).items() if key.isupper()}
+
+
+def activate_config(name=None):
+    """
+    Select the Development/Production/Testing config by name (default: APP_ENV,
+    then 'development'). Modules read settings from Config directly, so Config
+    is reset to its own settings and the selected class's overrides are copied
+    onto it; selecting another config later leaves nothing of the first behind.
+    """
+    name = (name or os.environ.get('APP_ENV') or 'development').lower()
+    if name not in config_by_name:
+        raise ValueError(f"Unknown config '{name}'; expected one of: {', '.join(config_by_name)}")
+    config_class = config_by_name[name]
+    for key in [key for key in vars(Config) if key.isupper() and key not in _base_settings]:
+        delattr(Config, key)
+    for key, value in _base_settings.items():
+        setattr(Config, key, value)
+    for key, value in vars(config_class).items():
+        if key.isupper():
+            setattr(Config, key, value)
+    return config_class
@@ -243,6 +243,19 @@ CURATED_DISEASE_MEDICINES = {
     ],
 }
 
+RULE_QUANTITY_DISCOUNT = "quantity_discount"
+RULE_DISTANCE_SURCHARGE = "distance_surcharge"
+RULE_EXPRESS_FEE = "express_fee"
+
+# Seed for an empty pricing_rules table (threshold, amount); mirrors the original hard-coded checkout values.
+DEFAULT_PRICING_RULES = [
+    (RULE_QUANTITY_DISCOUNT, 3, 5),
+    (RULE_QUANTITY_DISCOUNT, 5, 10),
+    (RULE_QUANTITY_DISCOUNT, 10, 15),
+    (RULE_DISTANCE_SURCHARGE, Config.FREE_DELIVERY_RADIUS_KM, 30),
+    (RULE_EXPRESS_FEE, 0, Config.EXPRESS_DELIVERY_CHARGE),
+]
+
 
 def _resolve_db_path():
     url = Config.DATABASE_URL or "sqlite:///dev.db"
@@ -257,9 +270,429 @@ def _resolve_db_path():
     return os.path.join(base_dir, raw_path)
 
 
-def get_connection():
+# Order statuses counted as "new" work for a pharmacy.
+OPEN_ORDER_STATUSES = ('pending', 'preparing')
+
+_STATS_COLUMNS = "orders_count, revenue, delivered_revenue, open_orders, items_count"
+_STATS_ACCUMULATE = ", ".join(f"{c} = {c} + excluded.{c}" for c in _STATS_COLUMNS.split(", "))
+
+
+def _order_stats_upserts(row, sign):
+    """SQL adding (sign=1) or removing (sign=-1) one orders row's contribution to both rollup tables."""
+    open_list = ", ".join(f"'{s}'" for s in OPEN_ORDER_STATUSES)
+    values = (
+        f"{sign}, {sign} * {row}.total_amount, "
+        f"CASE WHEN {row}.status = 'delivered' THEN {sign} * {row}.total_amount ELSE 0 END, "
+        f"CASE WHEN {row}.status IN ({open_list}) THEN {sign} ELSE 0 END, "
+        f"{sign} * (SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE order_id = {row}.id)"
+    )
+    return f"""
+            INSERT INTO pharmacy_daily_stats (pharmacy_id, day, {_STATS_COLUMNS})
+            VALUES (COALESCE({row}.pharmacy_id, 0), DATE({row}.created_at), {values})
+            ON CONFLICT(pharmacy_id, day) DO UPDATE SET {_STATS_ACCUMULATE};
+            INSERT INTO pharmacy_order_totals (pharmacy_id, {_STATS_COLUMNS})
+            VALUES (COALESCE({row}.pharmacy_id, 0), {values})
+            ON CONFLICT(pharmacy_id) DO UPDATE SET {_STATS_ACCUMULATE};"""
+
+
+def _order_item_upserts(row, sign):
+    return f"""
+            INSERT INTO pharmacy_daily_stats (pharmacy_id, day, {_STATS_COLUMNS})
+            SELECT COALESCE(o.pharmacy_id, 0), DATE(o.created_at), 0, 0, 0, 0, {sign} * {row}.quantity
+            FROM orders o WHERE o.id = {row}.order_id
+            ON CONFLICT(pharmacy_id, day) DO UPDATE SET {_STATS_ACCUMULATE};
+            INSERT INTO pharmacy_order_totals (pharmacy_id, {_STATS_COLUMNS})
+            SELECT COALESCE(o.pharmacy_id, 0), 0, 0, 0, 0, {sign} * {row}.quantity
+            FROM orders o WHERE o.id = {row}.order_id
+            ON CONFLICT(pharmacy_id) DO UPDATE SET {_STATS_ACCUMULATE};"""
+
+
+def _order_stats_triggers():
+    """Triggers keeping the rollups in step with orders/order_items inside the writing transaction."""
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS trg_order_stats_insert AFTER INSERT ON orders
+        BEGIN{_order_stats_upserts('NEW', 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_order_stats_update
+        AFTER UPDATE OF pharmacy_id, status, total_amount, created_at ON orders
+        WHEN OLD.pharmacy_id IS NOT NEW.pharmacy_id OR OLD.status IS NOT NEW.status
+            OR OLD.total_amount IS NOT NEW.total_amount OR OLD.created_at IS NOT NEW.created_at
+        BEGIN{_order_stats_upserts('OLD', -1)}{_order_stats_upserts('NEW', 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_order_stats_delete AFTER DELETE ON orders
+        BEGIN{_order_stats_upserts('OLD', -1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_order_item_stats_insert AFTER INSERT ON order_items
+        BEGIN{_order_item_upserts('NEW', 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_order_item_stats_delete AFTER DELETE ON order_items
+        BEGIN{_order_item_upserts('OLD', -1)}
+        END;
+        """
+
+
+def _medicine_count_triggers():
+    """Keep pharmacies.medicines_count current as medicines are added, moved or removed."""
+    return """
+        CREATE TRIGGER IF NOT EXISTS trg_medicines_count_insert AFTER INSERT ON medicines
+        BEGIN
+            UPDATE pharmacies SET medicines_count = COALESCE(medicines_count, 0) + 1 WHERE id = NEW.pharmacy_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_medicines_count_delete AFTER DELETE ON medicines
+        BEGIN
+            UPDATE pharmacies SET medicines_count = COALESCE(medicines_count, 0) - 1 WHERE id = OLD.pharmacy_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_medicines_count_move AFTER UPDATE OF pharmacy_id ON medicines
+        WHEN OLD.pharmacy_id IS NOT NEW.pharmacy_id
+        BEGIN
+            UPDATE pharmacies SET medicines_count = COALESCE(medicines_count, 0) - 1 WHERE id = OLD.pharmacy_id;
+            UPDATE pharmacies SET medicines_count = COALESCE(medicines_count, 0) + 1 WHERE id = NEW.pharmacy_id;
+        END;
+        """
+
+
+def rebuild_order_stats(cur):
+    """Recompute both rollup tables from orders/order_items (backfill or repair)."""
+    open_list = ", ".join(f"'{s}'" for s in OPEN_ORDER_STATUSES)
+    cur.execute("DELETE FROM pharmacy_daily_stats")
+    cur.execute("DELETE FROM pharmacy_order_totals")
+    cur.execute(
+        f"""
+        INSERT INTO pharmacy_daily_stats (pharmacy_id, day, {_STATS_COLUMNS})
+        SELECT
+            COALESCE(o.pharmacy_id, 0),
+            DATE(o.created_at),
+            COUNT(*),
+            COALESCE(SUM(o.total_amount), 0),
+            COALESCE(SUM(CASE WHEN o.status = 'delivered' THEN o.total_amount ELSE 0 END), 0),
+            SUM(CASE WHEN o.status IN ({open_list}) THEN 1 ELSE 0 END),
+            COALESCE(SUM(i.quantity), 0)
+        FROM orders o
+        LEFT JOIN (
+            SELECT order_id, SUM(quantity) AS quantity FROM order_items GROUP BY order_id
+        ) i ON i.order_id = o.id
+        GROUP BY COALESCE(o.pharmacy_id, 0), DATE(o.created_at)
+        """
+    )
+    cur.execute(
+        f"""
+        INSERT INTO pharmacy_order_totals (pharmacy_id, {_STATS_COLUMNS})
+        SELECT pharmacy_id, SUM(orders_count), SUM(revenue), SUM(delivered_revenue), SUM(open_orders), SUM(items_count)
+        FROM pharmacy_daily_stats
+        GROUP BY pharmacy_id
+        """
+    )
+
+
+# Time-series rollups: grain -> bucket width in seconds (UTC buckets).
+SALES_GRAINS = {'hour': 3600, 'day': 86400}
+# sales_rollups.category value for whole-order rows; other values hold item lines of that category.
+ALL_CATEGORIES = ''
+
+_SALES_COLUMNS = "orders_count, revenue, items_count"
+_SALES_ACCUMULATE = ", ".join(f"{c} = {c} + excluded.{c}" for c in _SALES_COLUMNS.split(", "))
+_SALES_CONFLICT = "ON CONFLICT(grain, category, pharmacy_id, bucket_ts) DO UPDATE SET " + _SALES_ACCUMULATE
+
+
+def _order_ts(row):
+    return f"COALESCE({row}.created_ts, CAST(strftime('%s', {row}.created_at) AS INTEGER))"
+
+
+def _sales_order_upserts(row, sign):
+    items = f"(SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE order_id = {row}.id)"
+    return "".join(
+        f"""
+            INSERT INTO sales_rollups (grain, bucket_ts, pharmacy_id, category, {_SALES_COLUMNS})
+            VALUES ('{grain}', ({_order_ts(row)} / {width}) * {width}, COALESCE({row}.pharmacy_id, 0), '{ALL_CATEGORIES}',
+                    {sign}, {sign} * {row}.total_amount, {sign} * {items})
+            {_SALES_CONFLICT};"""
+        for grain, width in SALES_GRAINS.items()
+    )
+
+
+def _sales_item_upserts(row, sign):
+    category = "COALESCE(NULLIF(TRIM(m.category), ''), 'General')"
+    # An order counts once per category, however many lines of that category it has.
+    first_of_category = f"""NOT EXISTS (
+                    SELECT 1 FROM order_items oi JOIN medicines om ON om.id = oi.medicine_id
+                    WHERE oi.order_id = {row}.order_id AND oi.id != {row}.id
+                      AND COALESCE(NULLIF(TRIM(om.category), ''), 'General') = {category})"""
+    sql = ""
+    for grain, width in SALES_GRAINS.items():
+        bucket = f"({_order_ts('o')} / {width}) * {width}"
+        sql += f"""
+            INSERT INTO sales_rollups (grain, bucket_ts, pharmacy_id, category, {_SALES_COLUMNS})
+            SELECT '{grain}', {bucket}, COALESCE(o.pharmacy_id, 0), {category},
+                   CASE WHEN {first_of_category} THEN {sign} ELSE 0 END,
+                   {sign} * {row}.quantity * {row}.unit_price, {sign} * {row}.quantity
+            FROM orders o LEFT JOIN medicines m ON m.id = {row}.medicine_id
+            WHERE o.id = {row}.order_id
+            {_SALES_CONFLICT};
+            INSERT INTO sales_rollups (grain, bucket_ts, pharmacy_id, category, {_SALES_COLUMNS})
+            SELECT '{grain}', {bucket}, COALESCE(o.pharmacy_id, 0), '{ALL_CATEGORIES}', 0, 0, {sign} * {row}.quantity
+            FROM orders o WHERE o.id = {row}.order_id
+            {_SALES_CONFLICT};"""
+    return sql
+
+
+def _sales_rollup_sql():
+    """
+    Hour and day sales buckets per pharmacy, overall ('' category) and per
+    medicine category, maintained by triggers. Category rows follow order_items
+    inserts/deletes; rebuild_sales_rollups() repairs anything else.
+    """
+    ts_changed = f"{_order_ts('OLD')} IS NOT {_order_ts('NEW')}"
+    return f"""
+        CREATE INDEX IF NOT EXISTS idx_orders_created_ts ON orders(created_ts);
+        CREATE INDEX IF NOT EXISTS idx_orders_pharmacy_created_ts ON orders(pharmacy_id, created_ts);
+
+        CREATE TABLE IF NOT EXISTS sales_rollups (
+            grain TEXT NOT NULL,
+            bucket_ts INTEGER NOT NULL,
+            pharmacy_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            orders_count INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            items_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (grain, category, pharmacy_id, bucket_ts)
+        );
+        CREATE INDEX IF NOT EXISTS idx_sales_rollups_bucket ON sales_rollups(grain, category, bucket_ts);
+
+        CREATE TRIGGER IF NOT EXISTS trg_orders_created_ts AFTER INSERT ON orders
+        WHEN NEW.created_ts IS NULL
+        BEGIN
+            UPDATE orders SET created_ts = {_order_ts('NEW')} WHERE id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_order_insert AFTER INSERT ON orders
+        BEGIN{_sales_order_upserts('NEW', 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_order_update
+        AFTER UPDATE OF pharmacy_id, total_amount, created_at, created_ts ON orders
+        WHEN OLD.pharmacy_id IS NOT NEW.pharmacy_id OR OLD.total_amount IS NOT NEW.total_amount OR {ts_changed}
+        BEGIN{_sales_order_upserts('OLD', -1)}{_sales_order_upserts('NEW', 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_order_delete AFTER DELETE ON orders
+        BEGIN{_sales_order_upserts('OLD', -1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_item_insert AFTER INSERT ON order_items
+        BEGIN{_sales_item_upserts('NEW', 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_item_delete AFTER DELETE ON order_items
+        BEGIN{_sales_item_upserts('OLD', -1)}
+        END;
+        """
+
+
+def rebuild_sales_rollups(cur):
+    """Recompute sales_rollups from orders, order_items and medicines."""
+    cur.execute("DELETE FROM sales_rollups")
+    for grain, width in SALES_GRAINS.items():
+        cur.execute(
+            f"""
+            INSERT INTO sales_rollups (grain, bucket_ts, pharmacy_id, category, {_SALES_COLUMNS})
+            SELECT ?, (o.created_ts / {width}) * {width}, COALESCE(o.pharmacy_id, 0), ?,
+                   COUNT(*), COALESCE(SUM(o.total_amount), 0), COALESCE(SUM(i.quantity), 0)
+            FROM orders o
+            LEFT JOIN (
+                SELECT order_id, SUM(quantity) AS quantity FROM order_items GROUP BY order_id
+            ) i ON i.order_id = o.id
+            WHERE o.created_ts IS NOT NULL
+            GROUP BY 2, 3
+            """,
+            (grain, ALL_CATEGORIES),
+        )
+        cur.execute(
+            f"""
+            INSERT INTO sales_rollups (grain, bucket_ts, pharmacy_id, category, {_SALES_COLUMNS})
+            SELECT ?, (o.created_ts / {width}) * {width}, COALESCE(o.pharmacy_id, 0),
+                   COALESCE(NULLIF(TRIM(m.category), ''), 'General') AS category,
+                   COUNT(DISTINCT o.id), SUM(oi.quantity * oi.unit_price), SUM(oi.quantity)
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id
+            LEFT JOIN medicines m ON m.id = oi.medicine_id
+            WHERE o.created_ts IS NOT NULL
+            GROUP BY 2, 3, 4
+            """,
+            (grain,),
+        )
+
+
+# Per-medicine daily sales; velocity windows (7/30 days) are summed from these day rows.
+VELOCITY_WINDOWS = (7, 30)
+
+
+def _medicine_sales_upsert(row, sign):
+    return f"""
+            INSERT INTO medicine_daily_sales (medicine_id, day, units, revenue)
+            SELECT {row}.medicine_id, DATE(o.created_at), {sign} * {row}.quantity, {sign} * {row}.quantity * {row}.unit_price
+            FROM orders o WHERE o.id = {row}.order_id
+            ON CONFLICT(medicine_id, day) DO UPDATE SET
+                units = units + excluded.units, revenue = revenue + excluded.revenue;"""
+
+
+def _medicine_sales_sql():
+    """medicine_daily_sales table plus the order_items triggers that keep it current."""
+    return f"""
+        CREATE TABLE IF NOT EXISTS medicine_daily_sales (
+            medicine_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (medicine_id, day)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_medicines_pharmacy_name ON medicines(pharmacy_id, LOWER(TRIM(name)));
+        CREATE TRIGGER IF NOT EXISTS trg_medicine_sales_insert AFTER INSERT ON order_items
+        BEGIN{_medicine_sales_upsert('NEW', 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_medicine_sales_delete AFTER DELETE ON order_items
+        BEGIN{_medicine_sales_upsert('OLD', -1)}
+        END;
+        """
+
+
+def rebuild_medicine_sales(cur):
+    """Recompute medicine_daily_sales from order_items (backfill or repair)."""
+    cur.execute("DELETE FROM medicine_daily_sales")
+    cur.execute(
+        """
+        INSERT INTO medicine_daily_sales (medicine_id, day, units, revenue)
+        SELECT oi.medicine_id, DATE(o.created_at), SUM(oi.quantity), SUM(oi.quantity * oi.unit_price)
+        FROM order_items oi
+        JOIN orders o ON o.id = oi.order_id
+        GROUP BY oi.medicine_id, DATE(o.created_at)
+        """
+    )
+
+
+# Tables published through the catalog change feed (GET /medicines/changes) and the
+# columns whose changes bump row_version.
+CHANGE_FEED_TABLES = {
+    'medicines': (
+        'pharmacy_id', 'category', 'name', 'use_for', 'strength', 'unit', 'price', 'mrp',
+        'offer_text', 'image_url', 'available', 'stock_qty',
+    ),
+    'pharmacies': (
+        'name', 'location', 'lat', 'lng', 'is_approved', 'medicines_count', 'rating', 'phone', 'hours', 'areas_served',
+    ),
+}
+
+_NEXT_ROW_VERSION = (
+    "UPDATE row_version_seq SET version = version + 1 WHERE id = 1;"
+)
+
+
+def _change_feed_sql():
+    """row_version bookkeeping: every insert/update takes the next global version, deletes leave a tombstone."""
+    sql = """
+        CREATE TABLE IF NOT EXISTS row_version_seq (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO row_version_seq (id, version) VALUES (1, 0);
+        CREATE TABLE IF NOT EXISTS catalog_tombstones (
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            row_version INTEGER NOT NULL,
+            deleted_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (entity, entity_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_catalog_tombstones_version ON catalog_tombstones(row_version);
+        """
+    for table, columns in CHANGE_FEED_TABLES.items():
+        changed = " OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in columns)
+        sql += f"""
+        CREATE INDEX IF NOT EXISTS idx_{table}_row_version ON {table}(row_version);
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_row_version_insert AFTER INSERT ON {table}
+        BEGIN
+            {_NEXT_ROW_VERSION}
+            UPDATE {table} SET row_version = (SELECT version FROM row_version_seq WHERE id = 1) WHERE id = NEW.id;
+            DELETE FROM catalog_tombstones WHERE entity = '{table}' AND entity_id = NEW.id;
+        END;
+        -- Skips the trigger's own row_version write and no-op rewrites (e.g. init_db's recounts).
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_row_version_update AFTER UPDATE ON {table}
+        WHEN NEW.row_version IS OLD.row_version AND ({changed})
+        BEGIN
+            {_NEXT_ROW_VERSION}
+            UPDATE {table} SET row_version = (SELECT version FROM row_version_seq WHERE id = 1) WHERE id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_row_version_delete AFTER DELETE ON {table}
+        BEGIN
+            {_NEXT_ROW_VERSION}
+            INSERT INTO catalog_tombstones (entity, entity_id, row_version)
+            VALUES ('{table}', OLD.id, (SELECT version FROM row_version_seq WHERE id = 1))
+            ON CONFLICT(entity, entity_id) DO UPDATE SET row_version = excluded.row_version, deleted_at = CURRENT_TIMESTAMP;
+        END;
+        """
+    return sql
+
+
+def _backfill_row_versions(cur, table):
+    """Give rows that predate the row_version column distinct versions above the current sequence."""
+    cur.execute(f"SELECT COUNT(*) AS c, COALESCE(MAX(id), 0) AS max_id FROM {table} WHERE row_version = 0")
+    row = cur.fetchone()
+    if not row["c"]:
+        return
+    cur.execute(
+        f"UPDATE {table} SET row_version = (SELECT version FROM row_version_seq WHERE id = 1) + id WHERE row_version = 0"
+    )
+    cur.execute("UPDATE row_version_seq SET version = version + ? WHERE id = 1", (row["max_id"],))
+
+
+# One catalog row per (pharmacy, name, strength), compared case- and space-insensitively.
+# The unique index over these expressions is the conflict target for bulk upserts.
+MEDICINE_IDENTITY = "pharmacy_id, LOWER(TRIM(name)), LOWER(TRIM(COALESCE(strength, '')))"
+
+
+def ensure_medicine_identity_index(cur, create=True):
+    """
+    Create idx_medicines_identity if it is missing. Returns up to 20 duplicate
+    (pharmacy_id, name, strength, count) groups that block it; empty when the
+    index exists. With create=False only the duplicates are reported.
+    """
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_medicines_identity'")
+    if cur.fetchone():
+        return []
+    cur.execute(
+        f"SELECT {MEDICINE_IDENTITY}, COUNT(*) FROM medicines GROUP BY 1, 2, 3 HAVING COUNT(*) > 1 LIMIT 20"
+    )
+    duplicates = [tuple(r) for r in cur.fetchall()]
+    if create and not duplicates:
+        cur.execute(f"CREATE UNIQUE INDEX idx_medicines_identity ON medicines({MEDICINE_IDENTITY})")
+    return duplicates
+
+
+_EMPTY_STATS = {'orders_count': 0, 'revenue': 0.0, 'delivered_revenue': 0.0, 'open_orders': 0, 'items_count': 0}
+
+
+def get_pharmacy_day_stats(cur, pharmacy_id, day=None):
+    """One pharmacy_daily_stats row (primary-key lookup) as a dict; `day` defaults to today (UTC)."""
+    if day is None:
+        cur.execute(
+            f"SELECT {_STATS_COLUMNS} FROM pharmacy_daily_stats WHERE pharmacy_id = ? AND day = DATE('now')",
+            (pharmacy_id,),
+        )
+    else:
+        cur.execute(
+            f"SELECT {_STATS_COLUMNS} FROM pharmacy_daily_stats WHERE pharmacy_id = ? AND day = ?",
+            (pharmacy_id, day),
+        )
+    row = cur.fetchone()
+    return dict(row) if row else dict(_EMPTY_STATS)
+
+
+def get_pharmacy_totals(cur, pharmacy_id):
+    """All-time order totals for one pharmacy as a dict."""
+    cur.execute(f"SELECT {_STATS_COLUMNS} FROM pharmacy_order_totals WHERE pharmacy_id = ?", (pharmacy_id,))
+    row = cur.fetchone()
+    return dict(row) if row else dict(_EMPTY_STATS)
+
+
+def get_connection(readonly=False):
     conn = sqlite3.connect(_resolve_db_path())
     conn.row_factory = sqlite3.Row
+    if readonly:
+        # Read paths never take the write lock; any stray write fails loudly.
+        conn.execute("PRAGMA query_only = ON")
     return conn
 
 
@@ -276,6 +709,7 @@ def init_db():
             email TEXT,
             password TEXT,
             otp_code TEXT,
+            otp_expires_at REAL,
             is_verified INTEGER DEFAULT 0,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         );
@@ -292,7 +726,8 @@ def init_db():
             phone TEXT DEFAULT '',
             hours TEXT DEFAULT '',
             areas_served TEXT DEFAULT '',
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            row_version INTEGER NOT NULL DEFAULT 0
         );
 
         CREATE TABLE IF NOT EXISTS medicines (
@@ -309,6 +744,7 @@ def init_db():
             image_url TEXT DEFAULT '/medicine-placeholder.svg',
             available INTEGER DEFAULT 1,
             stock_qty INTEGER DEFAULT 10,
+            row_version INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (pharmacy_id) REFERENCES pharmacies(id)
         );
 
@@ -327,6 +763,7 @@ def init_db():
             distance_km REAL DEFAULT 0,
             distance_surcharge REAL DEFAULT 0,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            created_ts INTEGER,
             FOREIGN KEY (user_id) REFERENCES users(id),
             FOREIGN KEY (pharmacy_id) REFERENCES pharmacies(id)
         );
@@ -340,6 +777,8 @@ def init_db():
             FOREIGN KEY (order_id) REFERENCES orders(id),
             FOREIGN KEY (medicine_id) REFERENCES medicines(id)
         );
+        -- The sales rollup triggers and order detail reads look up items by order.
+        CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
 
         CREATE TABLE IF NOT EXISTS deliveries (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -361,7 +800,107 @@ def init_db():
             status TEXT DEFAULT 'pending',
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         );
+
+        CREATE TABLE IF NOT EXISTS pricing_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rule_type TEXT NOT NULL,
+            threshold REAL DEFAULT 0,
+            amount REAL NOT NULL,
+            is_active INTEGER DEFAULT 1,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            jti TEXT UNIQUE NOT NULL,
+            expires_at REAL NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS stripe_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id TEXT UNIQUE NOT NULL,
+            event_type TEXT NOT NULL,
+            payment_intent_id TEXT,
+            order_id INTEGER,
+            payload TEXT NOT NULL,
+            status TEXT DEFAULT 'received',
+            attempts INTEGER DEFAULT 0,
+            locked_until REAL,
+            next_attempt_at REAL,
+            last_error TEXT DEFAULT '',
+            received_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            processed_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_stripe_events_status ON stripe_events(status, id);
+        CREATE INDEX IF NOT EXISTS idx_stripe_events_payment_intent ON stripe_events(payment_intent_id);
+
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            state TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER DEFAULT 0,
+            max_attempts INTEGER DEFAULT 5,
+            run_after REAL NOT NULL,
+            locked_until REAL,
+            last_error TEXT DEFAULT '',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_state_run_after ON jobs(state, run_after);
+
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            bucket_key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            allowed INTEGER NOT NULL DEFAULT 1,
+            period REAL NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 1
+        );
+        INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 1);
+
+        -- Bump the catalog version on any customer-visible medicine change (stock_qty alone does not count).
+        CREATE TRIGGER IF NOT EXISTS trg_medicines_catalog_insert AFTER INSERT ON medicines
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_medicines_catalog_update
+        AFTER UPDATE OF pharmacy_id, category, name, use_for, strength, unit, price, mrp, offer_text, image_url, available
+        ON medicines
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_medicines_catalog_delete AFTER DELETE ON medicines
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END;
+
+        -- Order rollups for dashboards; kept current by the trg_order_stats_* triggers below.
+        CREATE TABLE IF NOT EXISTS pharmacy_daily_stats (
+            pharmacy_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            orders_count INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            delivered_revenue REAL NOT NULL DEFAULT 0,
+            open_orders INTEGER NOT NULL DEFAULT 0,
+            items_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (pharmacy_id, day)
+        );
+        CREATE TABLE IF NOT EXISTS pharmacy_order_totals (
+            pharmacy_id INTEGER PRIMARY KEY,
+            orders_count INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            delivered_revenue REAL NOT NULL DEFAULT 0,
+            open_orders INTEGER NOT NULL DEFAULT 0,
+            items_count INTEGER NOT NULL DEFAULT 0
+        );
         """
+        + _order_stats_triggers()
+        + _medicine_count_triggers()
     )
 
     # Lightweight migrations for existing local DBs.
@@ -371,6 +910,10 @@ def init_db():
         cur.execute("ALTER TABLE users ADD COLUMN email TEXT")
     if "password" not in user_columns:
         cur.execute("ALTER TABLE users ADD COLUMN password TEXT")
+    if "otp_expires_at" not in user_columns:
+        cur.execute("ALTER TABLE users ADD COLUMN otp_expires_at REAL")
+    # send_otp_sms jobs used to carry the plaintext code; it is read from users at send time now.
+    cur.execute("DELETE FROM jobs WHERE name = 'send_otp_sms' AND json_array_length(payload, '$.args') > 1")
     cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_unique ON users(email) WHERE email IS NOT NULL")
 
     cur.execute("PRAGMA table_info(medicines)")
@@ -385,6 +928,8 @@ def init_db():
         cur.execute("ALTER TABLE medicines ADD COLUMN offer_text TEXT DEFAULT ''")
     if "image_url" not in medicine_columns:
         cur.execute("ALTER TABLE medicines ADD COLUMN image_url TEXT DEFAULT '/medicine-placeholder.svg'")
+    if "row_version" not in medicine_columns:
+        cur.execute("ALTER TABLE medicines ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
 
     cur.execute("PRAGMA table_info(orders)")
     order_columns = {row[1] for row in cur.fetchall()}
@@ -400,6 +945,12 @@ def init_db():
         cur.execute("ALTER TABLE orders ADD COLUMN distance_km REAL DEFAULT 0")
     if "distance_surcharge" not in order_columns:
         cur.execute("ALTER TABLE orders ADD COLUMN distance_surcharge REAL DEFAULT 0")
+    if "created_ts" not in order_columns:
+        cur.execute("ALTER TABLE orders ADD COLUMN created_ts INTEGER")
+    # Integer epoch copy of created_at so range filters are plain indexed comparisons.
+    cur.execute(f"UPDATE orders SET created_ts = {_order_ts('orders')} WHERE created_ts IS NULL")
+    cur.executescript(_sales_rollup_sql())
+    cur.executescript(_medicine_sales_sql())
 
     cur.execute("PRAGMA table_info(pharmacies)")
     pharmacy_columns = {row[1] for row in cur.fetchall()}
@@ -409,6 +960,31 @@ def init_db():
         cur.execute("ALTER TABLE pharmacies ADD COLUMN hours TEXT DEFAULT ''")
     if "areas_served" not in pharmacy_columns:
         cur.execute("ALTER TABLE pharmacies ADD COLUMN areas_served TEXT DEFAULT ''")
+    if "row_version" not in pharmacy_columns:
+        cur.execute("ALTER TABLE pharmacies ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+
+    cur.execute("PRAGMA table_info(rate_limit_buckets)")
+    if "period" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE rate_limit_buckets ADD COLUMN period REAL NOT NULL DEFAULT 0")
+
+    cur.execute("PRAGMA table_info(stripe_events)")
+    if "next_attempt_at" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE stripe_events ADD COLUMN next_attempt_at REAL")
+
+    # Catalog change feed: versions for existing rows first, then the triggers that maintain them.
+    cur.executescript(_change_feed_sql())
+    for table in CHANGE_FEED_TABLES:
+        _backfill_row_versions(cur, table)
+
+    # Cross-pharmacy cart comparison looks medicines up by normalized name.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_medicines_name_norm ON medicines(LOWER(TRIM(name)))")
+
+    cur.execute("SELECT COUNT(*) AS c FROM pricing_rules")
+    if cur.fetchone()["c"] == 0:
+        cur.executemany(
+            "INSERT INTO pricing_rules (rule_type, threshold, amount, is_active) VALUES (?, ?, ?, 1)",
+            DEFAULT_PRICING_RULES,
+        )
 
     satna_pharmacy_ids = []
     for pharmacy in SATNA_PHARMACIES:
@@ -720,9 +1296,26 @@ def init_db():
         """
     )
 
+    # Startup reconcile; afterwards the trg_medicines_count_* triggers keep the column current.
     cur.execute(
         "UPDATE pharmacies SET medicines_count = (SELECT COUNT(*) FROM medicines m WHERE m.pharmacy_id = pharmacies.id)"
     )
 
+    duplicates = ensure_medicine_identity_index(cur)
+    if duplicates:
+        print(f"[DB] idx_medicines_identity not created; duplicate medicines: {duplicates}")
+
+    # Backfill the order rollups the first time they exist next to existing orders.
+    cur.execute("SELECT EXISTS(SELECT 1 FROM orders) AS has_orders, EXISTS(SELECT 1 FROM pharmacy_order_totals) AS has_stats")
+    row = cur.fetchone()
+    if row["has_orders"] and not row["has_stats"]:
+        rebuild_order_stats(cur)
+    cur.execute("SELECT EXISTS(SELECT 1 FROM sales_rollups) AS has_rollups")
+    if row["has_orders"] and not cur.fetchone()["has_rollups"]:
+        rebuild_sales_rollups(cur)
+    cur.execute("SELECT EXISTS(SELECT 1 FROM medicine_daily_sales) AS has_sales")
+    if row["has_orders"] and not cur.fetchone()["has_sales"]:
+        rebuild_medicine_sales(cur)
+
     conn.commit()
     conn.close()
@@ -0,0 +1,151 @@
+"""
+Streaming exports for Smart Medicine Delivery Network
+Orders and the medicine catalog as CSV or NDJSON, produced by generators so
+memory stays flat regardless of row count. Rows are read in short keyset
+pages (id > last_id ORDER BY id LIMIT n) drained with fetchmany before any
+row is sent, so no read lock is held while a slow client downloads; the same id cursor is
+exposed as `after_id` for resuming an interrupted export.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+from db import get_connection
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+PAGE_SIZE = 2000
+FETCH_BATCH = 500
+# Flush the text buffer to the client roughly every 64 KiB.
+FLUSH_BYTES = 64 * 1024
+
+# Same column order as sample_data/medicines_full_export.csv so the output can be re-imported.
+MEDICINE_COLUMNS = (
+    'id', 'pharmacy_id', 'name', 'strength', 'unit', 'price', 'available', 'stock_qty',
+    'mrp', 'offer_text', 'image_url', 'category', 'use_for',
+)
+ORDER_COLUMNS = (
+    'id', 'order_number', 'user_id', 'pharmacy_id', 'status', 'total_amount', 'is_express',
+    'distance_km', 'distance_surcharge', 'created_at', 'created_ts',
+)
+
+
+_to_json = json.JSONEncoder(separators=(',', ':')).encode
+
+
+class ExportError(ValueError):
+    """Invalid export request parameters."""
+
+
+def order_query(start_ts=None, end_ts=None, pharmacy_id=None, status=None):
+    clauses, params = [], []
+    if start_ts is not None:
+        clauses.append("created_ts >= ?")
+        params.append(start_ts)
+    if end_ts is not None:
+        clauses.append("created_ts < ?")
+        params.append(end_ts)
+    if pharmacy_id is not None:
+        clauses.append("pharmacy_id = ?")
+        params.append(pharmacy_id)
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    return 'orders', ORDER_COLUMNS, clauses, params
+
+
+def medicine_query(pharmacy_id=None, category=None):
+    clauses, params = [], []
+    if pharmacy_id is not None:
+        clauses.append("pharmacy_id = ?")
+        params.append(pharmacy_id)
+    if category:
+        clauses.append("LOWER(category) = LOWER(?)")
+        params.append(category)
+    return 'medicines', MEDICINE_COLUMNS, clauses, params
+
+
+def iter_rows(query, after_id=0, limit=None):
+    """Yield row tuples in id order, one short read per page."""
+    table, columns, clauses, params = query
+    last_id = after_id or 0
+    remaining = limit
+    where = ''.join(f" AND {c}" for c in clauses)
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE id > ?{where} ORDER BY id LIMIT ?"
+
+    conn = get_connection(readonly=True)
+    try:
+        while remaining is None or remaining > 0:
+            page_size = PAGE_SIZE if remaining is None else min(PAGE_SIZE, remaining)
+            cur = conn.execute(sql, [last_id, *params, page_size])
+            page = []
+            while True:
+                batch = cur.fetchmany(FETCH_BATCH)
+                if not batch:
+                    break
+                page.extend(batch)
+            # The page is drained and the statement closed before yielding, so the
+            # SHARED lock is not held while the generator waits on a slow client.
+            cur.close()
+            for row in page:
+                yield tuple(row)
+            if page:
+                last_id = page[-1][0]
+            if remaining is not None:
+                remaining -= len(page)
+            if len(page) < page_size:
+                return
+    finally:
+        conn.close()
+
+
+def _encode_csv(columns, rows, header=True):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _encode_ndjson(columns, rows):
+    chunk = []
+    size = 0
+    for row in rows:
+        line = _to_json(dict(zip(columns, row))) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(chunk).encode('utf-8')
+            chunk, size = [], 0
+    yield ''.join(chunk).encode('utf-8')
+
+
+def _gzip(chunks):
+    # wbits=31 writes a gzip container; each chunk is compressed as it streams.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def stream_export(query, fmt='csv', after_id=0, limit=None, compress=False):
+    """
+    Generator of response body bytes for the given query. A resumed CSV
+    export (after_id > 0) omits the header so it can be appended to the
+    partial file.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError('format must be csv or ndjson')
+    columns = query[1]
+    rows = iter_rows(query, after_id=after_id, limit=limit)
+    chunks = _encode_csv(columns, rows, header=not after_id) if fmt == 'csv' else _encode_ndjson(columns, rows)
+    return _gzip(chunks) if compress else chunks
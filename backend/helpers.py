@@ -4,10 +4,68 @@ Includes distance calculation, OTP handling, and external API integrations.
 """
 
 import math
+import os
 import random
 import string
+import sys
+import threading
 from config import Config
-import requests
+import http_client
+
+_client_lock = threading.Lock()
+_sdk_clients = {}
+
+
+def _reset_after_fork():
+    # SDK clients (and the stripe module's HTTP client) hold the parent's pooled sessions.
+    global _client_lock
+    _client_lock = threading.Lock()
+    _sdk_clients.clear()
+    stripe = sys.modules.get('stripe')
+    if stripe is not None:
+        stripe.default_http_client = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_sdk_client(name, factory):
+    """Build an SDK client once per process so its HTTP session (and keep-alive) is reused."""
+    client = _sdk_clients.get(name)
+    if client is None:
+        with _client_lock:
+            client = _sdk_clients.get(name)
+            if client is None:
+                client = factory()
+                _sdk_clients[name] = client
+    return client
+
+
+def get_twilio_client():
+    from twilio.rest import Client
+    return _get_sdk_client('twilio', lambda: Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN))
+
+
+def get_razorpay_client():
+    import razorpay
+    return _get_sdk_client(
+        'razorpay',
+        lambda: razorpay.Client(auth=(Config.RAZORPAY_KEY_ID, Config.RAZORPAY_KEY_SECRET)),
+    )
+
+
+def get_stripe_module():
+    """Configure the stripe module once: API key and a pooled requests session."""
+    import stripe
+
+    def configure():
+        stripe.api_key = Config.STRIPE_API_KEY
+        requests_client = getattr(stripe, 'RequestsClient', None)
+        if requests_client is not None:
+            stripe.default_http_client = requests_client(session=http_client.get_session('stripe'))
+        return stripe
+
+    return _get_sdk_client('stripe', configure)
 
 
 def calculate_distance(lat1, lng1, lat2, lng2):
@@ -30,26 +88,56 @@ def calculate_distance(lat1, lng1, lat2, lng2):
     return round(distance, 2)
 
 
+def parse_coordinates(lat, lng):
+    """Return (lat, lng) floats, (None, None) when either is absent; raises ValueError when malformed."""
+    if lat is None or lng is None:
+        return None, None
+    if isinstance(lat, bool) or isinstance(lng, bool):
+        raise ValueError('Invalid location coordinates')
+    try:
+        lat = float(lat)
+        lng = float(lng)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid location coordinates')
+    # Range checks are False for NaN, so this rejects nan and inf too.
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('Location coordinates out of range')
+    return lat, lng
+
+
 def calculate_delivery_charge(distance_km, is_express=False):
     """
     Calculate delivery charge based on distance and delivery type.
-    Returns delivery_charge in rupees.
+    Returns delivery_charge in rupees. Checkout and /orders/quote price
+    delivery with the pricing engine's rules (pricing.quote_cart) instead.
     """
     free_radius = Config.FREE_DELIVERY_RADIUS_KM
-    
+
     if distance_km <= free_radius:
         charge = 0
     else:
         # ₹5 per km after free radius
         extra_distance = distance_km - free_radius
         charge = max(20, extra_distance * 5)
-    
+
     if is_express:
         charge += Config.EXPRESS_DELIVERY_CHARGE
-    
+
     return round(charge, 2)
 
 
+def estimate_delivery_minutes(distance_km, is_express=False):
+    """
+    Rough delivery ETA in minutes: a base handling time plus travel beyond the free radius.
+    Unknown distance (no customer location) returns the base time.
+    """
+    base = Config.EXPRESS_DELIVERY_MINUTES if is_express else Config.STANDARD_DELIVERY_MINUTES
+    if distance_km is None:
+        return base
+    extra_distance = max(0.0, distance_km - Config.FREE_DELIVERY_RADIUS_KM)
+    return int(round(base + extra_distance * Config.DELIVERY_MINUTES_PER_KM))
+
+
 def get_distance_from_maps_api(origin_lat, origin_lng, dest_lat, dest_lng):
     """
     Get distance from Google Maps Distance Matrix API.
@@ -68,7 +156,7 @@ def get_distance_from_maps_api(origin_lat, origin_lng, dest_lat, dest_lng):
             'key': Config.MAPS_API_KEY,
             'units': 'metric'
         }
-        response = requests.get(url, params=params, timeout=5)
+        response = http_client.request('maps', 'GET', url, params=params)
         data = response.json()
         
         if data['status'] == 'OK' and data['rows']:
@@ -102,9 +190,10 @@ def send_otp_twilio(phone_number, otp_code):
         return True
     
     try:
-        from twilio.rest import Client
-        client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
-        message = client.messages.create(
+        client = get_twilio_client()
+        message = http_client.call(
+            'twilio',
+            client.messages.create,
             body=f"Your Smart Medicine Delivery OTP is {otp_code}. Valid for 10 minutes.",
             from_=Config.TWILIO_PHONE_NUMBER,
             to=phone_number
@@ -153,11 +242,8 @@ def create_razorpay_order(amount, order_id, customer_phone=None):
         }
     
     try:
-        import razorpay
-        client = razorpay.Client(
-            auth=(Config.RAZORPAY_KEY_ID, Config.RAZORPAY_KEY_SECRET)
-        )
-        order = client.order.create({
+        client = get_razorpay_client()
+        order = http_client.call('razorpay', client.order.create, {
             'amount': int(amount * 100),  # Amount in paise
             'currency': 'INR',
             'receipt': f"order_{order_id}",
@@ -181,10 +267,7 @@ def verify_razorpay_payment(payment_id, order_id, signature):
         return True  # Mock mode
     
     try:
-        import razorpay
-        client = razorpay.Client(
-            auth=(Config.RAZORPAY_KEY_ID, Config.RAZORPAY_KEY_SECRET)
-        )
+        client = get_razorpay_client()
         return client.utility.verify_payment_signature({
             'razorpay_order_id': order_id,
             'razorpay_payment_id': payment_id,
@@ -205,9 +288,10 @@ def create_stripe_payment_intent(amount, currency='inr', metadata=None):
         return None
 
     try:
-        import stripe
-        stripe.api_key = Config.STRIPE_API_KEY
-        intent = stripe.PaymentIntent.create(
+        stripe = get_stripe_module()
+        intent = http_client.call(
+            'stripe',
+            stripe.PaymentIntent.create,
             amount=int(round(float(amount) * 100)),
             currency=currency,
             metadata=metadata or {},
@@ -225,9 +309,8 @@ def retrieve_stripe_payment_intent(payment_intent_id):
         return None
 
     try:
-        import stripe
-        stripe.api_key = Config.STRIPE_API_KEY
-        return stripe.PaymentIntent.retrieve(payment_intent_id)
+        stripe = get_stripe_module()
+        return http_client.call('stripe', stripe.PaymentIntent.retrieve, payment_intent_id)
     except Exception as e:
         print(f"Stripe retrieve error: {e}")
         return None
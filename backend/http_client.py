@@ -0,0 +1,274 @@
+"""
+Outbound HTTP layer for Smart Medicine Delivery Network
+One pooled keep-alive session per upstream dependency, bounded retries with
+jittered backoff, per-dependency circuit breakers and latency/error counters.
+"""
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+DEFAULT_TIMEOUT = (3.0, 10.0)
+
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+_sessions = {}
+_breakers = {}
+_stats = {}
+_registry_lock = threading.Lock()
+# Pooled sockets must not be shared between a parent and its forked children.
+os.register_at_fork(after_in_child=_sessions.clear)
+
+
+def dependency_timeout(dependency):
+    """(connect timeout, read timeout) in seconds; read at call time so the active config applies."""
+    if dependency == 'maps':
+        return (2.0, Config.MAPS_TIMEOUT_SECONDS)
+    if dependency == 'groq':
+        return (3.0, Config.GROQ_TIMEOUT_SECONDS)
+    return DEFAULT_TIMEOUT
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream call fails after retries."""
+
+    def __init__(self, dependency, message):
+        super().__init__(f"{dependency}: {message}")
+        self.dependency = dependency
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling the upstream while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures; half-open probe after reset_seconds."""
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Return (allowed, probe); probe is True when this caller holds the half-open probe."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True, False
+            if state == 'half_open' and not self.probe_in_flight:
+                # Let exactly one request through to test the upstream.
+                self.probe_in_flight = True
+                return True, True
+            return False, False
+
+    def record_success(self, probe=False):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            if probe:
+                self.probe_in_flight = False
+
+    def release_probe(self):
+        """End a half-open probe that recorded neither success nor failure (e.g. it raised)."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_failure(self, probe=False):
+        with self._lock:
+            self.failures += 1
+            if probe:
+                self.probe_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class DependencyStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms, ok):
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.total_latency_ms += latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def bump(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'short_circuited': self.short_circuited,
+                'avg_latency_ms': round(self.total_latency_ms / self.calls, 2) if self.calls else 0.0,
+                'max_latency_ms': round(self.max_latency_ms, 2),
+            }
+
+
+def _get_breaker(dependency):
+    breaker = _breakers.get(dependency)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.setdefault(
+                dependency,
+                CircuitBreaker(Config.UPSTREAM_BREAKER_FAILURES, Config.UPSTREAM_BREAKER_RESET_SECONDS),
+            )
+    return breaker
+
+
+def _get_stats(dependency):
+    stats = _stats.get(dependency)
+    if stats is None:
+        with _registry_lock:
+            stats = _stats.setdefault(dependency, DependencyStats())
+    return stats
+
+
+def get_session(dependency):
+    """Shared keep-alive session for a dependency (connection pool reused across requests)."""
+    session = _sessions.get(dependency)
+    if session is None:
+        with _registry_lock:
+            session = _sessions.get(dependency)
+            if session is None:
+                session = requests.Session()
+                # Retries are handled in request() so they can respect the breaker.
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.UPSTREAM_POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[dependency] = session
+    return session
+
+
+def _backoff_seconds(attempt):
+    # Full jitter: uniform in [0, base * 2^attempt], capped.
+    ceiling = min(Config.UPSTREAM_BACKOFF_MAX_SECONDS, Config.UPSTREAM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def request(dependency, method, url, retries=None, retry_on_read_timeout=False, timeout=None, **kwargs):
+    """
+    Send a request through the dependency's pooled session.
+    Connection errors and 429/5xx responses are retried with jittered backoff;
+    read timeouts are not retried unless asked, so a slow upstream costs one timeout.
+    Raises CircuitOpenError when the breaker is open and UpstreamError on final failure.
+    """
+    breaker = _get_breaker(dependency)
+    stats = _get_stats(dependency)
+    allowed, probe = breaker.allow()
+    if not allowed:
+        stats.bump('short_circuited')
+        raise CircuitOpenError(dependency, 'circuit open')
+
+    session = get_session(dependency)
+    timeout = timeout or dependency_timeout(dependency)
+    retries = Config.UPSTREAM_MAX_RETRIES if retries is None else retries
+
+    last_error = None
+    try:
+        for attempt in range(retries + 1):
+            if attempt:
+                stats.bump('retries')
+                time.sleep(_backoff_seconds(attempt - 1))
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ReadTimeout as e:
+                stats.record((time.perf_counter() - started) * 1000, ok=False)
+                last_error = e
+                if not retry_on_read_timeout:
+                    break
+                continue
+            except requests.exceptions.RequestException as e:
+                stats.record((time.perf_counter() - started) * 1000, ok=False)
+                last_error = e
+                continue
+
+            ok = response.status_code not in RETRYABLE_STATUS and response.status_code < 500
+            stats.record((time.perf_counter() - started) * 1000, ok=ok)
+            if ok:
+                breaker.record_success(probe)
+                probe = False
+                return response
+            last_error = UpstreamError(dependency, f'HTTP {response.status_code}')
+            if response.status_code not in RETRYABLE_STATUS:
+                break
+
+        breaker.record_failure(probe)
+        probe = False
+        if isinstance(last_error, UpstreamError):
+            raise last_error
+        raise UpstreamError(dependency, str(last_error))
+    finally:
+        if probe:
+            # The probe raised before recording an outcome; let the next request probe instead.
+            breaker.release_probe()
+
+
+def call(dependency, fn, *args, **kwargs):
+    """
+    Run an SDK call (Twilio, Razorpay, Stripe) under the dependency's breaker and counters.
+    No retries: SDK calls here create resources and are not safe to repeat blindly.
+    """
+    breaker = _get_breaker(dependency)
+    stats = _get_stats(dependency)
+    allowed, probe = breaker.allow()
+    if not allowed:
+        stats.bump('short_circuited')
+        raise CircuitOpenError(dependency, 'circuit open')
+
+    started = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception:
+        stats.record((time.perf_counter() - started) * 1000, ok=False)
+        breaker.record_failure(probe)
+        raise
+    except BaseException:
+        if probe:
+            # Interrupted before an outcome was known; let the next request probe instead.
+            breaker.release_probe()
+        raise
+    stats.record((time.perf_counter() - started) * 1000, ok=True)
+    breaker.record_success(probe)
+    return result
+
+
+def dependency_report():
+    """Counters and breaker state for every dependency seen by this process."""
+    with _registry_lock:
+        names = sorted(set(_stats) | set(_breakers))
+    report = {}
+    for name in names:
+        entry = _get_stats(name).to_dict()
+        entry['circuit'] = _get_breaker(name).state
+        report[name] = entry
+    return report
@@ -0,0 +1,260 @@
+"""
+Inventory insights and bulk updates for Smart Medicine Delivery Network
+Sales velocity, days of cover, top sellers and low-stock alerts per pharmacy,
+computed from the medicine_daily_sales counters in one indexed read instead
+of scanning order_items; and batched stock/price updates applied through a
+temp-table join in chunked transactions.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+from db import VELOCITY_WINDOWS
+
+
+def _day(days_ago):
+    return (datetime.now(timezone.utc).date() - timedelta(days=days_ago)).isoformat()
+
+
+def _velocity_rows(cur, pharmacy_id):
+    short_window, long_window = VELOCITY_WINDOWS
+    # Windows include today, so a 7-day window starts 6 days ago.
+    cur.execute(
+        """
+        SELECT m.id, m.name, m.strength, m.unit, m.category, m.price, m.stock_qty, m.available,
+               COALESCE(SUM(CASE WHEN s.day >= ? THEN s.units END), 0) AS units_short,
+               COALESCE(SUM(s.units), 0) AS units_long,
+               COALESCE(SUM(s.revenue), 0) AS revenue_long
+        FROM medicines m
+        LEFT JOIN medicine_daily_sales s ON s.medicine_id = m.id AND s.day >= ?
+        WHERE m.pharmacy_id = ?
+        GROUP BY m.id
+        """,
+        (_day(short_window - 1), _day(long_window - 1), pharmacy_id),
+    )
+    return cur.fetchall()
+
+
+def inventory_insights(cur, pharmacy_id, low_stock_days=7, top=10):
+    """
+    Per-medicine velocity for one pharmacy. Daily rate is the higher of the
+    7-day and 30-day averages, so a recent spike shortens cover instead of
+    being diluted by a quiet month.
+    """
+    short_window, long_window = VELOCITY_WINDOWS
+    items = []
+    for r in _velocity_rows(cur, pharmacy_id):
+        daily_rate = max(r['units_short'] / short_window, r['units_long'] / long_window)
+        stock = int(r['stock_qty'] or 0)
+        items.append(
+            {
+                'medicine_id': r['id'],
+                'name': r['name'],
+                'strength': r['strength'],
+                'unit': r['unit'],
+                'category': r['category'] or '',
+                'stock_qty': stock,
+                'available': bool(r['available']),
+                f'units_{short_window}d': r['units_short'],
+                f'units_{long_window}d': r['units_long'],
+                f'revenue_{long_window}d': round(r['revenue_long'], 2),
+                'daily_rate': round(daily_rate, 2),
+                'days_of_cover': round(stock / daily_rate, 1) if daily_rate > 0 else None,
+            }
+        )
+
+    sellers = sorted((i for i in items if i[f'units_{long_window}d'] > 0),
+                     key=lambda i: (-i[f'units_{long_window}d'], -i[f'revenue_{long_window}d']))
+    low_stock = sorted(
+        (
+            i for i in items
+            if i['stock_qty'] <= 0 or (i['days_of_cover'] is not None and i['days_of_cover'] < low_stock_days)
+        ),
+        key=lambda i: (i['days_of_cover'] if i['days_of_cover'] is not None else 0, -i['daily_rate']),
+    )
+    return {
+        'pharmacy_id': pharmacy_id,
+        'windows': list(VELOCITY_WINDOWS),
+        'low_stock_days': low_stock_days,
+        'medicines_count': len(items),
+        'units_sold': {f'{w}d': sum(i[f'units_{w}d'] for i in items) for w in VELOCITY_WINDOWS},
+        'top_sellers': sellers[:top],
+        'low_stock': low_stock,
+        'no_sales': sum(1 for i in items if i[f'units_{long_window}d'] == 0),
+    }
+
+
+class InventoryUpdateError(ValueError):
+    """Malformed bulk update row."""
+
+
+_UPDATE_FIELDS = ('stock_qty', 'price', 'mrp', 'available')
+_TRUE_VALUES = ('1', 'true', 'yes', 'y')
+_FALSE_VALUES = ('0', 'false', 'no', 'n')
+
+
+def _parse_update_row(row):
+    """dict -> (medicine_id, name_key, strength_key, stock_qty, price, mrp, available)."""
+    if not isinstance(row, dict):
+        raise InventoryUpdateError('row must be an object')
+
+    medicine_id = row.get('sku', row.get('medicine_id'))
+    name = row.get('name') or ''
+    strength = row.get('strength') or ''
+    if not isinstance(name, str) or not isinstance(strength, str):
+        raise InventoryUpdateError('name and strength must be text')
+    name = name.strip()
+    if medicine_id not in (None, ''):
+        try:
+            medicine_id = int(medicine_id)
+        except (TypeError, ValueError):
+            raise InventoryUpdateError('sku must be a medicine id')
+    elif name:
+        medicine_id = None
+    else:
+        raise InventoryUpdateError('sku or name is required')
+
+    try:
+        stock_qty = int(row['stock_qty']) if row.get('stock_qty') not in (None, '') else None
+        price = float(row['price']) if row.get('price') not in (None, '') else None
+        mrp = float(row['mrp']) if row.get('mrp') not in (None, '') else None
+    except (TypeError, ValueError):
+        raise InventoryUpdateError('stock_qty, price and mrp must be numbers')
+    if any(value is not None and not math.isfinite(value) for value in (price, mrp)):
+        raise InventoryUpdateError('price and mrp must be finite numbers')
+    if stock_qty is not None and stock_qty < 0:
+        raise InventoryUpdateError('stock_qty must be 0 or more')
+    if price is not None and price <= 0:
+        raise InventoryUpdateError('price must be greater than 0')
+    if mrp is not None and mrp < 0:
+        raise InventoryUpdateError('mrp must be 0 or more')
+
+    available = row.get('available')
+    if available not in (None, ''):
+        text = str(available).strip().lower()
+        if text in _TRUE_VALUES:
+            available = 1
+        elif text in _FALSE_VALUES:
+            available = 0
+        else:
+            raise InventoryUpdateError('available must be true or false')
+    else:
+        available = None
+
+    if stock_qty is None and price is None and mrp is None and available is None:
+        raise InventoryUpdateError(f"nothing to update (expected one of {', '.join(_UPDATE_FIELDS)})")
+    return medicine_id, name.lower(), strength.strip().lower(), stock_qty, price, mrp, available
+
+
+_PATCH_DDL = (
+    """
+    CREATE TEMP TABLE IF NOT EXISTS inventory_patch (
+        row_no INTEGER PRIMARY KEY,
+        medicine_id INTEGER,
+        name_key,  -- untyped: a TEXT affinity here would stop the LOWER(TRIM(name)) index matching
+        strength_key,
+        stock_qty INTEGER,
+        price REAL,
+        mrp REAL,
+        available INTEGER,
+        resolved_id INTEGER,
+        superseded INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS temp.idx_inventory_patch_resolved ON inventory_patch(resolved_id, row_no)",
+)
+
+
+def _apply_chunk(conn, pharmacy_id, chunk):
+    """Apply one chunk in a single transaction; returns {row_no: (medicine_id or None, superseded)}."""
+    cur = conn.cursor()
+    cur.execute("DELETE FROM inventory_patch")
+    cur.executemany("INSERT INTO inventory_patch VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, 0)", chunk)
+
+    # Resolve ids and names against this pharmacy only (idx_medicines_pharmacy_name covers the name path).
+    cur.execute(
+        """
+        UPDATE inventory_patch SET resolved_id = CASE
+            WHEN medicine_id IS NOT NULL THEN
+                (SELECT m.id FROM medicines m WHERE m.id = inventory_patch.medicine_id AND m.pharmacy_id = ?)
+            ELSE
+                (SELECT m.id FROM medicines m
+                 WHERE LOWER(TRIM(m.name)) = inventory_patch.name_key AND m.pharmacy_id = ?
+                   AND (inventory_patch.strength_key = '' OR LOWER(TRIM(COALESCE(m.strength, ''))) = inventory_patch.strength_key)
+                 ORDER BY m.id LIMIT 1)
+        END
+        """,
+        (pharmacy_id, pharmacy_id),
+    )
+    # The last row for a medicine wins; earlier ones in the same chunk are reported as superseded.
+    cur.execute(
+        """
+        UPDATE inventory_patch SET superseded = 1
+        WHERE resolved_id IS NOT NULL AND row_no < (
+            SELECT MAX(p.row_no) FROM inventory_patch p WHERE p.resolved_id = inventory_patch.resolved_id
+        )
+        """
+    )
+    cur.execute(
+        """
+        UPDATE medicines SET
+            stock_qty = COALESCE(p.stock_qty, medicines.stock_qty),
+            price = COALESCE(p.price, medicines.price),
+            mrp = MAX(COALESCE(p.mrp, medicines.mrp, 0), COALESCE(p.price, medicines.price)),
+            available = COALESCE(p.available, medicines.available)
+        FROM inventory_patch p
+        WHERE p.resolved_id = medicines.id AND p.superseded = 0
+        """
+    )
+    # Keep generated discount labels in step with the new prices; custom offer text is left alone.
+    cur.execute(
+        """
+        UPDATE medicines SET offer_text = CASE
+            WHEN mrp > price THEN CAST(ROUND((mrp - price) * 100.0 / mrp) AS INTEGER) || '% OFF'
+            ELSE 'Best Price'
+        END
+        WHERE id IN (
+            SELECT resolved_id FROM inventory_patch
+            WHERE superseded = 0 AND (price IS NOT NULL OR mrp IS NOT NULL)
+        )
+        AND (COALESCE(offer_text, '') IN ('', 'Best Price') OR offer_text GLOB '*[0-9]% OFF')
+        """
+    )
+    cur.execute("SELECT row_no, resolved_id, superseded FROM inventory_patch")
+    outcome = {r['row_no']: (r['resolved_id'], bool(r['superseded'])) for r in cur.fetchall()}
+    conn.commit()
+    return outcome
+
+
+def apply_inventory_updates(conn, pharmacy_id, rows, chunk_size=2000):
+    """
+    Apply stock/price/availability changes for one pharmacy. Rows identify a
+    medicine by `sku` (the medicine id) or by name plus optional strength.
+    Each chunk commits on its own, so a large batch never holds the write
+    lock for long; per-row results report what happened to every row.
+    """
+    results = [None] * len(rows)
+    parsed = []
+    for index, row in enumerate(rows):
+        try:
+            parsed.append((index, *_parse_update_row(row)))
+        except InventoryUpdateError as err:
+            results[index] = {'row': index, 'status': 'invalid', 'message': str(err)}
+
+    for statement in _PATCH_DDL:
+        conn.execute(statement)
+    for start in range(0, len(parsed), chunk_size):
+        outcome = _apply_chunk(conn, pharmacy_id, parsed[start:start + chunk_size])
+        for row_no, (medicine_id, superseded) in outcome.items():
+            if medicine_id is None:
+                results[row_no] = {'row': row_no, 'status': 'not_found', 'message': 'No matching medicine for pharmacy'}
+            elif superseded:
+                results[row_no] = {'row': row_no, 'status': 'superseded', 'medicine_id': medicine_id}
+            else:
+                results[row_no] = {'row': row_no, 'status': 'updated', 'medicine_id': medicine_id}
+    conn.execute("DROP TABLE IF EXISTS temp.inventory_patch")
+
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return {'summary': summary, 'results': results}
@@ -0,0 +1,236 @@
+"""
+Durable background jobs for Smart Medicine Delivery Network
+Jobs are rows in the jobs table. Worker threads claim them with an atomic
+UPDATE-based lease (renewed while the handler runs), retry failures with
+exponential backoff and move jobs that run out of attempts, including ones
+whose worker died on the last attempt, to the 'dead' state for inspection.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+
+from config import Config
+from db import get_connection
+
+_handlers = {}
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+# A forked child inherits the list but not the threads; let it start its own.
+os.register_at_fork(after_in_child=_workers.clear)
+
+
+class Job:
+    """A registered job handler; call .enqueue(...) from routes to run it in the background."""
+
+    def __init__(self, name, fn, max_attempts):
+        self.name = name
+        self.fn = fn
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def enqueue(self, *args, conn=None, delay_seconds=0, **kwargs):
+        return enqueue(self.name, args, kwargs, conn=conn, delay_seconds=delay_seconds, max_attempts=self.max_attempts)
+
+
+def job(name, max_attempts=None):
+    """Decorator registering fn as background job `name`."""
+    def decorator(fn):
+        registered = Job(name, fn, max_attempts or Config.JOB_MAX_ATTEMPTS)
+        _handlers[name] = registered
+        return registered
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, conn=None, delay_seconds=0, max_attempts=None):
+    """
+    Insert a job row. Pass `conn` to enqueue inside the caller's transaction (the
+    job becomes visible when the caller commits, and the caller should then call
+    wake_workers()); otherwise it is committed here. Returns the job id.
+    """
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs or {}})
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO jobs (name, payload, state, attempts, max_attempts, run_after)
+        VALUES (?, ?, 'queued', 0, ?, ?)
+        """,
+        (name, payload, max_attempts or Config.JOB_MAX_ATTEMPTS, time.time() + delay_seconds),
+    )
+    job_id = cur.lastrowid
+    if own_conn:
+        conn.commit()
+        conn.close()
+        wake_workers()
+    return job_id
+
+
+def wake_workers():
+    """Have idle workers look for due jobs now rather than at their next poll."""
+    _wakeup.set()
+
+
+def _claim_next_job(cur):
+    # Single UPDATE picks and leases a due job, so concurrent workers never share one.
+    # Running jobs whose lease expired (worker died) become claimable again while attempts remain.
+    now = time.time()
+    cur.execute(
+        """
+        UPDATE jobs
+        SET state = 'running', attempts = attempts + 1, locked_until = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = (
+            SELECT id FROM jobs
+            WHERE (state = 'queued' AND run_after <= ?)
+               OR (state = 'running' AND locked_until < ? AND attempts < max_attempts)
+            ORDER BY run_after, id
+            LIMIT 1
+        )
+        RETURNING id, name, payload, attempts, max_attempts
+        """,
+        (now + Config.JOB_LEASE_SECONDS, now, now),
+    )
+    return cur.fetchone()
+
+
+def _dead_letter_abandoned_jobs(cur):
+    # A job that kills or hangs its worker on every attempt must not be reclaimed forever.
+    cur.execute(
+        """
+        UPDATE jobs
+        SET state = 'dead', locked_until = NULL, last_error = 'Lease expired on the final attempt',
+            updated_at = CURRENT_TIMESTAMP
+        WHERE state = 'running' AND locked_until < ? AND attempts >= max_attempts
+        """,
+        (time.time(),),
+    )
+
+
+class _LeaseRenewer:
+    """Extend a running job's lease until stop(), so a slow handler is not claimed and run twice."""
+
+    def __init__(self, job_id, attempts):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(job_id, attempts), name=f"jobs-lease-{job_id}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, job_id, attempts):
+        while not self._stop.wait(max(1.0, Config.JOB_LEASE_SECONDS / 3)):
+            try:
+                conn = get_connection()
+                # attempts identifies this claim: a reclaim by another worker bumps it.
+                conn.execute(
+                    "UPDATE jobs SET locked_until = ? WHERE id = ? AND state = 'running' AND attempts = ?",
+                    (time.time() + Config.JOB_LEASE_SECONDS, job_id, attempts),
+                )
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"Job {job_id} lease renewal failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def _retry_delay_seconds(attempts):
+    base = Config.JOB_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    return min(Config.JOB_RETRY_MAX_SECONDS, base) * random.uniform(0.5, 1.0)
+
+
+def run_pending_jobs(max_jobs=50):
+    """Claim and run due jobs. Returns the number of jobs attempted."""
+    attempted = 0
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        _dead_letter_abandoned_jobs(cur)
+        conn.commit()
+        while attempted < max_jobs:
+            row = _claim_next_job(cur)
+            conn.commit()
+            if not row:
+                break
+            attempted += 1
+
+            handler = _handlers.get(row['name'])
+            renewer = _LeaseRenewer(row['id'], row['attempts'])
+            error = None
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler registered for job '{row['name']}'")
+                payload = json.loads(row['payload'] or '{}')
+                handler(*payload.get('args', []), **payload.get('kwargs', {}))
+            except Exception as e:
+                error = e
+            finally:
+                renewer.stop()
+
+            if error is None:
+                cur.execute(
+                    "UPDATE jobs SET state = 'done', locked_until = NULL, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (row['id'],),
+                )
+            elif row['attempts'] >= row['max_attempts']:
+                cur.execute(
+                    """
+                    UPDATE jobs SET state = 'dead', locked_until = NULL, last_error = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                    """,
+                    (str(error)[:500], row['id']),
+                )
+                print(f"Job {row['id']} ({row['name']}) dead-lettered: {error}")
+            else:
+                cur.execute(
+                    """
+                    UPDATE jobs
+                    SET state = 'queued', locked_until = NULL, run_after = ?, last_error = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                    """,
+                    (time.time() + _retry_delay_seconds(row['attempts']), str(error)[:500], row['id']),
+                )
+            conn.commit()
+    finally:
+        conn.close()
+    return attempted
+
+
+def _worker_loop():
+    while True:
+        _wakeup.wait(Config.JOB_POLL_SECONDS)
+        _wakeup.clear()
+        try:
+            while run_pending_jobs():
+                pass
+        except Exception as e:
+            print(f"Job worker error: {e}")
+
+
+def start_job_workers(count=None):
+    """Start the worker pool once per process."""
+    count = Config.JOB_WORKERS if count is None else count
+    with _workers_lock:
+        if _workers:
+            return
+        for idx in range(count):
+            worker = threading.Thread(target=_worker_loop, name=f"jobs-{idx}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def job_counts():
+    """Row counts per state, for health checks."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT state, COUNT(*) AS c FROM jobs GROUP BY state")
+    counts = {r['state']: r['c'] for r in cur.fetchall()}
+    conn.close()
+    return counts
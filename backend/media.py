@@ -0,0 +1,317 @@
+"""
+Image proxy cache for Smart Medicine Delivery Network
+Upstream medicine images (PubChem, seller CDNs) are fetched once, stored on
+disk under their SHA-256 and resized to fixed thumbnail sizes, so product
+cards load from this server with strong ETags instead of hitting a slow
+third-party host per card. Concurrent requests for the same URL or thumbnail
+share one fetch/resize. Only hosts that resolve to public addresses are
+fetched (redirects included), since image URLs come from sellers.
+"""
+
+import hashlib
+import io
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from config import Config
+from http_client import UpstreamError, request as upstream_request
+
+# Fixed bounding boxes (px) a thumbnail is fitted into; 'full' serves the original bytes.
+THUMB_SIZES = {'thumb': 128, 'card': 320}
+DEFAULT_SIZE = 'card'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_MAGIC_TYPES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+_SOURCE_MEMO_MAX = 4096
+_FAILURE_MEMO_MAX = 4096
+# Hosts get their own breaker and counters up to this many; later ones share 'media:other'.
+_MEDIA_HOSTS_MAX = 64
+_MAX_REDIRECTS = 3
+
+_flights = {}
+_flights_lock = threading.Lock()
+_sources = {}
+_failures = {}
+_media_hosts = set()
+_memo_lock = threading.Lock()
+
+
+class MediaError(Exception):
+    """Raised when an image cannot be fetched or served; carries the HTTP status for the route."""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class MediaFile:
+    """A cached file on disk plus the headers needed to serve it."""
+
+    def __init__(self, path, content_type, etag):
+        self.path = path
+        self.content_type = content_type
+        self.etag = etag
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def cache_dir():
+    path = Config.MEDIA_CACHE_DIR
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    return path
+
+
+def is_proxyable(url):
+    return urlsplit(url or '').scheme in ('http', 'https')
+
+
+def source_version(url):
+    """Short, stable token for a source URL; clients put it in ?v= so the proxy URL changes with the image."""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]
+
+
+def medicine_media_url(medicine_id, source_url, size=None):
+    """Proxy URL for a medicine image, or the source unchanged when it is not an http(s) URL."""
+    if not Config.MEDIA_PROXY_IMAGES or not is_proxyable(source_url):
+        return source_url
+    url = f"/media/medicine/{medicine_id}?v={source_version(source_url)}"
+    return f"{url}&size={size}" if size and size != DEFAULT_SIZE else url
+
+
+def _single_flight(key, fn):
+    """Run fn once per key at a time; callers that arrive while it runs wait for and share its result."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if not flight.done.wait(Config.MEDIA_FETCH_TIMEOUT_SECONDS * 2):
+            raise MediaError('Timed out waiting for image fetch', 504)
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = fn()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _object_path(digest):
+    return os.path.join(cache_dir(), 'objects', digest[:2], digest)
+
+
+def _thumb_path(digest, size):
+    return os.path.join(cache_dir(), 'thumbs', digest[:2], f"{digest}-{size}.webp")
+
+
+def _source_path(url_key):
+    return os.path.join(cache_dir(), 'sources', url_key[:2], f"{url_key}.json")
+
+
+def _sniff_content_type(data):
+    for magic, content_type in _MAGIC_TYPES:
+        if data.startswith(magic):
+            return content_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    # SVG and anything else is refused: serving upstream markup from our origin would allow script injection.
+    return None
+
+
+def _check_public_host(url):
+    """Refuse URLs whose host resolves to a loopback, private, link-local or otherwise non-public address."""
+    if Config.MEDIA_ALLOW_PRIVATE_HOSTS:
+        return
+    parts = urlsplit(url)
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        infos = socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+    except (OSError, UnicodeError, ValueError) as e:
+        raise MediaError(f'Image host could not be resolved: {e}')
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%')[0])
+        if not address.is_global or address.is_multicast:
+            raise MediaError('Image host is not a public address', 403)
+
+
+def _host_dependency(host):
+    with _memo_lock:
+        if host in _media_hosts:
+            return f"media:{host}"
+        if len(_media_hosts) < _MEDIA_HOSTS_MAX:
+            _media_hosts.add(host)
+            return f"media:{host}"
+    return 'media:other'
+
+
+def _download(url):
+    # Redirects are followed here, not by requests, so every hop gets the public-address check.
+    for _ in range(_MAX_REDIRECTS + 1):
+        _check_public_host(url)
+        try:
+            response = upstream_request(
+                _host_dependency(urlsplit(url).hostname or 'unknown'), 'GET', url, stream=True, retries=1,
+                allow_redirects=False, timeout=(3.0, Config.MEDIA_FETCH_TIMEOUT_SECONDS),
+                headers={'Accept': 'image/avif,image/webp,image/png,image/jpeg,image/*;q=0.8'},
+            )
+        except UpstreamError as e:
+            raise MediaError(f'Image fetch failed: {e}') from e
+        if not response.is_redirect:
+            break
+        location = response.headers.get('Location', '')
+        response.close()
+        url = urljoin(url, location)
+        if not is_proxyable(url):
+            raise MediaError('Image redirect to an unsupported URL')
+    else:
+        raise MediaError('Image fetch failed: too many redirects')
+
+    try:
+        if response.status_code != 200:
+            raise MediaError(f'Image fetch failed: HTTP {response.status_code}')
+        chunks, total = [], 0
+        for chunk in response.iter_content(64 * 1024):
+            total += len(chunk)
+            if total > Config.MEDIA_MAX_BYTES:
+                raise MediaError('Upstream image is too large')
+            chunks.append(chunk)
+    finally:
+        response.close()
+    return b''.join(chunks)
+
+
+def _remember_failure(url):
+    now = time.monotonic()
+    with _memo_lock:
+        if len(_failures) >= _FAILURE_MEMO_MAX:
+            for key in [k for k, retry_at in _failures.items() if retry_at <= now]:
+                del _failures[key]
+            # Still full of live entries: forget the oldest (dicts keep insertion order).
+            while len(_failures) >= _FAILURE_MEMO_MAX:
+                del _failures[next(iter(_failures))]
+        _failures.pop(url, None)
+        _failures[url] = now + Config.MEDIA_FAILURE_TTL_SECONDS
+
+
+def _fetch_source(url, url_key):
+    retry_at = _failures.get(url)
+    if retry_at is not None and retry_at > time.monotonic():
+        raise MediaError('Image fetch failed recently; not retrying yet')
+
+    try:
+        data = _download(url)
+        content_type = _sniff_content_type(data)
+        if content_type is None:
+            raise MediaError('Upstream URL did not return a supported image')
+    except MediaError:
+        _remember_failure(url)
+        raise
+
+    digest = hashlib.sha256(data).hexdigest()
+    object_path = _object_path(digest)
+    if not os.path.exists(object_path):
+        _write_atomic(object_path, data)
+    entry = {'url': url, 'digest': digest, 'content_type': content_type, 'bytes': len(data),
+             'fetched_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+    _write_atomic(_source_path(url_key), json.dumps(entry).encode('utf-8'))
+    with _memo_lock:
+        _failures.pop(url, None)
+    return entry
+
+
+def _source_entry(url):
+    """Cached {digest, content_type, ...} for a source URL, fetching it on first use."""
+    entry = _sources.get(url)
+    if entry is not None:
+        return entry
+
+    url_key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    try:
+        with open(_source_path(url_key), 'rb') as f:
+            entry = json.loads(f.read())
+    except (OSError, ValueError):
+        entry = None
+    if entry is None or not os.path.exists(_object_path(entry['digest'])):
+        entry = _single_flight(('source', url), lambda: _fetch_source(url, url_key))
+
+    with _memo_lock:
+        if len(_sources) >= _SOURCE_MEMO_MAX:
+            _sources.clear()
+        _sources[url] = entry
+    return entry
+
+
+def _make_thumbnail(digest, size):
+    try:
+        from PIL import Image  # optional dependency
+    except ImportError:
+        return None
+
+    box = THUMB_SIZES[size]
+    with Image.open(_object_path(digest)) as image:
+        image.seek(0)
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        image.thumbnail((box, box), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, 'WEBP', quality=82, method=4)
+    _write_atomic(_thumb_path(digest, size), out.getvalue())
+    return _thumb_path(digest, size)
+
+
+def get_image(url, size=DEFAULT_SIZE):
+    """
+    MediaFile for `url` at `size` ('full' or a THUMB_SIZES key).
+    Falls back to the original when Pillow is not installed or the image cannot be decoded.
+    """
+    if not is_proxyable(url):
+        raise MediaError('Image URL is not proxyable', 404)
+    entry = _source_entry(url)
+    digest = entry['digest']
+    original = MediaFile(_object_path(digest), entry['content_type'], digest)
+    if size == 'full':
+        return original
+
+    thumb_path = _thumb_path(digest, size)
+    if not os.path.exists(thumb_path):
+        try:
+            thumb_path = _single_flight(('thumb', digest, size), lambda: _make_thumbnail(digest, size))
+        except Exception as e:
+            print(f"[MEDIA] thumbnail failed for {digest[:12]} ({size}): {e}")
+            thumb_path = None
+        if thumb_path is None:
+            return original
+    return MediaFile(thumb_path, 'image/webp', f"{digest}-{size}")
@@ -0,0 +1,134 @@
+"""
+Password hashing for Smart Medicine Delivery Network
+scrypt (or PBKDF2-SHA256) hashes computed on a small bounded thread pool so
+a login spike cannot occupy every request thread. hashlib releases the GIL
+while hashing, so pool threads run in parallel with request handling.
+Legacy plaintext passwords verify once and are flagged for rehashing.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_MAX_QUEUE)
+
+
+def _reset_after_fork():
+    # The parent's hashing threads (and the slots they held) do not exist in a forked child.
+    global _executor, _slots
+    _executor = None
+    _slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_MAX_QUEUE)
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode('ascii')
+
+
+def _current_params():
+    if Config.PASSWORD_HASH_SCHEME == 'pbkdf2_sha256':
+        return ('pbkdf2_sha256', Config.PASSWORD_PBKDF2_ITERATIONS)
+    return ('scrypt', Config.PASSWORD_SCRYPT_N, Config.PASSWORD_SCRYPT_R, Config.PASSWORD_SCRYPT_P)
+
+
+def _derive(password, salt, params):
+    scheme = params[0]
+    secret = password.encode('utf-8')
+    if scheme == 'scrypt':
+        n, r, p = params[1:]
+        # maxmem must cover 128 * n * r bytes plus OpenSSL's working overhead.
+        return hashlib.scrypt(secret, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=32)
+    if scheme == 'pbkdf2_sha256':
+        return hashlib.pbkdf2_hmac('sha256', secret, salt, params[1])
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
+
+
+def _parse(stored):
+    """'scrypt$16384$8$1$<salt>$<hash>' -> (params, salt, digest); None for legacy plaintext."""
+    parts = (stored or '').split('$')
+    try:
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            params = ('scrypt', int(parts[1]), int(parts[2]), int(parts[3]))
+        elif parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            params = ('pbkdf2_sha256', int(parts[1]))
+        else:
+            return None
+        return params, base64.b64decode(parts[-2]), base64.b64decode(parts[-1])
+    except ValueError:
+        return None
+
+
+def hash_password_sync(password, params=None):
+    params = params or _current_params()
+    salt = os.urandom(16)
+    digest = _derive(password, salt, params)
+    return '$'.join([str(v) for v in params] + [_b64(salt), _b64(digest)])
+
+
+def verify_password_sync(password, stored):
+    """(matches, needs_rehash). Plaintext rows and outdated parameters need a rehash."""
+    parsed = _parse(stored)
+    if parsed is None:
+        matches = bool(stored) and hmac.compare_digest((stored or '').encode('utf-8'), password.encode('utf-8'))
+        return matches, matches
+    params, salt, digest = parsed
+    matches = hmac.compare_digest(_derive(password, salt, params), digest)
+    return matches, matches and params != _current_params()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash'
+                )
+    return _executor
+
+
+def _run_bounded(fn, *args):
+    # Running + queued work is capped; beyond that, fail fast instead of piling up.
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy('Too many logins in progress')
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _f: _slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    return _run_bounded(hash_password_sync, password)
+
+
+def verify_password(password, stored):
+    return _run_bounded(verify_password_sync, password, stored)
+
+
+# Used when the account does not exist, so response time does not reveal which emails are registered.
+_DUMMY_HASH = None
+
+
+def verify_unknown_user(password):
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password('dummy-password')
+    verify_password(password, _DUMMY_HASH)
+    return False, False
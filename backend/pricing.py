@@ -0,0 +1,400 @@
+"""
+Pricing engine for Smart Medicine Delivery Network
+Loads quantity-discount tiers and delivery fees from the pricing_rules table,
+compiles them into an in-memory lookup and prices whole carts in one query.
+"""
+
+import string
+import threading
+import time
+
+from config import Config
+from db import get_connection, RULE_QUANTITY_DISCOUNT, RULE_DISTANCE_SURCHARGE, RULE_EXPRESS_FEE
+from helpers import calculate_distance, estimate_delivery_minutes
+
+_rules_lock = threading.Lock()
+_compiled_rules = None
+_compiled_at = 0.0
+
+
+class QuoteError(ValueError):
+    """Raised when a cart cannot be quoted at all (bad input, unknown pharmacy)."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class PricingRules:
+    """Compiled, immutable view of the pricing_rules table."""
+
+    def __init__(self, discount_tiers, surcharge_tiers, express_fee):
+        # Tiers are (threshold, amount) pairs sorted by threshold descending.
+        # Whole-number percents stay ints so API payloads match the old responses.
+        self.discount_tiers = sorted(
+            ((t, int(p) if float(p).is_integer() else p) for t, p in discount_tiers), reverse=True
+        )
+        self.surcharge_tiers = sorted(surcharge_tiers, reverse=True)
+        self.express_fee = float(express_fee)
+
+        # Direct index for every quantity up to the highest tier; larger
+        # quantities fall through to the top tier.
+        max_threshold = int(self.discount_tiers[0][0]) if self.discount_tiers else 0
+        self._discount_by_quantity = [self._scan_discount(q) for q in range(max_threshold + 1)]
+        self._top_discount = self.discount_tiers[0][1] if self.discount_tiers else 0
+
+    def _scan_discount(self, quantity):
+        for min_quantity, percent in self.discount_tiers:
+            if quantity >= min_quantity:
+                return percent
+        return 0
+
+    def discount_percent(self, quantity):
+        quantity = int(quantity or 0)
+        if quantity < 0:
+            return 0
+        if quantity < len(self._discount_by_quantity):
+            return self._discount_by_quantity[quantity]
+        return self._top_discount
+
+    def distance_surcharge(self, distance_km):
+        for min_distance, amount in self.surcharge_tiers:
+            if distance_km > min_distance:
+                return float(amount)
+        return 0.0
+
+    def to_dict(self):
+        return {
+            'quantity_discounts': [
+                {'min_quantity': int(t), 'percent': p} for t, p in sorted(self.discount_tiers)
+            ],
+            'distance_surcharges': [
+                {'above_km': t, 'amount': a} for t, a in sorted(self.surcharge_tiers)
+            ],
+            'express_fee': self.express_fee,
+        }
+
+
+def _load_pricing_rules():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT rule_type, threshold, amount FROM pricing_rules WHERE is_active = 1")
+    rows = cur.fetchall()
+    conn.close()
+
+    discount_tiers = []
+    surcharge_tiers = []
+    express_fee = 0.0
+    for r in rows:
+        threshold = float(r['threshold'] or 0)
+        amount = float(r['amount'] or 0)
+        if r['rule_type'] == RULE_QUANTITY_DISCOUNT:
+            discount_tiers.append((threshold, amount))
+        elif r['rule_type'] == RULE_DISTANCE_SURCHARGE:
+            surcharge_tiers.append((threshold, amount))
+        elif r['rule_type'] == RULE_EXPRESS_FEE:
+            express_fee = amount
+    return PricingRules(discount_tiers, surcharge_tiers, express_fee)
+
+
+def get_pricing_rules():
+    """Return compiled rules, reloading from the database once the TTL has passed."""
+    global _compiled_rules, _compiled_at
+    rules = _compiled_rules
+    if rules is not None and time.monotonic() - _compiled_at < Config.PRICING_RULES_TTL_SECONDS:
+        return rules
+
+    with _rules_lock:
+        if _compiled_rules is None or time.monotonic() - _compiled_at >= Config.PRICING_RULES_TTL_SECONDS:
+            _compiled_rules = _load_pricing_rules()
+            _compiled_at = time.monotonic()
+        return _compiled_rules
+
+
+def invalidate_pricing_rules():
+    """Drop the compiled rules so the next lookup reloads pricing_rules."""
+    global _compiled_rules
+    with _rules_lock:
+        _compiled_rules = None
+
+
+def get_quantity_discount_percent(quantity):
+    # Higher quantity => better unit price.
+    return get_pricing_rules().discount_percent(quantity)
+
+
+def get_discounted_unit_price(base_price, quantity):
+    discount_percent = get_quantity_discount_percent(quantity)
+    discounted = float(base_price) * (1 - discount_percent / 100.0)
+    return round(discounted, 2), discount_percent
+
+
+def _normalize_cart_items(items):
+    """Validate raw cart items and merge repeated medicine ids, keeping cart order."""
+    if not isinstance(items, list) or not items:
+        raise QuoteError('pharmacy_id and items are required')
+
+    quantities = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise QuoteError('Each item requires medicine_id and positive quantity')
+        try:
+            medicine_id = int(item.get('medicine_id') or 0)
+            quantity = int(item.get('quantity', 0))
+        except (TypeError, ValueError):
+            raise QuoteError('Each item requires medicine_id and positive quantity')
+        if medicine_id <= 0 or quantity <= 0:
+            raise QuoteError('Each item requires medicine_id and positive quantity')
+        quantities[medicine_id] = quantities.get(medicine_id, 0) + quantity
+    return list(quantities.items())
+
+
+def price_line(rules, medicine_id, base_price, quantity):
+    discount_percent = rules.discount_percent(quantity)
+    unit_price = round(float(base_price) * (1 - discount_percent / 100.0), 2)
+    line_total = unit_price * quantity
+    return {
+        'medicine_id': medicine_id,
+        'quantity': quantity,
+        'base_unit_price': round(float(base_price), 2),
+        'unit_price': unit_price,
+        'discount_percent': discount_percent,
+        'line_total': round(line_total, 2),
+        'line_discount': round(max(0.0, float(base_price) * quantity - line_total), 2),
+    }
+
+
+def quote_totals(rules, subtotal, distance_km, is_express):
+    distance_surcharge = rules.distance_surcharge(distance_km) if distance_km is not None else 0.0
+    express_fee = rules.express_fee if is_express else 0.0
+    return distance_surcharge, express_fee, subtotal + distance_surcharge + express_fee
+
+
+def quote_cart(cur, pharmacy_id, items, customer_lat=None, customer_lng=None, is_express=False):
+    """
+    Price and stock-check a whole cart for one pharmacy.
+    Uses a single batched medicines query; per-line problems are reported in
+    each line's `issue` field instead of aborting the quote.
+    """
+    if not pharmacy_id:
+        raise QuoteError('pharmacy_id and items are required')
+    try:
+        pharmacy_id = int(pharmacy_id)
+    except (TypeError, ValueError):
+        raise QuoteError('pharmacy_id must be an integer')
+    cart = _normalize_cart_items(items)
+    rules = get_pricing_rules()
+
+    cur.execute("SELECT id, lat, lng FROM pharmacies WHERE id = ?", (pharmacy_id,))
+    pharmacy = cur.fetchone()
+    if not pharmacy:
+        raise QuoteError('Pharmacy not found', 404)
+
+    medicine_ids = [medicine_id for medicine_id, _quantity in cart]
+    placeholders = ",".join("?" for _ in medicine_ids)
+    cur.execute(
+        f"""
+        SELECT id, name, price, stock_qty
+        FROM medicines
+        WHERE pharmacy_id = ? AND id IN ({placeholders})
+        """,
+        (pharmacy_id, *medicine_ids),
+    )
+    medicines_by_id = {r['id']: r for r in cur.fetchall()}
+
+    lines = []
+    subtotal = 0.0
+    total_discount = 0.0
+    for medicine_id, quantity in cart:
+        med = medicines_by_id.get(medicine_id)
+        if not med:
+            lines.append({'medicine_id': medicine_id, 'quantity': quantity, 'issue': 'not_found'})
+            continue
+        line = price_line(rules, medicine_id, med['price'], quantity)
+        line['name'] = med['name']
+        line['stock_qty'] = int(med['stock_qty'] or 0)
+        line['issue'] = None if line['stock_qty'] >= quantity else 'insufficient_stock'
+        subtotal += line['unit_price'] * quantity
+        total_discount += line['line_discount']
+        lines.append(line)
+
+    distance_km = None
+    if customer_lat is not None and customer_lng is not None:
+        distance_km = calculate_distance(customer_lat, customer_lng, float(pharmacy['lat']), float(pharmacy['lng']))
+    distance_surcharge, express_fee, total = quote_totals(rules, subtotal, distance_km, is_express)
+
+    return {
+        'pharmacy_id': pharmacy['id'],
+        'items': lines,
+        'subtotal_amount': round(subtotal, 2),
+        'quantity_discount_amount': round(total_discount, 2),
+        'distance_km': distance_km if distance_km is not None else 0.0,
+        'distance_surcharge': round(distance_surcharge, 2),
+        'express_fee': round(express_fee, 2),
+        'is_express': bool(is_express),
+        'total_amount': round(total, 2),
+        'can_checkout': all(line['issue'] is None for line in lines),
+    }
+
+
+# SQLite's LOWER() folds ASCII only and TRIM() strips spaces only.
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def normalize_medicine_key(name, strength=None):
+    """
+    (name, strength) key used to match the same product across pharmacies.
+    The name part equals SQL LOWER(TRIM(name)), so it can be looked up through
+    the idx_medicines_name_norm index and compared with rows from it.
+    """
+    norm_name = (name or '').strip(' ').translate(_ASCII_LOWER)
+    if strength is None:
+        return norm_name, None
+    return norm_name, (strength or '').lower().replace(' ', '')
+
+
+def _normalize_compare_items(cur, items):
+    """
+    Resolve a cart of medicine ids and/or names into [(key, quantity, label)].
+    Items given by id are mapped to their (name, strength) key with one query.
+    """
+    if not isinstance(items, list) or not items:
+        raise QuoteError('items are required')
+
+    resolved = []
+    id_items = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise QuoteError('Each item requires medicine_id or name and positive quantity')
+        try:
+            quantity = int(item.get('quantity', 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity <= 0:
+            raise QuoteError('Each item requires medicine_id or name and positive quantity')
+
+        name = item.get('name') or ''
+        strength = item.get('strength')
+        if not isinstance(name, str) or not (strength is None or isinstance(strength, str)):
+            raise QuoteError('Item name and strength must be strings')
+        name = name.strip()
+        if item.get('medicine_id'):
+            try:
+                id_items.append((int(item['medicine_id']), quantity, len(resolved)))
+            except (TypeError, ValueError):
+                raise QuoteError('Each item requires medicine_id or name and positive quantity')
+            resolved.append(None)
+        elif name:
+            resolved.append((normalize_medicine_key(name, strength), quantity, name))
+        else:
+            raise QuoteError('Each item requires medicine_id or name and positive quantity')
+
+    if id_items:
+        placeholders = ",".join("?" for _ in id_items)
+        cur.execute(
+            f"SELECT id, name, strength FROM medicines WHERE id IN ({placeholders})",
+            tuple(medicine_id for medicine_id, _q, _pos in id_items),
+        )
+        by_id = {r['id']: r for r in cur.fetchall()}
+        for medicine_id, quantity, pos in id_items:
+            row = by_id.get(medicine_id)
+            if not row:
+                raise QuoteError(f'Medicine {medicine_id} not found', 404)
+            resolved[pos] = (normalize_medicine_key(row['name'], row['strength']), quantity, row['name'])
+
+    # Merge duplicate keys so each product is priced once at its combined quantity.
+    merged = {}
+    for key, quantity, label in resolved:
+        if key in merged:
+            merged[key] = (merged[key][0] + quantity, merged[key][1])
+        else:
+            merged[key] = (quantity, label)
+    return [(key, quantity, label) for key, (quantity, label) in merged.items()]
+
+
+def compare_pharmacies(cur, items, customer_lat=None, customer_lng=None, is_express=False, sort_by='total'):
+    """
+    Quote the whole cart at every approved pharmacy that stocks any of it.
+    One query loads candidate rows into an index keyed by (name, strength),
+    then a single pass accumulates a full quote per pharmacy.
+    """
+    cart = _normalize_compare_items(cur, items)
+    rules = get_pricing_rules()
+
+    names = sorted({key[0] for key, _q, _label in cart})
+    placeholders = ",".join("?" for _ in names)
+    cur.execute(
+        f"""
+        SELECT m.id, m.name, m.strength, m.price, m.stock_qty, m.pharmacy_id,
+               p.name AS pharmacy_name, p.lat, p.lng, p.rating
+        FROM medicines m
+        JOIN pharmacies p ON p.id = m.pharmacy_id
+        WHERE p.is_approved = 1 AND m.available = 1 AND LOWER(TRIM(m.name)) IN ({placeholders})
+        """,
+        tuple(names),
+    )
+
+    # (name, strength) -> pharmacy_id -> rows; (name, None) also indexes every strength.
+    index = {}
+    pharmacies_by_id = {}
+    for r in cur.fetchall():
+        pharmacies_by_id.setdefault(r['pharmacy_id'], r)
+        name_key, strength_key = normalize_medicine_key(r['name'], r['strength'])
+        for key in ((name_key, strength_key), (name_key, None)):
+            index.setdefault(key, {}).setdefault(r['pharmacy_id'], []).append(r)
+
+    quotes = {}
+    for key, quantity, label in cart:
+        for pharmacy_id, rows in index.get(key, {}).items():
+            quote = quotes.get(pharmacy_id)
+            if quote is None:
+                quote = quotes[pharmacy_id] = {'items': [], 'subtotal': 0.0, 'discount': 0.0, 'missing': [], 'keys': set()}
+            quote['keys'].add(key)
+            stocked = [r for r in rows if int(r['stock_qty'] or 0) >= quantity]
+            if not stocked:
+                quote['missing'].append({'name': label, 'quantity': quantity, 'issue': 'insufficient_stock'})
+                continue
+            row = min(stocked, key=lambda r: float(r['price']))
+            line = price_line(rules, row['id'], row['price'], quantity)
+            line['name'] = row['name']
+            quote['items'].append(line)
+            quote['subtotal'] += line['unit_price'] * quantity
+            quote['discount'] += line['line_discount']
+
+    has_location = customer_lat is not None and customer_lng is not None
+    results = []
+    for pharmacy_id, quote in quotes.items():
+        pharmacy = pharmacies_by_id[pharmacy_id]
+        for key, quantity, label in cart:
+            if key not in quote['keys']:
+                quote['missing'].append({'name': label, 'quantity': quantity, 'issue': 'not_found'})
+
+        distance_km = None
+        if has_location:
+            distance_km = calculate_distance(customer_lat, customer_lng, float(pharmacy['lat']), float(pharmacy['lng']))
+        distance_surcharge, express_fee, total = quote_totals(rules, quote['subtotal'], distance_km, is_express)
+        results.append(
+            {
+                'pharmacy_id': pharmacy_id,
+                'pharmacy_name': pharmacy['pharmacy_name'],
+                'rating': pharmacy['rating'],
+                'items': quote['items'],
+                'missing_items': quote['missing'],
+                'is_complete': not quote['missing'],
+                'subtotal_amount': round(quote['subtotal'], 2),
+                'quantity_discount_amount': round(quote['discount'], 2),
+                'distance_km': distance_km,
+                'distance_surcharge': round(distance_surcharge, 2),
+                'express_fee': round(express_fee, 2),
+                'total_amount': round(total, 2),
+                'eta_minutes': estimate_delivery_minutes(distance_km, is_express),
+            }
+        )
+
+    # Pharmacies that can fill the whole cart always rank ahead of partial matches.
+    if sort_by == 'eta':
+        results.sort(key=lambda x: (len(x['missing_items']), x['eta_minutes'], x['total_amount']))
+    else:
+        results.sort(key=lambda x: (len(x['missing_items']), x['total_amount'], x['eta_minutes']))
+    return results
@@ -0,0 +1,251 @@
+"""
+Rate limiting and admission control for Smart Medicine Delivery Network
+Token buckets per client IP (configured per blueprint or endpoint) and per
+request key (email, phone number), kept in memory or in the shared SQLite
+rate_limit_buckets table when several processes serve the API. Admission
+gates cap how many requests may wait on a paid upstream at once.
+"""
+
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request
+
+from config import Config
+from db import get_connection
+
+
+class RateLimit:
+    """`capacity` requests per `period` seconds, refilled continuously."""
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.rate = self.capacity / self.period
+
+    def __repr__(self):
+        return f"RateLimit({self.capacity:g}/{self.period:g}s)"
+
+
+def parse_limit(spec):
+    """'30/60' -> RateLimit(30 per 60 s)."""
+    count, _, period = (spec or '').strip().partition('/')
+    return RateLimit(int(count), float(period or 1))
+
+
+def parse_limit_table(text):
+    """'support=30/60, auth.login=10/60' -> {'support': RateLimit, 'auth.login': RateLimit}."""
+    table = {}
+    for item in (text or '').split(','):
+        scope, _, spec = item.partition('=')
+        if scope.strip() and spec.strip():
+            table[scope.strip()] = parse_limit(spec)
+    return table
+
+
+class MemoryBucketStore:
+    """Per-process buckets: key -> (tokens, updated_at, period)."""
+
+    PRUNE_INTERVAL_SECONDS = 30.0
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_prune = time.monotonic() + self.PRUNE_INTERVAL_SECONDS
+
+    def take(self, key, limit, cost=1):
+        """Spend `cost` tokens if available. Returns (allowed, tokens_left)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (limit.capacity, now, limit.period))
+            tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now, limit.period)
+            if now >= self._next_prune:
+                self._prune(now)
+                self._next_prune = now + self.PRUNE_INTERVAL_SECONDS
+        return allowed, tokens
+
+    def _prune(self, now):
+        # A bucket idle for its own period is full again and carries no state worth keeping.
+        for key in [k for k, (_, updated_at, period) in self._buckets.items() if now - updated_at >= period]:
+            del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """Buckets shared by every process using the same database file."""
+
+    PRUNE_INTERVAL_SECONDS = 30.0
+
+    def __init__(self):
+        self._next_prune = time.monotonic() + self.PRUNE_INTERVAL_SECONDS
+
+    def take(self, key, limit, cost=1):
+        params = {'key': key, 'capacity': limit.capacity, 'rate': limit.rate, 'cost': cost, 'now': time.time(),
+                  'period': limit.period}
+        conn = get_connection()
+        cur = conn.cursor()
+        # One UPSERT refills, spends and reports the decision atomically.
+        cur.execute(
+            """
+            INSERT INTO rate_limit_buckets (bucket_key, tokens, updated_at, allowed, period)
+            VALUES (:key, :capacity - :cost, :now, 1, :period)
+            ON CONFLICT(bucket_key) DO UPDATE SET
+                allowed = MIN(:capacity, tokens + (:now - updated_at) * :rate) >= :cost,
+                tokens = MIN(:capacity, tokens + (:now - updated_at) * :rate)
+                         - CASE WHEN MIN(:capacity, tokens + (:now - updated_at) * :rate) >= :cost
+                                THEN :cost ELSE 0 END,
+                updated_at = :now,
+                period = :period
+            RETURNING allowed, tokens
+            """,
+            params,
+        )
+        row = cur.fetchone()
+        if time.monotonic() >= self._next_prune:
+            self._next_prune = time.monotonic() + self.PRUNE_INTERVAL_SECONDS
+            # Same rule as MemoryBucketStore: idle for its own period means full again.
+            cur.execute("DELETE FROM rate_limit_buckets WHERE updated_at <= ? - period", (params['now'],))
+        conn.commit()
+        conn.close()
+        return bool(row['allowed']), float(row['tokens'])
+
+
+class RateLimitStats:
+    def __init__(self):
+        self.counts = {}  # scope -> [allowed, limited]
+        self._lock = threading.Lock()
+
+    def record(self, scope, allowed):
+        with self._lock:
+            entry = self.counts.setdefault(scope, [0, 0])
+            entry[0 if allowed else 1] += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {scope: {'allowed': a, 'limited': l} for scope, (a, l) in sorted(self.counts.items())}
+
+
+_store = None
+_store_lock = threading.Lock()
+_stats = RateLimitStats()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteBucketStore() if Config.RATE_LIMIT_STORE == 'sqlite' else MemoryBucketStore()
+    return _store
+
+
+def hit(scope, identity, limit, cost=1):
+    """Spend from the (scope, identity) bucket. Returns 0 when allowed, else seconds to wait."""
+    allowed, tokens = get_bucket_store().take(f"{scope}:{identity}", limit, cost)
+    _stats.record(scope, allowed)
+    if allowed:
+        return 0
+    return max(1, math.ceil((cost - tokens) / limit.rate))
+
+
+def too_many_requests(retry_after, message='Too many requests. Please try again later.'):
+    response = jsonify({'ok': False, 'message': message, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def client_ip():
+    if Config.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.remote_addr or 'unknown'
+
+
+def init_rate_limiting(app):
+    """Apply RATE_LIMITS per client IP. Endpoint entries ('auth.login') win over blueprint entries ('auth')."""
+    limits = parse_limit_table(Config.RATE_LIMITS)
+
+    @app.before_request
+    def _limit_by_ip():
+        if not Config.RATE_LIMIT_ENABLED or request.method == 'OPTIONS':
+            return None
+        scope = request.endpoint if request.endpoint in limits else request.blueprint
+        limit = limits.get(scope)
+        if limit is None:
+            return None
+        retry_after = hit(f"ip:{scope}", client_ip(), limit)
+        if retry_after:
+            return too_many_requests(retry_after)
+        return None
+
+
+def limit_by_field(field, spec):
+    """
+    Decorator: per-key bucket on a request field (JSON body first, then query
+    string), e.g. 10 logins per email per 5 minutes regardless of client IP.
+    """
+    limit = parse_limit(spec)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if Config.RATE_LIMIT_ENABLED:
+                data = request.get_json(silent=True)
+                if not isinstance(data, dict):
+                    data = {}
+                value = str(data.get(field) or request.args.get(field) or '').strip().lower()
+                if value:
+                    retry_after = hit(f"{view.__name__}:{field}", value, limit)
+                    if retry_after:
+                        return too_many_requests(retry_after)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class AdmissionGate:
+    """Non-blocking cap on concurrent calls into a slow upstream; excess requests are shed, not queued."""
+
+    def __init__(self, name, max_in_flight):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def to_dict(self):
+        with self._lock:
+            return {'in_flight': self.in_flight, 'max_in_flight': self.max_in_flight, 'rejected': self.rejected}
+
+
+_gates = {}
+
+
+def get_admission_gate(name, max_in_flight):
+    with _store_lock:
+        return _gates.setdefault(name, AdmissionGate(name, max_in_flight))
+
+
+def rate_limit_report():
+    with _store_lock:
+        gates = {name: gate.to_dict() for name, gate in _gates.items()}
+    return {'store': Config.RATE_LIMIT_STORE, 'scopes': _stats.to_dict(), 'admission': gates}
@@ -0,0 +1,132 @@
+"""
+In-process catalog retrieval for Smart Medicine Delivery Network
+A small BM25 index over medicine name, category and use_for, rebuilt once per
+catalog version, used to give /support/chat a query-specific catalog context.
+"""
+
+import math
+import re
+
+from catalog import cached_for_catalog
+from db import get_connection
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Filler words (English + common Hinglish) that carry no product signal.
+STOPWORDS = frozenset(
+    """
+    a an and are for i in is it me my of on or the to with what which how
+    hai hain ho ka ke ki ko kya koi kaun kaise kahan kaha mujhe muje mera meri
+    chahiye chaiye batao bataiye do dijiye ke liye liye se me mein par aur bhi
+    please pls plz tablet tablets medicine medicines dawai dawa price kitna kitne
+    """.split()
+)
+
+# Name tokens count more than category/use_for tokens.
+FIELD_WEIGHTS = (('name', 3), ('category', 1), ('use_for', 2))
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting English/Hinglish prompts.
+    return max(1, len(text) // 4)
+
+
+class BM25Index:
+    """Okapi BM25 over weighted field tokens with a plain-dict inverted index."""
+
+    def __init__(self, docs, k1=1.2, b=0.75):
+        # docs: list of (line, {field: text}); `line` is the prebuilt prompt segment.
+        self.k1 = k1
+        self.b = b
+        self.lines = []
+        self.doc_lengths = []
+        self.postings = {}  # term -> [(doc_idx, weighted tf)]
+        for idx, (line, fields) in enumerate(docs):
+            tf = {}
+            for field, weight in FIELD_WEIGHTS:
+                for term in tokenize(fields.get(field)):
+                    tf[term] = tf.get(term, 0) + weight
+            self.lines.append(line)
+            self.doc_lengths.append(sum(tf.values()))
+            for term, freq in tf.items():
+                self.postings.setdefault(term, []).append((idx, freq))
+
+        self.doc_count = len(self.lines)
+        self.avg_length = (sum(self.doc_lengths) / self.doc_count) if self.doc_count else 0.0
+        self.idf = {
+            term: math.log(1 + (self.doc_count - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def _expand(self, term):
+        # Prefix match lets "vit" or "paracet" hit full words; exact terms are used as-is.
+        if term in self.postings:
+            return [term]
+        if len(term) < 3:
+            return []
+        return [t for t in self.postings if t.startswith(term)][:5]
+
+    def search(self, query, k=10):
+        scores = {}
+        for q_term in set(tokenize(query)):
+            for term in self._expand(q_term):
+                idf = self.idf[term]
+                for doc_idx, freq in self.postings[term]:
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_idx] / (self.avg_length or 1))
+                    scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        ranked = sorted(scores.items(), key=lambda x: -x[1])
+        return ranked[:k]
+
+
+def _build_index():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT name, category, use_for, price
+        FROM medicines
+        WHERE available = 1
+        ORDER BY stock_qty DESC, name ASC
+        """
+    )
+    rows = cur.fetchall()
+    conn.close()
+
+    docs = []
+    seen = set()
+    for r in rows:
+        name = (r['name'] or '').strip()
+        category = (r['category'] or 'General').strip()
+        key = (name.lower(), category.lower())
+        if not name or key in seen:
+            continue  # same product at several pharmacies: one prompt line is enough
+        seen.add(key)
+        use_for = (r['use_for'] or '').strip()
+        line = f"- {name} | category: {category} | price: Rs {float(r['price'] or 0):.2f}"
+        if use_for:
+            line += f" | use: {use_for}"
+        docs.append((line, {'name': name, 'category': category, 'use_for': use_for}))
+    return BM25Index(docs)
+
+
+def get_catalog_index():
+    return cached_for_catalog('bm25_index', _build_index)
+
+
+def select_catalog_lines(query, k, token_budget):
+    """Top-k relevant prompt lines for query, trimmed to fit token_budget."""
+    index = get_catalog_index()
+    selected = []
+    used = 0
+    for doc_idx, _score in index.search(query, k=k):
+        line = index.lines[doc_idx]
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            break
+        selected.append(line)
+        used += cost
+    return selected
@@ -1,5 +1,10 @@
-from flask import Blueprint, request, jsonify
-from db import get_connection
+import sqlite3
+import time
+
+from flask import Blueprint, Response, request, jsonify
+from analytics import DEFAULT_RANGE_DAYS, AnalyticsError, parse_timestamp, sales_timeseries
+from db import get_connection, get_pharmacy_day_stats, get_pharmacy_totals
+from exports import ExportError, medicine_query, order_query, stream_export
 
 admin = Blueprint('admin', __name__)
 
@@ -8,29 +13,105 @@ admin = Blueprint('admin', __name__)
 def analytics():
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) AS c FROM orders")
-    total_orders = cur.fetchone()['c']
-    cur.execute("SELECT COALESCE(SUM(total_amount), 0) AS revenue FROM orders")
-    revenue = cur.fetchone()['revenue']
+    cur.execute(
+        "SELECT COALESCE(SUM(orders_count), 0) AS c, COALESCE(SUM(revenue), 0) AS revenue FROM pharmacy_order_totals"
+    )
+    totals = cur.fetchone()
     cur.execute("SELECT COUNT(*) AS c FROM users")
     active_users = cur.fetchone()['c']
-    cur.execute("SELECT COUNT(*) AS c FROM pharmacies WHERE is_approved = 1")
-    active_pharmacies = cur.fetchone()['c']
-    cur.execute("SELECT COUNT(*) AS c FROM pharmacies WHERE is_approved = 0")
-    pending_approvals = cur.fetchone()['c']
+    cur.execute(
+        """
+        SELECT
+            COALESCE(SUM(CASE WHEN is_approved = 1 THEN 1 ELSE 0 END), 0) AS active,
+            COALESCE(SUM(CASE WHEN is_approved = 0 THEN 1 ELSE 0 END), 0) AS pending
+        FROM pharmacies
+        """
+    )
+    pharmacy_counts = cur.fetchone()
     conn.close()
     return jsonify(
         {
             'ok': True,
-            'total_orders': total_orders,
-            'revenue': round(revenue, 2),
+            'total_orders': totals['c'],
+            'revenue': round(totals['revenue'], 2),
             'active_users': active_users,
-            'active_pharmacies': active_pharmacies,
-            'pending_approvals': pending_approvals,
+            'active_pharmacies': pharmacy_counts['active'],
+            'pending_approvals': pharmacy_counts['pending'],
         }
     )
 
 
+@admin.route('/analytics/timeseries', methods=['GET'])
+def analytics_timeseries():
+    try:
+        end_ts = parse_timestamp(request.args.get('end'), 'end') or int(time.time())
+        start_ts = parse_timestamp(request.args.get('start'), 'start') or end_ts - DEFAULT_RANGE_DAYS * 86400
+        max_points = request.args.get('points', type=int)
+        conn = get_connection()
+        try:
+            series = sales_timeseries(
+                conn.cursor(),
+                start_ts,
+                end_ts,
+                granularity=(request.args.get('granularity') or '').strip().lower() or None,
+                pharmacy_id=request.args.get('pharmacy_id', type=int),
+                category=(request.args.get('category') or '').strip() or None,
+                max_points=max_points if max_points and max_points > 0 else None,
+            )
+        finally:
+            conn.close()
+    except AnalyticsError as err:
+        return jsonify({'ok': False, 'message': str(err)}), 400
+    return jsonify({'ok': True, **series})
+
+
+def _export_response(name, query):
+    fmt = (request.args.get('format') or 'csv').strip().lower()
+    after_id = request.args.get('after_id', type=int, default=0)
+    limit = request.args.get('limit', type=int)
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    if after_id < 0 or (limit is not None and limit <= 0):
+        return jsonify({'ok': False, 'message': 'after_id and limit must be positive'}), 400
+    try:
+        body = stream_export(query, fmt, after_id=after_id, limit=limit, compress=compress)
+    except ExportError as err:
+        return jsonify({'ok': False, 'message': str(err)}), 400
+
+    filename = f"{name}.{fmt}" + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+    }
+    return Response(body, mimetype=mimetype, headers=headers)
+
+
+@admin.route('/export/orders', methods=['GET'])
+def export_orders():
+    try:
+        start_ts = parse_timestamp(request.args.get('start'), 'start')
+        end_ts = parse_timestamp(request.args.get('end'), 'end')
+    except AnalyticsError as err:
+        return jsonify({'ok': False, 'message': str(err)}), 400
+    query = order_query(
+        start_ts=start_ts,
+        end_ts=end_ts,
+        pharmacy_id=request.args.get('pharmacy_id', type=int),
+        status=(request.args.get('status') or '').strip().lower() or None,
+    )
+    return _export_response('orders', query)
+
+
+@admin.route('/export/medicines', methods=['GET'])
+def export_medicines():
+    query = medicine_query(
+        pharmacy_id=request.args.get('pharmacy_id', type=int),
+        category=(request.args.get('category') or '').strip() or None,
+    )
+    return _export_response('medicines', query)
+
+
 @admin.route('/approve_seller', methods=['POST'])
 def approve_seller():
     data = request.get_json() or {}
@@ -48,15 +129,22 @@ def approve_seller():
     return jsonify({'ok': True, 'message': 'Seller approved', 'seller_id': seller_id})
 
 
+def _find_pharmacy(cur, medical_name):
+    cur.execute(
+        "SELECT id, name, medicines_count FROM pharmacies WHERE LOWER(name) = LOWER(?) LIMIT 1",
+        (medical_name,),
+    )
+    return cur.fetchone()
+
+
 def _resolve_or_create_pharmacy(cur, medical_name, location='Unknown'):
     normalized = (medical_name or '').strip()
     if not normalized:
         return None
 
-    cur.execute("SELECT id, name FROM pharmacies WHERE LOWER(name) = LOWER(?) LIMIT 1", (normalized,))
-    row = cur.fetchone()
+    row = _find_pharmacy(cur, normalized)
     if row:
-        return {'id': row['id'], 'name': row['name']}
+        return {'id': row['id'], 'name': row['name'], 'created': False}
 
     cur.execute(
         """
@@ -66,52 +154,45 @@ def _resolve_or_create_pharmacy(cur, medical_name, location='Unknown'):
         (normalized, location or 'Unknown'),
     )
     pharmacy_id = cur.lastrowid
-    return {'id': pharmacy_id, 'name': normalized}
+    return {'id': pharmacy_id, 'name': normalized, 'created': True}
+
+
+@admin.route('/pharmacies', methods=['POST'])
+def create_pharmacy():
+    data = request.get_json() or {}
+    medical_name = (data.get('medical_name') or '').strip()
+    location = (data.get('location') or '').strip() or 'Unknown'
+    if not medical_name:
+        return jsonify({'ok': False, 'message': 'medical_name is required'}), 400
+
+    conn = get_connection()
+    cur = conn.cursor()
+    pharmacy = _resolve_or_create_pharmacy(cur, medical_name, location)
+    conn.commit()
+    conn.close()
+    return jsonify(
+        {'ok': True, 'pharmacy_id': pharmacy['id'], 'pharmacy_name': pharmacy['name'], 'created': pharmacy['created']}
+    ), (201 if pharmacy['created'] else 200)
 
 
 @admin.route('/store_dashboard', methods=['GET'])
 def store_dashboard():
     medical_name = (request.args.get('medical_name') or '').strip()
-    location = (request.args.get('location') or '').strip() or 'Unknown'
     if not medical_name:
         return jsonify({'ok': False, 'message': 'medical_name is required'}), 400
 
-    conn = get_connection()
+    # Read-only: no pharmacy creation or count refresh here (POST /admin/pharmacies and
+    # the medicines_count triggers own those), so views never take the write lock.
+    conn = get_connection(readonly=True)
     cur = conn.cursor()
-    pharmacy = _resolve_or_create_pharmacy(cur, medical_name, location)
+    pharmacy = _find_pharmacy(cur, medical_name)
     if not pharmacy:
         conn.close()
-        return jsonify({'ok': False, 'message': 'Unable to resolve pharmacy'}), 400
+        return jsonify({'ok': False, 'message': 'Pharmacy not found'}), 404
     pharmacy_id = pharmacy['id']
 
-    cur.execute(
-        """
-        SELECT COUNT(*) AS c
-        FROM orders
-        WHERE pharmacy_id = ? AND DATE(created_at) = DATE('now')
-        """,
-        (pharmacy_id,),
-    )
-    todays_orders = cur.fetchone()['c']
-
-    cur.execute("SELECT COUNT(*) AS c FROM orders WHERE pharmacy_id = ?", (pharmacy_id,))
-    total_orders = cur.fetchone()['c']
-
-    cur.execute("SELECT COALESCE(SUM(total_amount), 0) AS amt FROM orders WHERE pharmacy_id = ?", (pharmacy_id,))
-    total_sales = float(cur.fetchone()['amt'] or 0)
-
-    cur.execute(
-        """
-        SELECT COALESCE(SUM(total_amount), 0) AS amt
-        FROM orders
-        WHERE pharmacy_id = ? AND DATE(created_at) = DATE('now')
-        """,
-        (pharmacy_id,),
-    )
-    sales_today = float(cur.fetchone()['amt'] or 0)
-
-    cur.execute("SELECT COUNT(*) AS c FROM medicines WHERE pharmacy_id = ?", (pharmacy_id,))
-    medicines_count = cur.fetchone()['c']
+    today = get_pharmacy_day_stats(cur, pharmacy_id)
+    totals = get_pharmacy_totals(cur, pharmacy_id)
 
     cur.execute(
         """
@@ -124,6 +205,7 @@ def store_dashboard():
         (pharmacy_id,),
     )
     recent_rows = cur.fetchall()
+    conn.close()
     recent_medicines = [
         {
             'id': r['id'],
@@ -139,26 +221,23 @@ def store_dashboard():
         for r in recent_rows
     ]
 
-    cur.execute(
-        "UPDATE pharmacies SET medicines_count = (SELECT COUNT(*) FROM medicines WHERE pharmacy_id = ?) WHERE id = ?",
-        (pharmacy_id, pharmacy_id),
-    )
-    conn.commit()
-    conn.close()
-
-    return jsonify(
+    response = jsonify(
         {
             'ok': True,
             'pharmacy_id': pharmacy_id,
             'pharmacy_name': pharmacy['name'],
-            'todays_orders': todays_orders,
-            'total_orders': total_orders,
-            'total_sales': round(total_sales, 2),
-            'sales_today': round(sales_today, 2),
-            'medicines_count': medicines_count,
+            'todays_orders': today['orders_count'],
+            'total_orders': totals['orders_count'],
+            'total_sales': round(float(totals['revenue']), 2),
+            'sales_today': round(float(today['revenue']), 2),
+            'medicines_count': int(pharmacy['medicines_count'] or 0),
             'recent_medicines': recent_medicines,
         }
     )
+    # Content hash ETag: unchanged dashboards revalidate with a bodiless 304.
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 
 @admin.route('/add_medicine', methods=['POST'])
@@ -216,20 +295,18 @@ def add_medicine():
         return jsonify({'ok': False, 'message': 'Unable to resolve pharmacy'}), 400
     pharmacy_id = pharmacy['id']
 
-    cur.execute(
-        """
-        INSERT INTO medicines (pharmacy_id, category, name, strength, unit, price, mrp, offer_text, image_url, available, stock_qty)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
-        """,
-        (pharmacy_id, category, name, strength, unit, price, mrp, offer_text, image_url, max(stock_qty, 0)),
-    )
+    try:
+        cur.execute(
+            """
+            INSERT INTO medicines (pharmacy_id, category, name, strength, unit, price, mrp, offer_text, image_url, available, stock_qty)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+            """,
+            (pharmacy_id, category, name, strength, unit, price, mrp, offer_text, image_url, max(stock_qty, 0)),
+        )
+    except sqlite3.IntegrityError:
+        conn.close()
+        return jsonify({'ok': False, 'message': 'This medicine and strength already exist for the pharmacy'}), 409
     medicine_id = cur.lastrowid
-
-    cur.execute(
-        "UPDATE pharmacies SET medicines_count = (SELECT COUNT(*) FROM medicines WHERE pharmacy_id = ?) WHERE id = ?",
-        (pharmacy_id, pharmacy_id),
-    )
-
     conn.commit()
     conn.close()
 
@@ -1,9 +1,15 @@
 import re
+import time
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
+from auth_tokens import REFRESH, TokenError, issue_tokens, login_required, revoke_token, verify_token
 from db import get_connection
-from helpers import generate_otp, send_otp_twilio
+from helpers import generate_otp, get_twilio_client
+from jobs import wake_workers
+from passwords import HashingBusy, hash_password, verify_password, verify_unknown_user
 from config import Config
+from rate_limit import limit_by_field
+from tasks import send_otp_sms
 
 auth = Blueprint('auth', __name__)
 
@@ -37,8 +43,7 @@ def twilio_health():
         return jsonify(response), 400
 
     try:
-        from twilio.rest import Client  # optional dependency
-        client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+        client = get_twilio_client()  # optional dependency
         account = client.api.accounts(Config.TWILIO_ACCOUNT_SID).fetch()
         response['credentials_valid'] = True
         response['ok'] = True
@@ -58,6 +63,10 @@ def _is_valid_email(email):
     return bool(re.match(r'^[^@\s]+@[^@\s]+\.[^@\s]+$', email))
 
 
+def _hashing_busy():
+    return jsonify({'ok': False, 'message': 'Too many login attempts right now. Please retry.'}), 503, {'Retry-After': '1'}
+
+
 @auth.route('/signup', methods=['POST'])
 def signup():
     data = request.get_json() or {}
@@ -72,6 +81,11 @@ def signup():
     if len(password) < 6:
         return jsonify({'ok': False, 'message': 'password must be at least 6 characters'}), 400
 
+    try:
+        password_hash = hash_password(password)
+    except HashingBusy:
+        return _hashing_busy()
+
     conn = get_connection()
     cur = conn.cursor()
 
@@ -86,17 +100,27 @@ def signup():
         INSERT INTO users (phone_number, full_name, email, password, is_verified)
         VALUES (?, ?, ?, ?, 1)
         """,
-        (f'email:{email}', full_name, email, password),
+        (f'email:{email}', full_name, email, password_hash),
     )
     user_id = cur.lastrowid
 
     conn.commit()
     conn.close()
 
-    return jsonify({'ok': True, 'message': 'Signup successful', 'user_id': user_id, 'full_name': full_name, 'email': email})
+    return jsonify(
+        {
+            'ok': True,
+            'message': 'Signup successful',
+            'user_id': user_id,
+            'full_name': full_name,
+            'email': email,
+            **issue_tokens(user_id, email=email, name=full_name),
+        }
+    )
 
 
 @auth.route('/login', methods=['POST'])
+@limit_by_field('email', Config.RATE_LIMIT_LOGIN_PER_EMAIL)
 def login():
     data = request.get_json() or {}
     email = (data.get('email') or '').strip().lower()
@@ -114,9 +138,22 @@ def login():
         (email,),
     )
     user = cur.fetchone()
+
+    try:
+        if user:
+            matches, needs_rehash = verify_password(password, user['password'])
+        else:
+            matches, needs_rehash = verify_unknown_user(password)
+        if matches and needs_rehash:
+            # Legacy plaintext rows (and hashes with outdated cost) are upgraded on login.
+            cur.execute("UPDATE users SET password = ? WHERE id = ?", (hash_password(password), user['id']))
+            conn.commit()
+    except HashingBusy:
+        conn.close()
+        return _hashing_busy()
     conn.close()
 
-    if not user or user['password'] != password:
+    if not matches:
         return jsonify({'ok': False, 'message': 'Invalid email or password'}), 401
 
     return jsonify(
@@ -126,16 +163,54 @@ def login():
             'user_id': user['id'],
             'full_name': user['full_name'],
             'email': user['email'],
+            **issue_tokens(user['id'], email=user['email'], name=user['full_name']),
         }
     )
 
 
+@auth.route('/refresh', methods=['POST'])
+def refresh_tokens():
+    data = request.get_json() or {}
+    try:
+        claims = verify_token(data.get('refresh_token'), REFRESH)
+    except TokenError as err:
+        return jsonify({'ok': False, 'message': str(err)}), 401
+
+    # Refresh tokens are single use: the old one is revoked as the new pair is issued.
+    if not revoke_token(claims):
+        return jsonify({'ok': False, 'message': 'Token revoked'}), 401
+    return jsonify(
+        {'ok': True, **issue_tokens(claims['sub'], email=claims.get('email'), name=claims.get('name'))}
+    )
+
+
+@auth.route('/logout', methods=['POST'])
+@login_required
+def logout():
+    revoke_token(g.token_claims)
+    data = request.get_json(silent=True) or {}
+    if data.get('refresh_token'):
+        try:
+            revoke_token(verify_token(data['refresh_token'], REFRESH))
+        except TokenError:
+            pass
+    return jsonify({'ok': True, 'message': 'Logged out'})
+
+
+@auth.route('/me', methods=['GET'])
+@login_required
+def me():
+    claims = g.token_claims
+    return jsonify({'ok': True, 'user_id': claims['sub'], 'email': claims.get('email'), 'full_name': claims.get('name')})
+
+
 @auth.route('/verify-otp', methods=['POST'])
 def verify_otp():
     return jsonify({'ok': False, 'message': 'OTP login removed. Use email/password login.'}), 410
 
 
 @auth.route('/login-phone', methods=['POST'])
+@limit_by_field('phone_number', Config.RATE_LIMIT_OTP_PER_PHONE)
 def login_phone_legacy():
     data = request.get_json() or {}
     phone = (data.get('phone_number') or '').strip()
@@ -143,21 +218,23 @@ def login_phone_legacy():
         return jsonify({'ok': False, 'message': 'phone_number is required'}), 400
 
     otp = generate_otp()
-    otp_sent = send_otp_twilio(phone, otp)
-    if not otp_sent:
-        return jsonify({'ok': False, 'message': 'Failed to send OTP'}), 500
-
+    expires_at = time.time() + Config.OTP_TTL_SECONDS
     conn = get_connection()
     cur = conn.cursor()
     cur.execute("SELECT id FROM users WHERE phone_number = ?", (phone,))
     user = cur.fetchone()
     if user:
-        cur.execute("UPDATE users SET otp_code = ? WHERE id = ?", (otp, user['id']))
+        user_id = user['id']
+        cur.execute("UPDATE users SET otp_code = ?, otp_expires_at = ? WHERE id = ?", (otp, expires_at, user_id))
     else:
         cur.execute(
-            "INSERT INTO users (phone_number, otp_code, is_verified) VALUES (?, ?, 0)",
-            (phone, otp),
+            "INSERT INTO users (phone_number, otp_code, otp_expires_at, is_verified) VALUES (?, ?, ?, 0)",
+            (phone, otp, expires_at),
         )
+        user_id = cur.lastrowid
+    # SMS goes out from the job workers; queued in the same transaction as the OTP row.
+    send_otp_sms.enqueue(user_id, conn=conn)
     conn.commit()
     conn.close()
-    return jsonify({'ok': True, 'message': 'OTP sent', 'phone_number': phone})
+    wake_workers()
+    return jsonify({'ok': True, 'message': 'OTP queued', 'phone_number': phone})
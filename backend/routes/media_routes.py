@@ -0,0 +1,42 @@
+from flask import Blueprint, request, jsonify, redirect, send_file
+from db import get_connection
+from media import DEFAULT_SIZE, IMMUTABLE_CACHE_CONTROL, THUMB_SIZES, MediaError, get_image, is_proxyable, source_version
+from routes.medicines_routes import medicine_image_source
+
+media = Blueprint('media', __name__)
+
+
+@media.route('/medicine/<int:medicine_id>', methods=['GET'])
+def medicine_image(medicine_id):
+    size = (request.args.get('size') or DEFAULT_SIZE).strip().lower()
+    if size != 'full' and size not in THUMB_SIZES:
+        return jsonify({'ok': False, 'message': f"size must be one of: full, {', '.join(THUMB_SIZES)}"}), 400
+
+    conn = get_connection(readonly=True)
+    try:
+        row = conn.execute("SELECT name, image_url FROM medicines WHERE id = ?", (medicine_id,)).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return jsonify({'ok': False, 'message': 'Medicine not found'}), 404
+
+    source = medicine_image_source(row['name'], row['image_url'])
+    if not is_proxyable(source):
+        # Local assets (e.g. files under the frontend's public dir) are already served by us.
+        return redirect(source)
+
+    try:
+        image = get_image(source, size)
+    except MediaError as e:
+        response = jsonify({'ok': False, 'message': e.message})
+        response.status_code = e.status
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    response = send_file(image.path, mimetype=image.content_type, etag=image.etag, conditional=True)
+    # ?v= pins the source URL, so a versioned proxy URL always names the same bytes.
+    if request.args.get('v') == source_version(source):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    return response
@@ -1,5 +1,9 @@
 from flask import Blueprint, request, jsonify
+from catalog import read_catalog_changes
+from catalog_snapshot import get_catalog_snapshot
+from config import Config
 from db import get_connection
+from media import medicine_media_url
 
 medicines = Blueprint('medicines', __name__)
 
@@ -20,6 +24,14 @@ def build_compound_image_url(name):
     return f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{query_name}/PNG?image_size=large"
 
 
+def medicine_image_source(name, image_url):
+    """Upstream image for a medicine: its own image_url, else the PubChem structure for its name."""
+    image_url = (image_url or '').strip()
+    if not image_url or image_url == '/medicine-placeholder.svg':
+        image_url = build_compound_image_url(name)
+    return image_url
+
+
 def serialize_medicine_row(r):
     price = float(r['price'] or 0)
     mrp = float(r['mrp'] or 0)
@@ -27,9 +39,7 @@ def serialize_medicine_row(r):
         mrp = round(price * 1.2, 2)
     offer_percent = int(round(((mrp - price) * 100.0) / mrp)) if mrp > 0 and mrp > price else 0
     offer_text = (r['offer_text'] or '').strip() or (f"{offer_percent}% OFF" if offer_percent > 0 else "Best Price")
-    image_url = (r['image_url'] or '').strip()
-    if not image_url or image_url == '/medicine-placeholder.svg':
-        image_url = build_compound_image_url(r['name'])
+    image_url = medicine_media_url(r['id'], medicine_image_source(r['name'], r['image_url']))
 
     return {
         'id': r['id'],
@@ -125,6 +135,61 @@ def search_medicines():
     return jsonify({'ok': True, 'query': q, 'results': results, 'fallback_used': fallback_used})
 
 
+@medicines.route('/changes', methods=['GET'])
+def catalog_changes():
+    """Incremental catalog sync: rows changed and ids deleted since the client's last version."""
+    since = request.args.get('since', type=int, default=0)
+    limit = request.args.get('limit', type=int) or 1000
+    if since < 0:
+        return jsonify({'ok': False, 'message': 'since must be 0 or a version from an earlier response'}), 400
+    limit = max(1, min(limit, Config.CATALOG_CHANGES_MAX_LIMIT))
+
+    conn = get_connection(readonly=True)
+    try:
+        changes = read_catalog_changes(conn.cursor(), since, limit)
+    finally:
+        conn.close()
+    if changes['reset']:
+        return jsonify({'ok': True, 'reset': True, 'version': changes['version'], 'next_since': 0})
+
+    medicines_changed = []
+    for r in changes['medicines']:
+        item = serialize_medicine_row(r)
+        item['row_version'] = r['row_version']
+        medicines_changed.append(item)
+    pharmacies_changed = [dict(r) for r in changes['pharmacies']]
+
+    response = jsonify(
+        {
+            'ok': True,
+            'reset': False,
+            'since': since,
+            'version': changes['version'],
+            'next_since': changes['next_since'],
+            'has_more': changes['has_more'],
+            'medicines': medicines_changed,
+            'pharmacies': pharmacies_changed,
+            'deleted': changes['deleted'],
+        }
+    )
+    # A page for a given `since` only changes when the catalog does; let clients revalidate cheaply.
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@medicines.route('/snapshot', methods=['GET'])
+def catalog_snapshot():
+    manifest = get_catalog_snapshot()
+    if manifest is None:
+        return jsonify({'ok': False, 'message': 'Catalog snapshot is not available'}), 404
+    response = jsonify({'ok': True, **manifest})
+    # The manifest only changes with the catalog; the files it points to are immutable.
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
 @medicines.route('/<int:medicine_id>', methods=['GET'])
 def get_medicine(medicine_id):
     conn = get_connection()
@@ -1,40 +1,66 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
 import uuid
 from db import get_connection
 from config import Config
-from helpers import create_stripe_payment_intent, retrieve_stripe_payment_intent, calculate_distance
+from helpers import create_stripe_payment_intent, parse_coordinates, retrieve_stripe_payment_intent
+from pricing import QuoteError, quote_cart
+from stripe_webhooks import parse_stripe_event, record_stripe_event, verify_stripe_signature
 
 orders = Blueprint('orders', __name__)
 
 
-def get_quantity_discount_percent(quantity):
-    # Higher quantity => better unit price.
-    if quantity >= 10:
-        return 15
-    if quantity >= 5:
-        return 10
-    if quantity >= 3:
-        return 5
-    return 0
+def _parse_customer_location(data):
+    """Return (lat, lng) floats, (None, None) when absent; raises ValueError when malformed."""
+    return parse_coordinates(data.get('customer_lat'), data.get('customer_lng'))
 
 
-def get_discounted_unit_price(base_price, quantity):
-    discount_percent = get_quantity_discount_percent(quantity)
-    discounted = float(base_price) * (1 - discount_percent / 100.0)
-    return round(discounted, 2), discount_percent
+def _order_access_error(order_user_id):
+    """Orders placed with a token belong to that user; guest orders stay reachable by id."""
+    if order_user_id is not None and order_user_id != g.get('user_id'):
+        return jsonify({'ok': False, 'message': 'Order belongs to another account'}), 403
+    return None
+
+
+@orders.route('/quote', methods=['POST'])
+def quote_order():
+    data = request.get_json() or {}
+    try:
+        customer_lat, customer_lng = _parse_customer_location(data)
+    except ValueError as err:
+        return jsonify({'ok': False, 'message': str(err)}), 400
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        quote = quote_cart(
+            cur,
+            data.get('pharmacy_id'),
+            data.get('items', []),
+            customer_lat=customer_lat,
+            customer_lng=customer_lng,
+            is_express=bool(data.get('is_express', False)),
+        )
+    except QuoteError as err:
+        return jsonify({'ok': False, 'message': err.message}), err.status_code
+    finally:
+        conn.close()
+
+    return jsonify({'ok': True, 'quote': quote})
 
 
 @orders.route('/create', methods=['POST'])
 def create_order():
     data = request.get_json() or {}
-    user_id = data.get('user_id')
+    # The owner comes from the verified bearer token only; without one the order is a guest order.
+    user_id = g.get('user_id')
+    claimed_user_id = data.get('user_id')
+    if claimed_user_id is not None and str(claimed_user_id) != str(user_id):
+        return jsonify({'ok': False, 'message': 'user_id does not match the signed-in account'}), 403
     pharmacy_id = data.get('pharmacy_id')
     items = data.get('items', [])
     is_express = bool(data.get('is_express', False))
     delivery_address = (data.get('delivery_address') or '').strip()
     customer_phone = (data.get('customer_phone') or '').strip()
-    customer_lat = data.get('customer_lat')
-    customer_lng = data.get('customer_lng')
 
     if not pharmacy_id or not items:
         return jsonify({'ok': False, 'message': 'pharmacy_id and items are required'}), 400
@@ -42,62 +68,35 @@ def create_order():
         return jsonify({'ok': False, 'message': 'delivery_address is required'}), 400
     if not customer_phone:
         return jsonify({'ok': False, 'message': 'customer_phone is required'}), 400
-    has_customer_location = customer_lat is not None and customer_lng is not None
-    if has_customer_location:
-        try:
-            customer_lat = float(customer_lat)
-            customer_lng = float(customer_lng)
-        except (TypeError, ValueError):
-            return jsonify({'ok': False, 'message': 'Invalid customer location coordinates'}), 400
-    else:
-        customer_lat = None
-        customer_lng = None
+    try:
+        customer_lat, customer_lng = _parse_customer_location(data)
+    except ValueError as err:
+        return jsonify({'ok': False, 'message': str(err)}), 400
 
     order_number = f"ORD-{str(uuid.uuid4())[:8].upper()}"
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT id, lat, lng FROM pharmacies WHERE id = ?", (pharmacy_id,))
-    pharmacy = cur.fetchone()
-    if not pharmacy:
+    try:
+        quote = quote_cart(
+            cur,
+            pharmacy_id,
+            items,
+            customer_lat=customer_lat,
+            customer_lng=customer_lng,
+            is_express=is_express,
+        )
+    except QuoteError as err:
         conn.close()
-        return jsonify({'ok': False, 'message': 'Pharmacy not found'}), 404
-
-    subtotal = 0.0
-    total_discount = 0.0
-    item_rows = []
-    for item in items:
-        medicine_id = item.get('medicine_id')
-        quantity = int(item.get('quantity', 0))
-        if not medicine_id or quantity <= 0:
-            conn.close()
-            return jsonify({'ok': False, 'message': 'Each item requires medicine_id and positive quantity'}), 400
+        return jsonify({'ok': False, 'message': err.message}), err.status_code
+    pharmacy_id = quote['pharmacy_id']
 
-        cur.execute("SELECT id, price, stock_qty FROM medicines WHERE id = ? AND pharmacy_id = ?", (medicine_id, pharmacy_id))
-        med = cur.fetchone()
-        if not med:
+    for line in quote['items']:
+        if line['issue'] == 'not_found':
             conn.close()
-            return jsonify({'ok': False, 'message': f'Medicine {medicine_id} not found for pharmacy'}), 404
-        if med['stock_qty'] < quantity:
+            return jsonify({'ok': False, 'message': f"Medicine {line['medicine_id']} not found for pharmacy"}), 404
+        if line['issue'] == 'insufficient_stock':
             conn.close()
-            return jsonify({'ok': False, 'message': f'Insufficient stock for medicine {medicine_id}'}), 400
-
-        base_price = float(med['price'])
-        discounted_unit_price, discount_percent = get_discounted_unit_price(base_price, quantity)
-        base_line_total = base_price * quantity
-        line_total = discounted_unit_price * quantity
-        subtotal += line_total
-        total_discount += max(0.0, base_line_total - line_total)
-        item_rows.append((medicine_id, quantity, discounted_unit_price, discount_percent))
-
-    distance_km = 0.0
-    distance_surcharge = 0.0
-    if has_customer_location:
-        distance_km = calculate_distance(customer_lat, customer_lng, float(pharmacy['lat']), float(pharmacy['lng']))
-        distance_surcharge = 30.0 if distance_km > 2.5 else 0.0
-
-    total = subtotal + distance_surcharge
-    if is_express:
-        total += 30.0
+            return jsonify({'ok': False, 'message': f"Insufficient stock for medicine {line['medicine_id']}"}), 400
 
     cur.execute(
         """
@@ -111,24 +110,26 @@ def create_order():
             order_number,
             user_id,
             pharmacy_id,
-            total,
+            quote['total_amount'],
             int(is_express),
             delivery_address,
             customer_phone,
             customer_lat,
             customer_lng,
-            distance_km,
-            distance_surcharge,
+            quote['distance_km'],
+            quote['distance_surcharge'],
         ),
     )
     order_id = cur.lastrowid
 
-    for medicine_id, quantity, unit_price, _discount_percent in item_rows:
-        cur.execute(
-            "INSERT INTO order_items (order_id, medicine_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
-            (order_id, medicine_id, quantity, unit_price),
-        )
-        cur.execute("UPDATE medicines SET stock_qty = stock_qty - ? WHERE id = ?", (quantity, medicine_id))
+    cur.executemany(
+        "INSERT INTO order_items (order_id, medicine_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+        [(order_id, line['medicine_id'], line['quantity'], line['unit_price']) for line in quote['items']],
+    )
+    cur.executemany(
+        "UPDATE medicines SET stock_qty = stock_qty - ? WHERE id = ?",
+        [(line['quantity'], line['medicine_id']) for line in quote['items']],
+    )
 
     conn.commit()
     conn.close()
@@ -140,11 +141,12 @@ def create_order():
                 'id': order_id,
                 'order_number': order_number,
                 'status': 'pending',
-                'total_amount': round(total, 2),
-                'subtotal_amount': round(subtotal, 2),
-                'quantity_discount_amount': round(total_discount, 2),
-                'distance_km': distance_km,
-                'distance_surcharge': round(distance_surcharge, 2),
+                'total_amount': quote['total_amount'],
+                'subtotal_amount': quote['subtotal_amount'],
+                'quantity_discount_amount': quote['quantity_discount_amount'],
+                'distance_km': quote['distance_km'],
+                'distance_surcharge': quote['distance_surcharge'],
+                'express_fee': quote['express_fee'],
                 'is_express': is_express,
             },
         }
@@ -170,6 +172,10 @@ def get_order(order_id):
     if not order:
         conn.close()
         return jsonify({'ok': False, 'message': 'Order not found'}), 404
+    denied = _order_access_error(order['user_id'])
+    if denied:
+        conn.close()
+        return denied
 
     cur.execute(
         """
@@ -203,11 +209,14 @@ def create_stripe_intent():
     if order_id:
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute("SELECT id, total_amount FROM orders WHERE id = ?", (order_id,))
+        cur.execute("SELECT id, user_id, total_amount FROM orders WHERE id = ?", (order_id,))
         order = cur.fetchone()
         conn.close()
         if not order:
             return jsonify({'ok': False, 'message': 'Order not found'}), 404
+        denied = _order_access_error(order['user_id'])
+        if denied:
+            return denied
         amount = float(order['total_amount'])
         metadata = {'order_id': str(order['id'])}
     else:
@@ -257,6 +266,11 @@ def confirm_stripe_payment():
     if resolved_order_id:
         conn = get_connection()
         cur = conn.cursor()
+        order = cur.execute("SELECT user_id FROM orders WHERE id = ?", (resolved_order_id,)).fetchone()
+        denied = _order_access_error(order['user_id']) if order else None
+        if denied:
+            conn.close()
+            return denied
         cur.execute("UPDATE orders SET status = 'paid' WHERE id = ?", (resolved_order_id,))
         conn.commit()
         conn.close()
@@ -270,3 +284,21 @@ def confirm_stripe_payment():
             'order_id': resolved_order_id,
         }
     )
+
+
+@orders.route('/stripe/webhook', methods=['POST'])
+def stripe_webhook():
+    if not Config.STRIPE_WEBHOOK_SECRET:
+        return jsonify({'ok': False, 'message': 'Stripe webhook is not configured on server'}), 400
+
+    raw_payload = request.get_data(as_text=True)
+    if not verify_stripe_signature(raw_payload, request.headers.get('Stripe-Signature'), Config.STRIPE_WEBHOOK_SECRET):
+        return jsonify({'ok': False, 'message': 'Invalid signature'}), 400
+
+    event = parse_stripe_event(raw_payload)
+    if not event:
+        return jsonify({'ok': False, 'message': 'Invalid event payload'}), 400
+
+    # Processing happens in the stripe_webhooks workers; only persist and acknowledge here.
+    inserted = record_stripe_event(event, raw_payload)
+    return jsonify({'ok': True, 'received': True, 'duplicate': not inserted})
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from db import get_connection
-from helpers import calculate_distance
+from helpers import calculate_distance, parse_coordinates
+from pricing import QuoteError, compare_pharmacies
 
 pharmacies = Blueprint('pharmacies', __name__)
 
@@ -45,6 +46,51 @@ def nearby_pharmacies():
     return jsonify({'ok': True, 'location': {'lat': lat, 'lng': lng}, 'pharmacies': pharmacy_list})
 
 
+@pharmacies.route('/compare', methods=['POST'])
+def compare_cart_pharmacies():
+    data = request.get_json() or {}
+    sort_by = data.get('sort_by') or 'total'
+    if not isinstance(sort_by, str) or sort_by.strip().lower() not in ('total', 'eta'):
+        return jsonify({'ok': False, 'message': 'sort_by must be total or eta'}), 400
+    sort_by = sort_by.strip().lower()
+    limit = data.get('limit', 10)
+    try:
+        limit = max(1, min(int(limit), 100))
+    except (TypeError, ValueError):
+        return jsonify({'ok': False, 'message': 'Invalid limit'}), 400
+
+    try:
+        lat, lng = parse_coordinates(data.get('lat'), data.get('lng'))
+    except ValueError as err:
+        return jsonify({'ok': False, 'message': str(err)}), 400
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        results = compare_pharmacies(
+            cur,
+            data.get('items', []),
+            customer_lat=lat,
+            customer_lng=lng,
+            is_express=bool(data.get('is_express', False)),
+            sort_by=sort_by,
+        )
+    except QuoteError as err:
+        return jsonify({'ok': False, 'message': err.message}), err.status_code
+    finally:
+        conn.close()
+
+    return jsonify(
+        {
+            'ok': True,
+            'location': {'lat': lat, 'lng': lng},
+            'sort_by': sort_by,
+            'candidates': len(results),
+            'pharmacies': results[:limit],
+        }
+    )
+
+
 @pharmacies.route('/<int:pharmacy_id>', methods=['GET'])
 def get_pharmacy(pharmacy_id):
     conn = get_connection()
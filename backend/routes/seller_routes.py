@@ -1,5 +1,9 @@
+import json
+
 from flask import Blueprint, request, jsonify
-from db import get_connection
+from config import Config
+from db import get_connection, get_pharmacy_day_stats, get_pharmacy_totals
+from inventory import apply_inventory_updates, inventory_insights
 
 seller = Blueprint('seller', __name__)
 
@@ -35,31 +39,15 @@ def seller_dashboard():
     conn = get_connection()
     cur = conn.cursor()
 
-    cur.execute("SELECT COUNT(*) AS c FROM orders WHERE pharmacy_id = ? AND status IN ('pending', 'preparing')", (pharmacy_id,))
-    new_orders = cur.fetchone()['c']
-
-    cur.execute(
-        """
-        SELECT COALESCE(SUM(total_amount), 0) AS amt
-        FROM orders
-        WHERE pharmacy_id = ? AND date(created_at) = date('now')
-        """,
-        (pharmacy_id,),
-    )
-    earnings_today = cur.fetchone()['amt']
-
-    cur.execute(
-        """
-        SELECT COALESCE(SUM(total_amount), 0) AS amt
-        FROM orders
-        WHERE pharmacy_id = ? AND status = 'delivered'
-        """,
-        (pharmacy_id,),
-    )
-    total_earnings = cur.fetchone()['amt']
+    totals = get_pharmacy_totals(cur, pharmacy_id)
+    new_orders = totals['open_orders']
+    earnings_today = get_pharmacy_day_stats(cur, pharmacy_id)['revenue']
+    total_earnings = totals['delivered_revenue']
 
-    cur.execute("SELECT COUNT(*) AS c FROM medicines WHERE pharmacy_id = ?", (pharmacy_id,))
-    medicines_count = cur.fetchone()['c']
+    # Maintained by the medicines triggers in db.py, so this is a primary-key lookup.
+    cur.execute("SELECT medicines_count FROM pharmacies WHERE id = ?", (pharmacy_id,))
+    row = cur.fetchone()
+    medicines_count = (row['medicines_count'] or 0) if row else 0
     conn.close()
 
     return jsonify(
@@ -72,3 +60,75 @@ def seller_dashboard():
             'medicines': medicines_count,
         }
     )
+
+
+@seller.route('/inventory/insights', methods=['GET'])
+def inventory_insights_route():
+    pharmacy_id = request.args.get('pharmacy_id', type=int)
+    if not pharmacy_id:
+        return jsonify({'ok': False, 'message': 'pharmacy_id is required'}), 400
+    low_stock_days = request.args.get('low_stock_days', type=float) or Config.INVENTORY_LOW_STOCK_DAYS
+    top = request.args.get('top', type=int) or Config.INVENTORY_TOP_SELLERS
+
+    conn = get_connection(readonly=True)
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pharmacies WHERE id = ?", (pharmacy_id,))
+    if not cur.fetchone():
+        conn.close()
+        return jsonify({'ok': False, 'message': 'Pharmacy not found'}), 404
+    insights = inventory_insights(cur, pharmacy_id, low_stock_days=low_stock_days, top=max(1, min(top, 100)))
+    conn.close()
+    return jsonify({'ok': True, **insights})
+
+
+def _read_inventory_batch():
+    """(pharmacy_id, rows) from a JSON body or an NDJSON stream (one row per line)."""
+    pharmacy_id = request.args.get('pharmacy_id', type=int)
+    if request.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        rows = []
+        # The rows are materialised for the temp-table load anyway; one read beats per-line stream reads.
+        for line_no, line in enumerate(request.get_data(cache=False).splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f'Invalid JSON on line {line_no}')
+        return pharmacy_id, rows
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        if data.get('pharmacy_id'):
+            try:
+                pharmacy_id = int(data['pharmacy_id'])
+            except (TypeError, ValueError):
+                raise ValueError('pharmacy_id must be an integer')
+        return pharmacy_id, data.get('items')
+    return pharmacy_id, data
+
+
+@seller.route('/inventory', methods=['PATCH'])
+def bulk_update_inventory():
+    try:
+        pharmacy_id, rows = _read_inventory_batch()
+    except ValueError as err:
+        return jsonify({'ok': False, 'message': str(err)}), 400
+    if not pharmacy_id:
+        return jsonify({'ok': False, 'message': 'pharmacy_id is required'}), 400
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'ok': False, 'message': 'items must be a non-empty list'}), 400
+    if len(rows) > Config.INVENTORY_PATCH_MAX_ROWS:
+        return jsonify({'ok': False, 'message': f'At most {Config.INVENTORY_PATCH_MAX_ROWS} rows per request'}), 413
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pharmacies WHERE id = ?", (pharmacy_id,))
+    if not cur.fetchone():
+        conn.close()
+        return jsonify({'ok': False, 'message': 'Pharmacy not found'}), 404
+    try:
+        outcome = apply_inventory_updates(conn, pharmacy_id, rows, chunk_size=Config.INVENTORY_PATCH_CHUNK_ROWS)
+    finally:
+        conn.close()
+    return jsonify({'ok': True, 'pharmacy_id': pharmacy_id, 'rows': len(rows), **outcome})
@@ -1,78 +1,40 @@
+import json
 import re
-import requests
-from flask import Blueprint, jsonify, request
+import time
+from flask import Blueprint, Response, jsonify, request
 
+import http_client
+from catalog import SUPPORT_SYSTEM_MESSAGE, get_support_prompt_prefix
 from config import Config
 from db import get_connection
+from rate_limit import get_admission_gate
+from retrieval import select_catalog_lines
+from support_answers import answer_locally, fallback_reply, remember_answer
 
 support = Blueprint('support', __name__)
 
+# Requests beyond this many concurrent Groq calls get the local fallback instead of waiting.
+_groq_gate = get_admission_gate('groq', Config.SUPPORT_CHAT_MAX_IN_FLIGHT)
+
 
 def _is_valid_phone(phone):
     return bool(re.fullmatch(r'[6-9]\d{9}', (phone or '').strip()))
 
 
-def _build_catalog_context(limit=60):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT name, category, price
-        FROM medicines
-        ORDER BY stock_qty DESC, name ASC
-        LIMIT ?
-        """,
-        (limit,),
-    )
-    rows = cur.fetchall()
-    conn.close()
-
-    lines = []
-    for r in rows:
-        name = (r['name'] or '').strip()
-        category = (r['category'] or 'General').strip()
-        price = float(r['price'] or 0)
-        lines.append(f"- {name} | category: {category} | price: Rs {price:.2f}")
-    return "\n".join(lines)
-
-
-def _fallback_reply(message):
-    q = (message or '').lower()
-    if 'track' in q or 'order' in q:
-        return 'Order tracking ke liye Orders page open karein. Aap order id se live status dekh sakte hain.'
-    if 'fever' in q or 'cold' in q:
-        return 'Fever/cold ke liye Paracetamol, Dolo 650, Crocin jaisi options Search me check karein.'
-    if 'vitamin' in q or 'immunity' in q:
-        return 'Vitamins section me Vitamin C, Vitamin D3, Multivitamin, Zinc products available hain.'
-    return 'Main aapki medicine, category aur order tracking related help ke liye available hoon.'
-
+def _catalog_messages(message, mode=None):
+    """Leading system messages: retrieved catalog rows for this message, or the static snapshot."""
+    mode = mode or Config.SUPPORT_CONTEXT_MODE
+    if mode == 'retrieval':
+        lines = select_catalog_lines(message, Config.SUPPORT_RETRIEVAL_K, Config.SUPPORT_PROMPT_TOKEN_BUDGET)
+        if lines:
+            return [SUPPORT_SYSTEM_MESSAGE, {'role': 'system', 'content': 'Relevant catalog items:\n' + '\n'.join(lines)}]
+        # Nothing matched (greetings, order questions): a short popular list keeps replies grounded.
+        return list(get_support_prompt_prefix(limit=15))
+    return list(get_support_prompt_prefix())
 
-@support.route('/chat', methods=['POST'])
-def support_chat():
-    data = request.get_json() or {}
-    message = (data.get('message') or '').strip()
-    history = data.get('history') or []
-
-    if not message:
-        return jsonify({'ok': False, 'message': 'message is required'}), 400
-
-    api_key = (Config.GROQ_API_KEY or '').strip()
-    if not api_key:
-        return jsonify({'ok': True, 'reply': _fallback_reply(message), 'provider': 'fallback', 'used_fallback': True})
-
-    system_prompt = (
-        'You are MediHub AI Support for an online medicine marketplace. '
-        'Give concise and practical answers in Hinglish. '
-        'Use available catalog context for product recommendations and mention category names when useful. '
-        'Do not provide medical diagnosis. Suggest consulting a doctor for severe symptoms.'
-    )
-
-    catalog_context = _build_catalog_context()
 
-    messages = [
-        {'role': 'system', 'content': system_prompt},
-        {'role': 'system', 'content': f'Catalog snapshot:\n{catalog_context}'},
-    ]
+def _build_chat_payload(message, history, context_mode=None, stream=False):
+    messages = _catalog_messages(message, context_mode)
 
     for msg in history[-8:]:
         role = msg.get('role')
@@ -89,23 +51,75 @@ def support_chat():
         'temperature': 0.4,
         'max_tokens': 350,
     }
+    if stream:
+        payload['stream'] = True
+    return payload
 
-    try:
-        resp = requests.post(
-            'https://api.groq.com/openai/v1/chat/completions',
-            headers={
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json',
-            },
-            json=payload,
-            timeout=20,
+
+CONTEXT_MODES = ('retrieval', 'snapshot')
+
+
+def _read_chat_request(data):
+    """(message, history, context_mode, error): history must be a list of {role, text} objects."""
+    message = data.get('message')
+    history = data.get('history') or []
+    context_mode = data.get('context_mode') or Config.SUPPORT_CONTEXT_MODE
+    if not isinstance(message, str) or not message.strip():
+        return None, None, None, 'message is required'
+    if not isinstance(history, list) or not all(
+        isinstance(msg, dict) and isinstance(msg.get('role'), str) and isinstance(msg.get('text'), str)
+        for msg in history
+    ):
+        return None, None, None, 'history must be a list of {role, text} objects with string values'
+    if context_mode not in CONTEXT_MODES:
+        return None, None, None, 'context_mode must be retrieval or snapshot'
+    return message.strip(), history, context_mode, None
+
+
+def _groq_headers(api_key):
+    return {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json',
+    }
+
+
+@support.route('/chat', methods=['POST'])
+def support_chat():
+    data = request.get_json() or {}
+    message, history, context_mode, error = _read_chat_request(data)
+    if error:
+        return jsonify({'ok': False, 'message': error}), 400
+
+    reply, source = answer_locally(message, history, context_mode)
+    if reply:
+        return jsonify({'ok': True, 'reply': reply, 'provider': source, 'used_fallback': False})
+
+    api_key = (Config.GROQ_API_KEY or '').strip()
+    if not api_key:
+        return jsonify({'ok': True, 'reply': fallback_reply(message), 'provider': 'fallback', 'used_fallback': True})
+
+    # Built before taking a slot, so a failure here cannot leak it.
+    payload = _build_chat_payload(message, history, context_mode)
+    if not _groq_gate.try_acquire():
+        return jsonify(
+            {
+                'ok': True,
+                'reply': fallback_reply(message),
+                'provider': 'fallback',
+                'used_fallback': True,
+                'error': 'AI assistant is busy',
+            }
         )
+
+    try:
+        started = time.perf_counter()
+        resp = http_client.request('groq', 'POST', Config.GROQ_API_URL, headers=_groq_headers(api_key), json=payload)
         if resp.status_code >= 400:
             return (
                 jsonify(
                     {
                         'ok': True,
-                        'reply': _fallback_reply(message),
+                        'reply': fallback_reply(message),
                         'provider': 'fallback',
                         'used_fallback': True,
                         'error': f'Groq request failed ({resp.status_code})',
@@ -122,12 +136,111 @@ def support_chat():
             .strip()
         )
         if not reply:
-            reply = _fallback_reply(message)
+            reply = fallback_reply(message)
             return jsonify({'ok': True, 'reply': reply, 'provider': 'fallback', 'used_fallback': True})
 
+        remember_answer(message, history, context_mode, reply, (time.perf_counter() - started) * 1000)
         return jsonify({'ok': True, 'reply': reply, 'provider': 'groq', 'used_fallback': False})
     except Exception:
-        return jsonify({'ok': True, 'reply': _fallback_reply(message), 'provider': 'fallback', 'used_fallback': True})
+        return jsonify({'ok': True, 'reply': fallback_reply(message), 'provider': 'fallback', 'used_fallback': True})
+    finally:
+        _groq_gate.release()
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_fallback(message, error=None):
+    done = {'provider': 'fallback', 'used_fallback': True}
+    if error:
+        done['error'] = error
+    yield _sse('token', {'token': fallback_reply(message)})
+    yield _sse('done', done)
+
+
+def _iter_stream_tokens(upstream):
+    """Yield content deltas from an OpenAI-compatible `stream: true` response."""
+    for raw in upstream.iter_lines(decode_unicode=True):
+        if not raw or not raw.startswith('data:'):
+            continue
+        chunk = raw[5:].strip()
+        if chunk == '[DONE]':
+            return
+        try:
+            delta = json.loads(chunk)['choices'][0].get('delta', {}).get('content')
+        except (ValueError, KeyError, IndexError, TypeError):
+            continue
+        if delta:
+            yield delta
+
+
+@support.route('/chat/stream', methods=['POST'])
+def support_chat_stream():
+    """Server-sent events: `token` events carry text deltas, a final `done` event carries the provider."""
+    data = request.get_json() or {}
+    message, history, context_mode, error = _read_chat_request(data)
+    if error:
+        return jsonify({'ok': False, 'message': error}), 400
+
+    sse_headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    reply, source = answer_locally(message, history, context_mode)
+    if reply:
+        local = (_sse('token', {'token': reply}), _sse('done', {'provider': source, 'used_fallback': False}))
+        return Response(local, mimetype='text/event-stream', headers=sse_headers)
+
+    api_key = (Config.GROQ_API_KEY or '').strip()
+    if not api_key:
+        return Response(_sse_fallback(message), mimetype='text/event-stream', headers=sse_headers)
+    # Built before taking a slot, so a failure here cannot leak it.
+    payload = _build_chat_payload(message, history, context_mode, stream=True)
+    if not _groq_gate.try_acquire():
+        return Response(
+            _sse_fallback(message, 'AI assistant is busy'), mimetype='text/event-stream', headers=sse_headers
+        )
+
+    def generate():
+        upstream = None
+        sent_any = False
+        tokens = []
+        try:
+            started = time.perf_counter()
+            try:
+                upstream = http_client.request(
+                    'groq', 'POST', Config.GROQ_API_URL, headers=_groq_headers(api_key), json=payload, stream=True
+                )
+            except Exception:
+                yield from _sse_fallback(message, 'Groq request failed')
+                return
+            if upstream.status_code >= 400:
+                yield from _sse_fallback(message, f'Groq request failed ({upstream.status_code})')
+                return
+
+            for token in _iter_stream_tokens(upstream):
+                sent_any = True
+                tokens.append(token)
+                yield _sse('token', {'token': token})
+
+            if sent_any:
+                remember_answer(message, history, context_mode, ''.join(tokens).strip(), (time.perf_counter() - started) * 1000)
+                yield _sse('done', {'provider': 'groq', 'used_fallback': False})
+            else:
+                yield from _sse_fallback(message)
+        except Exception:
+            if sent_any:
+                yield _sse('done', {'provider': 'groq', 'used_fallback': False, 'error': 'stream interrupted'})
+            else:
+                yield from _sse_fallback(message, 'Groq stream failed')
+        finally:
+            # Also runs on GeneratorExit when the browser disconnects: closing the
+            # upstream response aborts the Groq read and releases the worker.
+            if upstream is not None:
+                upstream.close()
+
+    response = Response(generate(), mimetype='text/event-stream', headers=sse_headers)
+    # Released when the WSGI server closes the response, even if the stream never started.
+    response.call_on_close(_groq_gate.release)
+    return response
 
 
 def _create_support_request(request_type, full_name, phone, preferred_time='', notes=''):
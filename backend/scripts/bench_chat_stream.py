@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Measure time-to-first-token for /support/chat vs /support/chat/stream.
+Runs a local fake Groq server that emits OpenAI-style `stream: true` chunks with
+a fixed first-token delay and per-token delay, and checks that a client
+disconnect aborts the upstream stream.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    first_token_ms = 200
+    token_ms = 25
+    tokens = 40
+    aborted = 0
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        words = [f"word{i} " for i in range(self.tokens)]
+        time.sleep(self.first_token_ms / 1000.0)
+
+        if not body.get("stream"):
+            time.sleep(self.token_ms * (self.tokens - 1) / 1000.0)
+            out = json.dumps({"choices": [{"message": {"content": "".join(words)}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for idx, word in enumerate(words):
+                if idx:
+                    time.sleep(self.token_ms / 1000.0)
+                chunk = json.dumps({"choices": [{"delta": {"content": word}}]})
+                self.wfile.write(f"data: {chunk}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            FakeGroqHandler.aborted += 1
+        self.close_connection = True
+
+    def log_message(self, *_args):
+        pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time-to-first-token benchmark for support chat streaming.")
+    parser.add_argument("--rounds", type=int, default=5, help="Requests per mode (default: 5)")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_stream_")
+    db_copy = os.path.join(tmp_dir, "bench.db")
+    shutil.copy(os.path.join(BACKEND_DIR, "dev.db"), db_copy)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGroqHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Config reads the environment at import time.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_copy}"
+    os.environ["GROQ_API_KEY"] = "bench-key"
+    os.environ["GROQ_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    # Measure the upstream path: no intent router or answer cache, no per-IP limit.
+    os.environ["SUPPORT_LOCAL_ANSWERS"] = "False"
+    os.environ["RATE_LIMIT_ENABLED"] = "False"
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+
+    client = app.test_client()
+    body = {"message": "fever medicine"}
+
+    blocking = []
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        client.post("/support/chat", json=body)
+        blocking.append((time.perf_counter() - started) * 1000)
+
+    ttft = []
+    totals = []
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        resp = client.post("/support/chat/stream", json=body, buffered=False)
+        first = None
+        for chunk in resp.response:
+            if first is None and b"event: token" in chunk:
+                first = (time.perf_counter() - started) * 1000
+        totals.append((time.perf_counter() - started) * 1000)
+        ttft.append(first)
+        resp.close()
+
+    # Disconnect after the first token: the upstream stream should be torn down early.
+    resp = client.post("/support/chat/stream", json=body, buffered=False)
+    next(iter(resp.response))
+    resp.close()
+    time.sleep((FakeGroqHandler.token_ms * 4) / 1000.0)
+
+    print(f"blocking /chat      full reply  p50 {statistics.median(blocking):7.1f} ms")
+    print(f"streaming /stream   first token p50 {statistics.median(ttft):7.1f} ms   full reply p50 {statistics.median(totals):7.1f} ms")
+    print(f"upstream streams aborted after client disconnect: {FakeGroqHandler.aborted}")
+
+    server.shutdown()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark scripts/update_medicine_images_from_csv.py: a --csv-rows image
+CSV against a catalog of --names medicines stocked by --pharmacies
+pharmacies, compared with the previous one-UPDATE-per-row approach timed
+on --legacy-rows rows and extrapolated. Runs against a scratch copy of dev.db
+migrated by init_db, so the catalog triggers are part of the cost.
+"""
+import argparse
+import csv
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(BACKEND_DIR, "scripts", "update_medicine_images_from_csv.py")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the CSV image updater.")
+    parser.add_argument("--names", type=int, default=50000)
+    parser.add_argument("--pharmacies", type=int, default=4)
+    parser.add_argument("--csv-rows", type=int, default=50000)
+    parser.add_argument("--legacy-rows", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_images_")
+    db_path = os.path.join(tmp_dir, "bench.db")
+    csv_path = os.path.join(tmp_dir, "images.csv")
+    shutil.copy(os.path.join(BACKEND_DIR, "dev.db"), db_path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, BACKEND_DIR)
+    from db import init_db
+
+    init_db()
+    conn = sqlite3.connect(db_path)
+    pharmacy_ids = [r[0] for r in conn.execute("SELECT id FROM pharmacies ORDER BY id LIMIT ?", (args.pharmacies,))]
+    conn.executemany(
+        "INSERT INTO medicines (pharmacy_id, name, strength, unit, price, available, stock_qty) VALUES (?, ?, ?, 'strip', 25, 1, 10)",
+        ((pharmacy_id, f"Bench Medicine {n}", f"{n % 9 * 50 + 50}mg") for n in range(args.names) for pharmacy_id in pharmacy_ids),
+    )
+    conn.commit()
+    catalog_rows = conn.execute("SELECT COUNT(*) FROM medicines").fetchone()[0]
+    conn.close()
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "strength", "image_url"])
+        for n in range(args.csv_rows):
+            # ~2% of rows name medicines that do not exist.
+            name = f"Bench Medicine {n}" if n % 50 else f"Missing Medicine {n}"
+            writer.writerow([name.upper(), f"{n % 9 * 50 + 50}MG", f"https://images.example.com/{n}.jpg"])
+
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, SCRIPT, "--csv", csv_path, "--db", db_path, "--show", "0"],
+                            capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(line for line in result.stdout.splitlines() if line.split(":")[0] in ("Updated rows", "No match rows"))
+
+    conn = sqlite3.connect(db_path)
+    started = time.perf_counter()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for n, row in enumerate(csv.DictReader(f)):
+            if n == args.legacy_rows:
+                break
+            conn.execute(
+                "UPDATE medicines SET image_url = ? WHERE LOWER(name) = LOWER(?) AND LOWER(COALESCE(strength, '')) = LOWER(COALESCE(?, ''))",
+                (row["image_url"] + "?v=2", row["name"], row["strength"]),
+            )
+    legacy_per_row = (time.perf_counter() - started) / args.legacy_rows
+    conn.rollback()
+    conn.close()
+
+    print(f"catalog {catalog_rows} medicines, CSV {args.csv_rows} rows")
+    print(f"temp-table join      {elapsed:8.2f}s  ({summary})")
+    print(f"per-row UPDATE       {legacy_per_row * 1000:8.2f} ms/row -> ~{legacy_per_row * args.csv_rows:,.0f}s for the full CSV")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark scripts/import_medicines_csv.py on a synthetic CSV of --rows
+medicines spread over --pharmacies pharmacies: a cold insert, a dry run and
+an upsert re-run with ~10% changed prices (single process and --workers),
+plus the previous row-at-a-time importer logic on a sample for comparison.
+Runs against a scratch copy of dev.db.
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTER = os.path.join(BACKEND_DIR, "scripts", "import_medicines_csv.py")
+HEADER = ["pharmacy_id", "name", "strength", "unit", "price", "available", "stock_qty", "mrp", "offer_text", "image_url", "category"]
+
+
+def write_csv(path, rows, pharmacy_ids, seed, changed_share=0.0):
+    rng = random.Random(seed)
+    change = random.Random(seed + 1)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            price = 20 + (i * 7919) % 480
+            if changed_share and change.random() < changed_share:
+                price += 1
+            writer.writerow([
+                pharmacy_ids[i % len(pharmacy_ids)], f"Synthetic Medicine {i // len(pharmacy_ids)}",
+                f"{(i // len(pharmacy_ids)) % 9 * 50 + 50}mg", "strip", price, 1, rng.randint(0, 400),
+                round(price * 1.25, 2), "", "", "Everyday",
+            ])
+
+
+def run_importer(csv_path, db_path, *extra):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, IMPORTER, "--csv", csv_path, "--db", db_path, *extra],
+        capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - started
+    summary = [line for line in result.stdout.splitlines() if line.split(":")[0] in ("Inserted", "Updated", "Unchanged")]
+    return elapsed, ", ".join(summary)
+
+
+def legacy_import(csv_path, db_path, limit):
+    """Per-row pharmacy SELECT, LOWER(name) lookup and INSERT/UPDATE, as the importer used to do."""
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    started = time.perf_counter()
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for n, row in enumerate(csv.DictReader(f)):
+            if n == limit:
+                break
+            cur.execute("SELECT id FROM pharmacies WHERE id = ?", (int(row["pharmacy_id"]),))
+            cur.fetchone()
+            cur.execute(
+                "SELECT id FROM medicines WHERE pharmacy_id = ? AND LOWER(name) = LOWER(?)"
+                " AND LOWER(COALESCE(strength, '')) = LOWER(COALESCE(?, ''))",
+                (int(row["pharmacy_id"]), row["name"], row["strength"]),
+            )
+            existing = cur.fetchone()
+            if existing:
+                cur.execute("UPDATE medicines SET price = ?, stock_qty = ? WHERE id = ?",
+                            (float(row["price"]), int(row["stock_qty"]), existing[0]))
+            else:
+                cur.execute(
+                    "INSERT INTO medicines (pharmacy_id, name, strength, unit, price, available, stock_qty)"
+                    " VALUES (?, ?, ?, 'strip', ?, 1, ?)",
+                    (int(row["pharmacy_id"]), row["name"], row["strength"], float(row["price"]), int(row["stock_qty"])),
+                )
+    conn.rollback()
+    conn.close()
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the streaming medicines CSV importer.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pharmacies", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--legacy-rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_import_")
+    db_path = os.path.join(tmp_dir, "bench.db")
+    shutil.copy(os.path.join(BACKEND_DIR, "dev.db"), db_path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    sys.path.insert(0, BACKEND_DIR)
+    from db import init_db
+
+    init_db()
+    conn = sqlite3.connect(db_path)
+    existing = [r[0] for r in conn.execute("SELECT id FROM pharmacies ORDER BY id")]
+    for n in range(len(existing), args.pharmacies):
+        conn.execute("INSERT INTO pharmacies (name, location, is_approved) VALUES (?, 'Bench', 1)", (f"Bench Pharmacy {n}",))
+    conn.commit()
+    pharmacy_ids = [r[0] for r in conn.execute("SELECT id FROM pharmacies ORDER BY id LIMIT ?", (args.pharmacies,))]
+    conn.close()
+
+    first_csv = os.path.join(tmp_dir, "first.csv")
+    second_csv = os.path.join(tmp_dir, "second.csv")
+    write_csv(first_csv, args.rows, pharmacy_ids, seed=1)
+    write_csv(second_csv, args.rows, pharmacy_ids, seed=1, changed_share=0.1)
+
+    print(f"{args.rows} rows, {args.pharmacies} pharmacies, CSV {os.path.getsize(first_csv) / 1e6:.0f} MB")
+    for label, csv_path, extra in (
+        ("cold insert, 1 process     ", first_csv, ()),
+        ("dry run, 10% changed       ", second_csv, ("--dry-run", "--show", "0")),
+        ("upsert, 10% changed        ", second_csv, ()),
+        (f"upsert again, {args.workers} workers   ", first_csv, ("--workers", str(args.workers))),
+    ):
+        elapsed, summary = run_importer(csv_path, db_path, *extra)
+        print(f"{label} {elapsed:7.1f}s  {args.rows / elapsed:>9,.0f} rows/s  {summary}")
+
+    elapsed = legacy_import(second_csv, db_path, args.legacy_rows)
+    print(f"previous importer, {args.legacy_rows} rows {elapsed:7.1f}s  {args.legacy_rows / elapsed:>9,.0f} rows/s")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
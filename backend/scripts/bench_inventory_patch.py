@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark PATCH /seller/inventory with --rows stock/price changes per request
+(half addressed by sku, half by name+strength) against the one-row-per-
+transaction pattern a POS would otherwise use.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark bulk inventory updates.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_inventory_")
+    shutil.copy(os.path.join(BACKEND_DIR, "dev.db"), os.path.join(tmp_dir, "bench.db"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["STRIPE_EVENT_WORKERS"] = "0"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+    from db import get_connection
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("INSERT INTO pharmacies (name, location, is_approved) VALUES ('Bench POS Pharmacy', 'Bench', 1)")
+    pharmacy_id = cur.lastrowid
+    cur.executemany(
+        "INSERT INTO medicines (pharmacy_id, name, strength, unit, price, mrp, offer_text, stock_qty)"
+        " VALUES (?, ?, ?, 'strip', 50, 60, '17% OFF', 10)",
+        [(pharmacy_id, f"Bench Medicine {i}", f"{i % 7 * 100 + 50}mg") for i in range(args.rows)],
+    )
+    conn.commit()
+    medicines = [tuple(r) for r in cur.execute(
+        "SELECT id, name, strength FROM medicines WHERE pharmacy_id = ? ORDER BY id", (pharmacy_id,)
+    ).fetchall()]
+    conn.close()
+
+    rng = random.Random(3)
+
+    def batch():
+        rows = []
+        for i, (medicine_id, name, strength) in enumerate(medicines):
+            change = {"stock_qty": rng.randint(0, 500), "price": round(rng.uniform(20, 60), 2)}
+            rows.append({"sku": medicine_id, **change} if i % 2 else {"name": name, "strength": strength, **change})
+        return rows
+
+    client = app.test_client()
+    json_ms, ndjson_ms = [], []
+    for _ in range(args.rounds):
+        rows = batch()
+        started = time.perf_counter()
+        response = client.patch("/seller/inventory", json={"pharmacy_id": pharmacy_id, "items": rows})
+        json_ms.append((time.perf_counter() - started) * 1000)
+        assert response.json["summary"] == {"updated": len(rows)}, response.json["summary"]
+
+        body = "\n".join(json.dumps(r) for r in batch())
+        started = time.perf_counter()
+        response = client.patch(f"/seller/inventory?pharmacy_id={pharmacy_id}", data=body,
+                                content_type="application/x-ndjson")
+        ndjson_ms.append((time.perf_counter() - started) * 1000)
+        assert response.json["summary"] == {"updated": len(rows)}, response.json["summary"]
+
+    # Baseline: one UPDATE + commit per row, as separate single-item calls would do.
+    rows = batch()
+    conn = get_connection()
+    started = time.perf_counter()
+    for row in rows:
+        if "sku" in row:
+            conn.execute("UPDATE medicines SET stock_qty = ?, price = ? WHERE id = ? AND pharmacy_id = ?",
+                         (row["stock_qty"], row["price"], row["sku"], pharmacy_id))
+        else:
+            conn.execute(
+                "UPDATE medicines SET stock_qty = ?, price = ? WHERE pharmacy_id = ? AND LOWER(TRIM(name)) = LOWER(?)"
+                " AND LOWER(strength) = LOWER(?)",
+                (row["stock_qty"], row["price"], pharmacy_id, row["name"], row["strength"]),
+            )
+        conn.commit()
+    baseline_ms = (time.perf_counter() - started) * 1000
+    conn.close()
+
+    json_median = statistics.median(json_ms)
+    print(f"{args.rows} rows per request")
+    print(f"PATCH JSON    {json_median:8.0f} ms  ({args.rows / json_median * 1000:,.0f} rows/s)")
+    print(f"PATCH NDJSON  {statistics.median(ndjson_ms):8.0f} ms")
+    print(f"row-by-row    {baseline_ms:8.0f} ms  ({args.rows / baseline_ms * 1000:,.0f} rows/s)")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
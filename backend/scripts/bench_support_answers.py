@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Replay a repetitive support-chat trace against a mock LLM and report how many
+questions the intent router and answer cache served locally, plus the
+upstream latency they saved (from /health/support-chat).
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Spelling/punctuation variants of what users actually type, most frequent first.
+QUESTION_GROUPS = [
+    ["Order kaha hai?", "order kaha hai", "mera order kab aayega", "track my order"],
+    ["fever medicine", "Fever ke liye medicine?", "fever medicine chahiye"],
+    ["vitamin c price", "Vitamin C price?", "vitamin c ka price kya hai"],
+    ["delivery charges kitne hai", "delivery time kya hai", "Express delivery?"],
+    ["hi", "Hello!", "namaste"],
+    ["dry cough syrup", "dry cough ke liye syrup"],
+    ["baby diapers", "baby diapers chahiye"],
+    ["acne cream", "Acne cream?"],
+    ["blood pressure tablet", "blood pressure ki tablet"],
+    ["zinc tablets immunity"],
+]
+
+LLM_LATENCY_MS = 300
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(LLM_LATENCY_MS / 1000.0)
+        out = json.dumps({"choices": [{"message": {"content": "Search page par options dekhiye."}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *_args):
+        pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure local answer rate for repeated support questions.")
+    parser.add_argument("--requests", type=int, default=200, help="Questions in the replayed trace (default: 200)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_answers_")
+    db_copy = os.path.join(tmp_dir, "bench.db")
+    shutil.copy(os.path.join(BACKEND_DIR, "dev.db"), db_copy)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Config reads the environment at import time.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_copy}"
+    os.environ["GROQ_API_KEY"] = "bench-key"
+    os.environ["GROQ_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    # The replayed trace is far above the per-IP support limit; it measures answers, not throttling.
+    os.environ["RATE_LIMIT_ENABLED"] = "False"
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+
+    rng = random.Random(args.seed)
+    # Zipf-like popularity: group i is picked with weight 1/(i+1).
+    weights = [1.0 / (i + 1) for i in range(len(QUESTION_GROUPS))]
+    client = app.test_client()
+    latencies = {}
+    for _ in range(args.requests):
+        group = rng.choices(QUESTION_GROUPS, weights=weights)[0]
+        started = time.perf_counter()
+        resp = client.post("/support/chat", json={"message": rng.choice(group)})
+        provider = resp.get_json().get("provider")
+        latencies.setdefault(provider, []).append((time.perf_counter() - started) * 1000)
+
+    report = client.get("/health/support-chat").get_json()["answers"]
+    for provider, values in sorted(latencies.items()):
+        print(f"{provider:<8} {len(values):>5} requests   p50 {statistics.median(values):8.1f} ms")
+    print(
+        f"local answer rate {report['local_answer_rate']:.0%} "
+        f"(router {report['router_hits']}, cache {report['cache_hits']}, upstream {report['upstream_calls']})"
+    )
+    print(f"estimated upstream time saved: {report['estimated_saved_ms'] / 1000:.1f} s")
+
+    server.shutdown()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
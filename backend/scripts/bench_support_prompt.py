@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark /support/chat catalog context: BM25 retrieval vs the static top-60 snapshot.
+Starts a local mock LLM server whose latency grows with prompt size and which answers
+with the first catalog item in its prompt that matches the question, then reports
+prompt size, upstream latency and grounding for both modes.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    "fever ke liye kya lu",
+    "vitamin c price",
+    "bukhar aur sar dard",
+    "diabetes sugar control medicine",
+    "dry cough syrup",
+    "baby diapers chahiye",
+    "acne cream",
+    "blood pressure tablet",
+    "allergy itching",
+    "eye drops for dry eyes",
+    "sanitary pads",
+    "zinc tablets immunity",
+]
+
+PREFILL_MS_PER_TOKEN = 0.25
+BASE_LATENCY_MS = 40.0
+
+
+def make_mock_handler(tokenize):
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            messages = body.get("messages", [])
+            prompt_chars = sum(len(m.get("content", "")) for m in messages)
+            time.sleep((BASE_LATENCY_MS + prompt_chars / 4 * PREFILL_MS_PER_TOKEN) / 1000.0)
+
+            question = set(tokenize(messages[-1]["content"])) if messages else set()
+            catalog_lines = [
+                line[2:].split(" | ")[0]
+                for m in messages
+                if m.get("role") == "system"
+                for line in m.get("content", "").splitlines()
+                if line.startswith("- ")
+            ]
+            pick = next((name for name in catalog_lines if question & set(tokenize(name))), None)
+            reply = f"Aap {pick} dekh sakte hain." if pick else "Kripya Search page par check karein."
+            out = json.dumps({"choices": [{"message": {"content": reply}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def log_message(self, *_args):
+            pass
+
+    return MockLLMHandler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare retrieval vs snapshot chat prompts against a mock LLM.")
+    parser.add_argument("--db", help="SQLite DB to copy for the run (default: backend/dev.db)")
+    parser.add_argument("--rounds", type=int, default=3, help="Times each query is sent per mode (default: 3)")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_support_")
+    db_copy = os.path.join(tmp_dir, "bench.db")
+    shutil.copy(args.db or os.path.join(BACKEND_DIR, "dev.db"), db_copy)
+
+    # Config reads the environment at import time, so set everything before importing backend modules.
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_mock_handler(lambda text: []))
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_copy}"
+    os.environ["GROQ_API_KEY"] = "bench-key"
+    os.environ["GROQ_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    # Measure the upstream path: no intent router or answer cache, no per-IP limit.
+    os.environ["SUPPORT_LOCAL_ANSWERS"] = "False"
+    os.environ["RATE_LIMIT_ENABLED"] = "False"
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+    from retrieval import tokenize
+    from routes.support_routes import _catalog_messages
+
+    server.RequestHandlerClass = make_mock_handler(tokenize)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = app.test_client()
+    print(f"{'mode':<10} {'prompt tok (avg)':>17} {'latency ms p50':>15} {'latency ms p95':>15} {'grounded':>9}")
+    for mode in ("snapshot", "retrieval"):
+        prompt_tokens = []
+        latencies = []
+        grounded = 0
+        total = 0
+        for _ in range(args.rounds):
+            for query in QUERIES:
+                context = _catalog_messages(query, mode)
+                prompt_tokens.append(sum(len(m["content"]) for m in context) / 4)
+                started = time.perf_counter()
+                resp = client.post("/support/chat", json={"message": query, "context_mode": mode})
+                latencies.append((time.perf_counter() - started) * 1000)
+                payload = resp.get_json()
+                if payload.get("provider") != "groq":
+                    print(f"Upstream call failed for {query!r}: {payload.get('error', 'fallback used')}")
+                total += 1
+                grounded += 0 if "Search page" in payload.get("reply", "") else 1
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(
+            f"{mode:<10} {statistics.mean(prompt_tokens):>17.0f} {statistics.median(latencies):>15.1f} "
+            f"{p95:>15.1f} {grounded / total:>8.0%}"
+        )
+
+    server.shutdown()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark /admin/analytics/timeseries on a synthetic order history.
+Bulk-loads --orders orders (one line item each) spread over a year into a
+scratch database, backfills sales_rollups the way init_db does for existing
+data, then times 90-day queries against the rollups and against raw orders
+with TEXT (DATE(created_at)) and integer (created_ts) range predicates.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark time-series analytics over synthetic orders.")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--pharmacies", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_timeseries_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+    # Keep background workers off the scratch database while it is bulk-loaded.
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["STRIPE_EVENT_WORKERS"] = "0"
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+    from db import get_connection, rebuild_sales_rollups
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT id, pharmacy_id FROM medicines")
+    medicines = [(r["id"], r["pharmacy_id"]) for r in cur.fetchall()]
+    existing = {r["id"] for r in cur.execute("SELECT id FROM pharmacies").fetchall()}
+    for pharmacy_id in range(1, args.pharmacies + 1):
+        if pharmacy_id not in existing:
+            cur.execute("INSERT INTO pharmacies (id, name, location, is_approved) VALUES (?, ?, 'Bench', 1)",
+                        (pharmacy_id, f"Bench Pharmacy {pharmacy_id}"))
+
+    # Bulk load without per-row triggers, then backfill rollups in one pass.
+    triggers = cur.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('orders', 'order_items')"
+    ).fetchall()
+    for trigger in triggers:
+        cur.execute(f"DROP TRIGGER {trigger['name']}")
+
+    rng = random.Random(42)
+    now = int(time.time())
+    load_started = time.perf_counter()
+    batch_orders = []
+    batch_items = []
+    for order_id in range(1, args.orders + 1):
+        created_ts = now - rng.randrange(365 * 86400)
+        amount = round(rng.uniform(40, 900), 2)
+        medicine_id, _ = rng.choice(medicines)
+        batch_orders.append((order_id, f"BENCH-{order_id}", rng.randint(1, args.pharmacies), amount,
+                             time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(created_ts)), created_ts))
+        batch_items.append((order_id, medicine_id, rng.randint(1, 4), amount))
+        if len(batch_orders) == 50000 or order_id == args.orders:
+            cur.executemany(
+                "INSERT INTO orders (id, order_number, pharmacy_id, total_amount, created_at, created_ts, status)"
+                " VALUES (?, ?, ?, ?, ?, ?, 'delivered')",
+                batch_orders,
+            )
+            cur.executemany(
+                "INSERT INTO order_items (order_id, medicine_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+                batch_items,
+            )
+            batch_orders.clear()
+            batch_items.clear()
+    load_seconds = time.perf_counter() - load_started
+
+    rebuild_started = time.perf_counter()
+    rebuild_sales_rollups(cur)
+    rebuild_seconds = time.perf_counter() - rebuild_started
+    for trigger in triggers:
+        cur.execute(trigger["sql"])
+    conn.commit()
+    rollup_rows = cur.execute("SELECT COUNT(*) AS c FROM sales_rollups").fetchone()["c"]
+
+    start_ts = now - 90 * 86400
+    start_text = time.strftime("%Y-%m-%d", time.gmtime(start_ts))
+
+    def raw_text():
+        cur.execute(
+            "SELECT DATE(created_at) AS d, COUNT(*), SUM(total_amount) FROM orders"
+            " WHERE DATE(created_at) >= ? GROUP BY d",
+            (start_text,),
+        ).fetchall()
+
+    def raw_epoch():
+        cur.execute(
+            "SELECT created_ts / 86400 AS d, COUNT(*), SUM(total_amount) FROM orders"
+            " WHERE created_ts >= ? AND created_ts < ? GROUP BY d",
+            (start_ts, now),
+        ).fetchall()
+
+    client = app.test_client()
+    base = f"/admin/analytics/timeseries?start={start_ts}&end={now}"
+
+    print(f"loaded {args.orders} orders in {load_seconds:.1f}s, rollup backfill {rebuild_seconds:.1f}s ({rollup_rows} rows)")
+    print(f"raw orders, DATE(created_at) filter   {timed(raw_text, args.rounds):9.1f} ms")
+    print(f"raw orders, created_ts range          {timed(raw_epoch, args.rounds):9.1f} ms")
+    for label, query in (
+        ("API day buckets, all pharmacies     ", "&granularity=day"),
+        ("API day buckets, one pharmacy       ", "&granularity=day&pharmacy_id=7"),
+        ("API day buckets, one category       ", "&granularity=day&category=Vitamins"),
+        ("API week buckets                    ", "&granularity=week"),
+        ("API hour buckets, 60 points         ", "&granularity=hour&points=60"),
+    ):
+        ms = timed(lambda: client.get(base + query), args.rounds)
+        print(f"{label}  {ms:9.1f} ms")
+
+    conn.close()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Cost of authenticating a request: HMAC token verification vs a users-table lookup.
+Reports microseconds per call for verify_token() alone, for the full
+before_request hook via the Flask test client, and for the SQLite lookup it replaces.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def per_call_us(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) * 1e6 / iterations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark signed-token verification.")
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_tokens_")
+    db_copy = os.path.join(tmp_dir, "bench.db")
+    shutil.copy(os.path.join(BACKEND_DIR, "dev.db"), db_copy)
+
+    # Config reads the environment at import time.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_copy}"
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+    from auth_tokens import create_token, verify_token
+    from db import get_connection
+
+    token = create_token(1, email="bench@example.com", name="Bench")
+    verify_us = per_call_us(lambda: verify_token(token), args.iterations)
+
+    def db_lookup():
+        conn = get_connection()
+        conn.execute("SELECT id, full_name, email FROM users WHERE id = ?", (1,)).fetchone()
+        conn.close()
+
+    lookup_us = per_call_us(db_lookup, args.iterations // 10)
+
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    rounds = max(1, args.iterations // 50)
+    with_token = per_call_us(lambda: client.get("/health", headers=headers), rounds)
+    without_token = per_call_us(lambda: client.get("/health"), rounds)
+
+    print(f"verify_token()                  {verify_us:8.2f} us/call")
+    print(f"users lookup (connect + SELECT) {lookup_us:8.2f} us/call")
+    print(f"/health with bearer token       {with_token:8.2f} us/request")
+    print(f"/health without token           {without_token:8.2f} us/request")
+    print(f"before_request overhead         {with_token - without_token:8.2f} us/request")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
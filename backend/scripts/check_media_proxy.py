@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Exercise GET /media/medicine/<id> against a local stub image server: a burst
+of concurrent requests for one uncached image must reach the upstream once,
+the second medicine sharing that URL and every size after it must be served
+from disk, conditional requests must get 304, and a failing upstream must be
+negatively cached. The stub is on loopback, so private hosts are allowed for
+the run; the last check turns that off and expects the same host to be
+refused without a fetch. Runs against a scratch copy of dev.db and a scratch
+MEDIA_CACHE_DIR.
+"""
+import argparse
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_png(width, height):
+    """A solid-colour RGB PNG built with zlib only, so the stub works without Pillow."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    raw = b"".join(b"\x00" + b"\x30\x90\xd0" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+class StubImageHandler(BaseHTTPRequestHandler):
+    hits = {}
+    hits_lock = threading.Lock()
+    delay = 0.0
+    image = b""
+
+    def do_GET(self):
+        with self.hits_lock:
+            self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        time.sleep(self.delay)
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = b"<html>not an image</html>" if self.path.startswith("/page") else self.image
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check the /media image proxy against a stub upstream.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--upstream-delay", type=float, default=0.3, help="Seconds the stub waits before answering")
+    parser.add_argument("--size", type=int, default=1200, help="Stub image edge in px")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="check_media_")
+    shutil.copy(os.path.join(BACKEND_DIR, "dev.db"), os.path.join(tmp_dir, "check.db"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'check.db')}"
+    os.environ["MEDIA_CACHE_DIR"] = os.path.join(tmp_dir, "media")
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["STRIPE_EVENT_WORKERS"] = "0"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["MEDIA_ALLOW_PRIVATE_HOSTS"] = "True"
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+    from config import Config
+    from db import get_connection
+
+    StubImageHandler.delay = args.upstream_delay
+    StubImageHandler.image = make_png(args.size, args.size // 2)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub = f"http://127.0.0.1:{server.server_address[1]}"
+
+    conn = get_connection()
+    cur = conn.cursor()
+    pharmacy_id = cur.execute("SELECT id FROM pharmacies ORDER BY id LIMIT 1").fetchone()[0]
+    ids = {}
+    for label, url in (("first", f"{stub}/pack.png"), ("twin", f"{stub}/pack.png"),
+                       ("missing", f"{stub}/missing.png"), ("page", f"{stub}/page.png"),
+                       ("private", f"{stub}/private.png")):
+        cur.execute("INSERT INTO medicines (pharmacy_id, name, strength, unit, price, image_url) VALUES (?, ?, '1mg', 'strip', 10, ?)",
+                    (pharmacy_id, f"Media Check {label}", url))
+        ids[label] = cur.lastrowid
+    conn.commit()
+    conn.close()
+
+    client = app.test_client()
+    failures = []
+
+    def check(ok, message):
+        print(f"{'ok  ' if ok else 'FAIL'} {message}")
+        if not ok:
+            failures.append(message)
+
+    served = client.get(f"/medicines/{ids['first']}").json["medicine"]["image_url"]
+    check(served.startswith(f"/media/medicine/{ids['first']}?v="), f"serialized image_url is the proxy URL ({served})")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        responses = list(pool.map(lambda _: app.test_client().get(served), range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    statuses = {r.status_code for r in responses}
+    etags = {r.headers.get("ETag") for r in responses}
+    check(statuses == {200}, f"{args.concurrency} concurrent cold requests answered 200 in {elapsed:.2f}s ({statuses})")
+    check(StubImageHandler.hits.get("/pack.png") == 1, f"upstream fetched once (hits={StubImageHandler.hits.get('/pack.png')})")
+    check(len(etags) == 1, f"one strong ETag for all responses ({etags})")
+    first = responses[0]
+    check(first.headers["Cache-Control"] == "public, max-age=31536000, immutable", "versioned URL is cached immutably")
+    try:
+        import PIL  # noqa: F401
+        check(len(first.data) < len(StubImageHandler.image), f"card thumbnail {len(first.data)} B vs original {len(StubImageHandler.image)} B ({first.mimetype})")
+    except ImportError:
+        check(first.data == StubImageHandler.image, "Pillow not installed: original served for thumbnail sizes")
+
+    etag = first.headers["ETag"]
+    not_modified = client.get(served, headers={"If-None-Match": etag})
+    check(not_modified.status_code == 304, f"If-None-Match revalidates with 304 ({not_modified.status_code})")
+
+    twin = client.get(f"/media/medicine/{ids['twin']}")
+    check(twin.status_code == 200 and twin.headers["ETag"] == etag, "second medicine with the same URL reuses the cached file")
+    check(twin.headers["Cache-Control"] == "public, no-cache", "unversioned URL must revalidate")
+    for size in ("thumb", "full"):
+        response = client.get(f"{served}&size={size}")
+        check(response.status_code == 200, f"size={size}: {len(response.data)} B {response.mimetype}")
+    full = client.get(f"{served}&size=full")
+    check(full.data == StubImageHandler.image, "size=full returns the original bytes")
+    check(StubImageHandler.hits.get("/pack.png") == 1, "still one upstream fetch after all sizes")
+
+    started = time.perf_counter()
+    for _ in range(200):
+        client.get(served)
+    check(True, f"warm request {(time.perf_counter() - started) / 200 * 1000:.2f} ms")
+
+    for label in ("missing", "page"):
+        first_try = client.get(f"/media/medicine/{ids[label]}")
+        second_try = client.get(f"/media/medicine/{ids[label]}")
+        path = f"/{label}.png"
+        check(first_try.status_code == 502 and second_try.status_code == 502,
+              f"{label}: 502 ({first_try.json['message']})")
+        check(StubImageHandler.hits.get(path) == 1, f"{label}: failure cached, upstream hit once (hits={StubImageHandler.hits.get(path)})")
+
+    check(client.get("/media/medicine/999999999").status_code == 404, "unknown medicine is 404")
+    check(client.get(f"{served}&size=huge").status_code == 400, "unknown size is 400")
+
+    Config.MEDIA_ALLOW_PRIVATE_HOSTS = False
+    refused = client.get(f"/media/medicine/{ids['private']}")
+    check(refused.status_code == 403 and "/private.png" not in StubImageHandler.hits,
+          f"loopback host refused without a fetch ({refused.status_code} {refused.json['message']})")
+
+    server.shutdown()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    print("all checks passed" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,37 @@
 #!/usr/bin/env python3
+"""
+Stream medicines from a CSV into SQLite.
+
+Rows are read and validated in batches (optionally on --workers processes)
+against a pharmacy id set loaded once, then written with executemany
+upserts whose conflict target is the idx_medicines_identity unique index,
+committing every --chunk-size rows. Memory stays bounded by the chunk size.
+--dry-run compares each chunk with the database and reports what would be
+inserted or updated without writing anything.
+"""
 import argparse
 import csv
 import os
 import sqlite3
-from typing import Tuple
+import sys
+import time
+from itertools import islice
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import MEDICINE_IDENTITY, ensure_medicine_identity_index  # noqa: E402
+
+REQUIRED_COLUMNS = ("pharmacy_id", "name", "strength", "unit", "price", "available", "stock_qty")
+OPTIONAL_COLUMNS = ("category", "use_for")
+# Written on every import; category/use_for only when the CSV has them.
+BASE_FIELDS = ("pharmacy_id", "name", "strength", "unit", "price", "mrp", "offer_text", "image_url", "available", "stock_qty")
+UPDATE_FIELDS = ("unit", "price", "mrp", "offer_text", "image_url", "available", "stock_qty")
+MAX_PRINTED_ERRORS = 50
+
+_pharmacy_ids = frozenset()
+_columns = {}
+_optional = ()
 
 
 def resolve_db_path(user_db_path: str | None) -> str:
@@ -36,25 +64,140 @@ def parse_available(value: str, row_no: int) -> int:
     raise ValueError(f"Row {row_no}: invalid available='{value}' (use 1/0 or true/false)")
 
 
-def validate_pharmacy(cur: sqlite3.Cursor, pharmacy_id: int, row_no: int) -> None:
-    cur.execute("SELECT id FROM pharmacies WHERE id = ?", (pharmacy_id,))
-    if not cur.fetchone():
+def _init_worker(pharmacy_ids, columns, optional):
+    global _pharmacy_ids, _columns, _optional
+    _pharmacy_ids, _columns, _optional = pharmacy_ids, columns, optional
+
+
+def parse_row(row: list, row_no: int) -> tuple:
+    def get(field):
+        index = _columns.get(field)
+        return row[index] if index is not None and index < len(row) else ""
+
+    pharmacy_id = parse_int(get("pharmacy_id"), "pharmacy_id", row_no)
+    name = get("name").strip()
+    strength = get("strength").strip()
+    unit = get("unit").strip() or "strip"
+    price = parse_float(get("price"), "price", row_no)
+    available = parse_available(get("available"), row_no)
+    stock_qty = parse_int(get("stock_qty"), "stock_qty", row_no)
+    image_url = get("image_url").strip() or "/medicine-placeholder.svg"
+    offer_text = get("offer_text").strip()
+    mrp_raw = get("mrp").strip()
+    mrp = parse_float(mrp_raw, "mrp", row_no) if mrp_raw else round(price * 1.2, 2)
+
+    if not name:
+        raise ValueError(f"Row {row_no}: name is required")
+    if price < 0:
+        raise ValueError(f"Row {row_no}: price cannot be negative")
+    if mrp < price:
+        raise ValueError(f"Row {row_no}: mrp cannot be lower than price")
+    if stock_qty < 0:
+        raise ValueError(f"Row {row_no}: stock_qty cannot be negative")
+    if pharmacy_id not in _pharmacy_ids:
         raise ValueError(f"Row {row_no}: pharmacy_id={pharmacy_id} not found in pharmacies table")
+    if not offer_text:
+        offer_pct = int(round(((mrp - price) * 100.0) / mrp)) if mrp > price else 0
+        offer_text = f"{offer_pct}% OFF" if offer_pct > 0 else "Best Price"
+
+    record = (pharmacy_id, name, strength, unit, price, mrp, offer_text, image_url, available, stock_qty)
+    return record + tuple(get(field).strip() for field in _optional)
+
+
+def parse_batch(batch):
+    """(first_row_no, raw rows) -> (records, errors); runs in worker processes when --workers > 1."""
+    first_row_no, rows = batch
+    records, errors = [], []
+    for offset, row in enumerate(rows):
+        try:
+            records.append(parse_row(row, first_row_no + offset))
+        except ValueError as err:
+            errors.append(str(err))
+    return records, errors
+
+
+def iter_batches(reader, size, first_row_no=2):
+    row_no = first_row_no
+    while True:
+        rows = list(islice(reader, size))
+        if not rows:
+            return
+        yield row_no, rows
+        row_no += len(rows)
+
+
+def build_upsert_sql(fields, mode):
+    placeholders = ", ".join("?" for _ in fields)
+    sql = f"INSERT INTO medicines ({', '.join(fields)}) VALUES ({placeholders}) ON CONFLICT({MEDICINE_IDENTITY}) "
+    if mode == "insert":
+        return sql + "DO NOTHING"
+    updates = [f for f in fields if f in UPDATE_FIELDS or f in OPTIONAL_COLUMNS]
+    # Identical rows are left untouched: no write, no row_version bump.
+    changed = " OR ".join(f"medicines.{f} IS NOT excluded.{f}" for f in updates)
+    return sql + f"DO UPDATE SET {', '.join(f'{f} = excluded.{f}' for f in updates)} WHERE {changed}"
 
 
-def find_existing(cur: sqlite3.Cursor, pharmacy_id: int, name: str, strength: str) -> Tuple[int, ...] | None:
+def write_chunk(conn, sql, records):
+    """Upsert one chunk in its own transaction; returns (inserted, updated, unchanged_or_skipped)."""
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM medicines")
+    max_id_before = cur.fetchone()[0]
+    cur.executemany(sql, records)
+    written = cur.rowcount
+    # AUTOINCREMENT ids only grow, so new rows are exactly those above the previous maximum.
+    cur.execute("SELECT COUNT(*) FROM medicines WHERE id > ?", (max_id_before,))
+    inserted = cur.fetchone()[0]
+    conn.commit()
+    return inserted, written - inserted, len(records) - written
+
+
+def diff_chunk(conn, fields, records, mode, show, shown):
+    """
+    Dry run: compare one chunk with the database; returns (would_insert,
+    would_update, unchanged_or_skipped, field_counts). In insert mode existing
+    rows are skipped (ON CONFLICT DO NOTHING), never updated.
+    """
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS temp.import_stage")
+    cur.execute(f"CREATE TEMP TABLE import_stage (seq INTEGER PRIMARY KEY, {', '.join(fields)})")
+    cur.executemany(
+        f"INSERT INTO import_stage ({', '.join(fields)}) VALUES ({', '.join('?' for _ in fields)})", records
+    )
+    compared = [f for f in fields if f in UPDATE_FIELDS or f in OPTIONAL_COLUMNS]
     cur.execute(
+        f"""
+        SELECT s.pharmacy_id, s.name, s.strength, m.id AS existing_id,
+               {', '.join(f's.{f} AS new_{f}, m.{f} AS old_{f}' for f in compared)}
+        FROM import_stage s
+        LEFT JOIN medicines m
+          ON m.pharmacy_id = s.pharmacy_id
+         AND LOWER(TRIM(m.name)) = LOWER(TRIM(s.name))
+         AND LOWER(TRIM(COALESCE(m.strength, ''))) = LOWER(TRIM(COALESCE(s.strength, '')))
+        ORDER BY s.seq
         """
-        SELECT id
-        FROM medicines
-        WHERE pharmacy_id = ?
-          AND LOWER(name) = LOWER(?)
-          AND LOWER(COALESCE(strength, '')) = LOWER(COALESCE(?, ''))
-        """,
-        (pharmacy_id, name, strength),
     )
-    row = cur.fetchone()
-    return tuple(row) if row else None
+    would_insert = would_update = unchanged = 0
+    field_counts = {}
+    for row in cur.fetchall():
+        if row["existing_id"] is None:
+            would_insert += 1
+            continue
+        if mode == "insert":
+            unchanged += 1
+            continue
+        changes = [(f, row[f"old_{f}"], row[f"new_{f}"]) for f in compared if row[f"old_{f}"] != row[f"new_{f}"]]
+        if not changes:
+            unchanged += 1
+            continue
+        would_update += 1
+        for field, _, _ in changes:
+            field_counts[field] = field_counts.get(field, 0) + 1
+        if shown[0] < show:
+            shown[0] += 1
+            detail = ", ".join(f"{f}: {old!r} -> {new!r}" for f, old, new in changes)
+            print(f"  ~ #{row['existing_id']} pharmacy {row['pharmacy_id']} {row['name']} {row['strength']}: {detail}")
+    conn.rollback()
+    return would_insert, would_update, unchanged, field_counts
 
 
 def main() -> int:
@@ -67,6 +210,10 @@ def main() -> int:
         default="upsert",
         help="insert: skip duplicates, upsert: update duplicates (default: upsert)",
     )
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per transaction (default: 5000)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes for parsing/validation (default: 1)")
+    parser.add_argument("--dry-run", action="store_true", help="Report inserts/updates without writing")
+    parser.add_argument("--show", type=int, default=20, help="Dry run: number of row-level diffs to print")
     args = parser.parse_args()
 
     if not os.path.exists(args.csv):
@@ -78,90 +225,82 @@ def main() -> int:
         print(f"Database file not found: {db_path}")
         return 1
 
-    inserted = 0
-    updated = 0
-    skipped = 0
-    failed = 0
-
     conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
+    conn.row_factory = sqlite3.Row
+    # A dry run only reports duplicates; the index is created by the first real import.
+    duplicates = ensure_medicine_identity_index(conn.cursor(), create=not args.dry_run)
+    if duplicates:
+        print("Existing duplicate medicines block the unique (pharmacy, name, strength) index:")
+        for pharmacy_id, name, strength, count in duplicates:
+            print(f"  pharmacy {pharmacy_id}: {name} {strength} x{count}")
+        conn.close()
+        return 1
+    if not args.dry_run:
+        conn.commit()
+    pharmacy_ids = frozenset(r[0] for r in conn.execute("SELECT id FROM pharmacies"))
+
+    inserted = updated = unchanged = failed = 0
+    field_counts = {}
+    shown = [0]
+    started = time.perf_counter()
 
     with open(args.csv, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        required_cols = {"pharmacy_id", "name", "strength", "unit", "price", "available", "stock_qty"}
-        missing = required_cols - set(reader.fieldnames or [])
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        missing = set(REQUIRED_COLUMNS) - set(header)
         if missing:
             print(f"Missing CSV columns: {', '.join(sorted(missing))}")
+            conn.close()
             return 1
+        columns = {name: index for index, name in enumerate(header)}
+        optional = tuple(c for c in OPTIONAL_COLUMNS if c in columns)
+        fields = BASE_FIELDS + optional
+        sql = build_upsert_sql(fields, args.mode)
 
-        for row_no, row in enumerate(reader, start=2):
-            try:
-                pharmacy_id = parse_int(row.get("pharmacy_id", ""), "pharmacy_id", row_no)
-                name = (row.get("name") or "").strip()
-                strength = (row.get("strength") or "").strip()
-                unit = (row.get("unit") or "").strip() or "strip"
-                price = parse_float(row.get("price", ""), "price", row_no)
-                available = parse_available(row.get("available", ""), row_no)
-                stock_qty = parse_int(row.get("stock_qty", ""), "stock_qty", row_no)
-                image_url = (row.get("image_url") or "").strip() or "/medicine-placeholder.svg"
-                offer_text = (row.get("offer_text") or "").strip()
-                mrp_raw = (row.get("mrp") or "").strip()
-                mrp = parse_float(mrp_raw, "mrp", row_no) if mrp_raw else round(price * 1.2, 2)
-
-                if not name:
-                    raise ValueError(f"Row {row_no}: name is required")
-                if price < 0:
-                    raise ValueError(f"Row {row_no}: price cannot be negative")
-                if mrp < price:
-                    raise ValueError(f"Row {row_no}: mrp cannot be lower than price")
-                if stock_qty < 0:
-                    raise ValueError(f"Row {row_no}: stock_qty cannot be negative")
-                if not offer_text:
-                    offer_pct = int(round(((mrp - price) * 100.0) / mrp)) if mrp > price else 0
-                    offer_text = f"{offer_pct}% OFF" if offer_pct > 0 else "Best Price"
-
-                validate_pharmacy(cur, pharmacy_id, row_no)
-                existing = find_existing(cur, pharmacy_id, name, strength)
-
-                if existing and args.mode == "insert":
-                    skipped += 1
-                    continue
+        init_args = (pharmacy_ids, columns, optional)
+        batches = iter_batches(reader, args.chunk_size)
+        pool = None
+        if args.workers > 1:
+            pool = Pool(args.workers, initializer=_init_worker, initargs=init_args)
+            parsed = pool.imap(parse_batch, batches)
+        else:
+            _init_worker(*init_args)
+            parsed = map(parse_batch, batches)
 
-                if existing and args.mode == "upsert":
-                    cur.execute(
-                        """
-                        UPDATE medicines
-                        SET unit = ?, price = ?, mrp = ?, offer_text = ?, image_url = ?, available = ?, stock_qty = ?
-                        WHERE id = ?
-                        """,
-                        (unit, price, mrp, offer_text, image_url, available, stock_qty, existing[0]),
-                    )
-                    updated += 1
+        try:
+            for records, errors in parsed:
+                for message in errors:
+                    if failed < MAX_PRINTED_ERRORS:
+                        print(f"[ERROR] {message}")
+                    failed += 1
+                if not records:
+                    continue
+                if args.dry_run:
+                    ins, upd, same, counts = diff_chunk(conn, fields, records, args.mode, args.show, shown)
+                    for field, count in counts.items():
+                        field_counts[field] = field_counts.get(field, 0) + count
                 else:
-                    cur.execute(
-                        """
-                        INSERT INTO medicines (pharmacy_id, name, strength, unit, price, mrp, offer_text, image_url, available, stock_qty)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (pharmacy_id, name, strength, unit, price, mrp, offer_text, image_url, available, stock_qty),
-                    )
-                    inserted += 1
-
-            except ValueError as err:
-                failed += 1
-                print(f"[ERROR] {err}")
+                    ins, upd, same = write_chunk(conn, sql, records)
+                inserted += ins
+                updated += upd
+                unchanged += same
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
-    cur.execute(
-        "UPDATE pharmacies SET medicines_count = (SELECT COUNT(*) FROM medicines m WHERE m.pharmacy_id = pharmacies.id)"
-    )
-    conn.commit()
     conn.close()
+    elapsed = time.perf_counter() - started
+    total = inserted + updated + unchanged + failed
 
-    print("Import finished")
+    print("Dry run finished (nothing written)" if args.dry_run else "Import finished")
     print(f"Inserted: {inserted}")
     print(f"Updated: {updated}")
-    print(f"Skipped: {skipped}")
-    print(f"Failed : {failed}")
+    print(f"{'Unchanged' if args.mode == 'upsert' else 'Skipped'}: {unchanged}")
+    print(f"Failed : {failed}" + (f" (first {MAX_PRINTED_ERRORS} shown)" if failed > MAX_PRINTED_ERRORS else ""))
+    if field_counts:
+        print("Fields changing: " + ", ".join(f"{k}={v}" for k, v in sorted(field_counts.items())))
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
     return 0
 
 
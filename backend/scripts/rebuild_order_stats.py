@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Rebuild (or verify) the order rollups (pharmacy_daily_stats,
+pharmacy_order_totals, the sales_rollups time series and the
+medicine_daily_sales velocity counters) from the orders and order_items
+tables.
+
+Usage:
+  python scripts/rebuild_order_stats.py            # recompute all rollup tables
+  python scripts/rebuild_order_stats.py --verify   # report drift without writing
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import (  # noqa: E402
+    get_connection,
+    init_db,
+    rebuild_medicine_sales,
+    rebuild_order_stats,
+    rebuild_sales_rollups,
+)
+
+STAT_COLUMNS = ("orders_count", "revenue", "delivered_revenue", "open_orders", "items_count")
+SALES_COLUMNS = ("orders_count", "revenue", "items_count")
+
+
+def _snapshot(cur):
+    cur.execute(f"SELECT pharmacy_id, day, {', '.join(STAT_COLUMNS)} FROM pharmacy_daily_stats")
+    rows = {
+        ("daily", r["pharmacy_id"], r["day"]): tuple(round(r[c], 2) for c in STAT_COLUMNS)
+        for r in cur.fetchall()
+        if any(r[c] for c in STAT_COLUMNS)
+    }
+    cur.execute(f"SELECT grain, bucket_ts, pharmacy_id, category, {', '.join(SALES_COLUMNS)} FROM sales_rollups")
+    rows.update(
+        {
+            (r["grain"], r["pharmacy_id"], r["bucket_ts"], r["category"]): tuple(round(r[c], 2) for c in SALES_COLUMNS)
+            for r in cur.fetchall()
+            if any(r[c] for c in SALES_COLUMNS)
+        }
+    )
+    cur.execute("SELECT medicine_id, day, units, revenue FROM medicine_daily_sales")
+    rows.update(
+        {
+            ("medicine", r["medicine_id"], r["day"]): (r["units"], round(r["revenue"], 2))
+            for r in cur.fetchall()
+            if r["units"] or r["revenue"]
+        }
+    )
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild order rollup tables.")
+    parser.add_argument("--verify", action="store_true", help="Compare live rollups with a fresh rebuild and roll back")
+    args = parser.parse_args()
+
+    init_db()
+    conn = get_connection()
+    cur = conn.cursor()
+
+    before = _snapshot(cur)
+    rebuild_order_stats(cur)
+    rebuild_sales_rollups(cur)
+    rebuild_medicine_sales(cur)
+    after = _snapshot(cur)
+
+    if args.verify:
+        conn.rollback()
+        drift = sorted(set(before) ^ set(after) | {k for k in before.keys() & after.keys() if before[k] != after[k]})
+        for key in drift:
+            print(f"{key}: live {before.get(key)} expected {after.get(key)}")
+        print(f"{len(after)} rollup rows checked, {len(drift)} drifted")
+        conn.close()
+        return 1 if drift else 0
+
+    conn.commit()
+    conn.close()
+    print(f"Rebuilt rollups: {len(after)} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
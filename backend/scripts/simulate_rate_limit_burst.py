@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Burst simulation for the rate limiter and admission gate.
+Fires bursts at search, login and support chat through the Flask test client
+on a copy of the database, hammers the SQLite bucket store from several
+processes, and exits non-zero if any limit is not enforced as configured.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEARCH_LIMIT = 20
+LOGIN_PER_EMAIL = 5
+GROQ_IN_FLIGHT = 2
+SHARED_CAPACITY = 50
+
+
+class SlowLLMHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(0.5)
+        out = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *_args):
+        pass
+
+
+def _shared_store_worker(attempts, results):
+    from rate_limit import SQLiteBucketStore, RateLimit
+
+    store = SQLiteBucketStore()
+    limit = RateLimit(SHARED_CAPACITY, 3600)
+    results.put(sum(1 for _ in range(attempts) if store.take("burst:shared", limit)[0]))
+
+
+def check(label, ok, detail):
+    print(f"[{'PASS' if ok else 'FAIL'}] {label}: {detail}")
+    return ok
+
+
+def main() -> int:
+    tmp_dir = tempfile.mkdtemp(prefix="ratelimit_")
+    db_copy = os.path.join(tmp_dir, "burst.db")
+    shutil.copy(os.path.join(BACKEND_DIR, "dev.db"), db_copy)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Config reads the environment at import time.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_copy}"
+    os.environ["GROQ_API_KEY"] = "burst-key"
+    os.environ["GROQ_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    os.environ["RATE_LIMITS"] = f"medicines={SEARCH_LIMIT}/60,auth=1000/60,support=1000/60"
+    os.environ["RATE_LIMIT_LOGIN_PER_EMAIL"] = f"{LOGIN_PER_EMAIL}/300"
+    os.environ["SUPPORT_CHAT_MAX_IN_FLIGHT"] = str(GROQ_IN_FLIGHT)
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+
+    client = app.test_client()
+    results = []
+
+    # 1. Per-IP burst on search: exactly SEARCH_LIMIT pass, the rest get 429 + Retry-After.
+    statuses = [
+        client.get("/medicines/search?q=para", environ_base={"REMOTE_ADDR": "10.0.0.1"})
+        for _ in range(SEARCH_LIMIT + 15)
+    ]
+    passed = sum(1 for r in statuses if r.status_code == 200)
+    limited = [r for r in statuses if r.status_code == 429]
+    results.append(check("search burst from one IP", passed == SEARCH_LIMIT, f"{passed} allowed, {len(limited)} limited"))
+    results.append(check(
+        "429 carries Retry-After",
+        all(int(r.headers.get("Retry-After", 0)) >= 1 for r in limited),
+        f"Retry-After={limited[0].headers.get('Retry-After') if limited else None}",
+    ))
+    other = client.get("/medicines/search?q=para", environ_base={"REMOTE_ADDR": "10.0.0.2"})
+    results.append(check("other IP unaffected", other.status_code == 200, f"status {other.status_code}"))
+
+    # 2. Per-key burst: one email attacked from many IPs is still capped.
+    login_statuses = [
+        client.post(
+            "/auth/login",
+            json={"email": "victim@example.com", "password": "wrong-password"},
+            environ_base={"REMOTE_ADDR": f"10.1.0.{i}"},
+        ).status_code
+        for i in range(LOGIN_PER_EMAIL + 5)
+    ]
+    allowed = sum(1 for s in login_statuses if s != 429)
+    results.append(check("login burst on one email across IPs", allowed == LOGIN_PER_EMAIL, f"{allowed} reached the handler"))
+
+    # 3. Admission gate: concurrent chats beyond the cap get the fallback immediately.
+    def chat(i):
+        return client.post(
+            "/support/chat",
+            json={"message": f"obscure question number {i} about skin rash"},
+            environ_base={"REMOTE_ADDR": f"10.2.0.{i}"},
+        ).get_json()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        replies = list(pool.map(chat, range(8)))
+    upstream = sum(1 for r in replies if r.get("provider") == "groq")
+    shed = sum(1 for r in replies if r.get("error") == "AI assistant is busy")
+    results.append(check("chat admission gate", upstream <= GROQ_IN_FLIGHT and shed > 0, f"{upstream} upstream, {shed} shed"))
+
+    # 4. SQLite store shared by 4 processes: total admitted never exceeds capacity.
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_shared_store_worker, args=(40, queue)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    admitted = sum(queue.get() for _ in procs)
+    for p in procs:
+        p.join()
+    results.append(check("shared SQLite buckets across processes", admitted == SHARED_CAPACITY, f"{admitted} of 160 admitted"))
+
+    print(json.dumps(client.get("/health/rate-limits").get_json()["rate_limits"], indent=2))
+    server.shutdown()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
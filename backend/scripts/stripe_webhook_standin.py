@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Stripe webhook deliveries.
+Builds a payment_intent event, signs it the way Stripe does (t=<ts>,v1=<hmac>)
+and POSTs it to /orders/stripe/webhook, optionally replaying it to check dedup.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stripe_webhooks import sign_stripe_payload  # noqa: E402
+
+
+def build_event(event_type: str, order_id: int, event_id: str | None = None) -> dict:
+    intent_status = "succeeded" if event_type == "payment_intent.succeeded" else "requires_payment_method"
+    return {
+        "id": event_id or f"evt_local_{uuid.uuid4().hex[:24]}",
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "data": {
+            "object": {
+                "id": f"pi_local_{uuid.uuid4().hex[:24]}",
+                "object": "payment_intent",
+                "status": intent_status,
+                "metadata": {"order_id": str(order_id)},
+            }
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Send a signed Stripe-style webhook to the local backend.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/orders/stripe/webhook", help="Webhook URL")
+    parser.add_argument("--secret", default=os.environ.get("STRIPE_WEBHOOK_SECRET", ""), help="Webhook signing secret")
+    parser.add_argument("--order-id", type=int, required=True, help="Order id placed in PaymentIntent metadata")
+    parser.add_argument(
+        "--type",
+        default="payment_intent.succeeded",
+        choices=["payment_intent.succeeded", "payment_intent.payment_failed", "payment_intent.canceled"],
+        help="Event type (default: payment_intent.succeeded)",
+    )
+    parser.add_argument("--replays", type=int, default=1, help="Deliver the same event N times (default: 1)")
+    parser.add_argument("--bad-signature", action="store_true", help="Corrupt the signature to test rejection")
+    args = parser.parse_args()
+
+    if not args.secret:
+        print("Provide --secret or set STRIPE_WEBHOOK_SECRET")
+        return 1
+
+    payload = json.dumps(build_event(args.type, args.order_id), separators=(",", ":"))
+    for attempt in range(1, args.replays + 1):
+        signature = sign_stripe_payload(payload, args.secret)
+        if args.bad_signature:
+            signature = signature[:-4] + "0000"
+        started = time.perf_counter()
+        resp = requests.post(
+            args.url,
+            data=payload,
+            headers={"Content-Type": "application/json", "Stripe-Signature": signature},
+            timeout=10,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"Delivery {attempt}: HTTP {resp.status_code} in {elapsed_ms:.1f} ms -> {resp.text.strip()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Pick password hashing cost for a fixed per-hash latency budget on this machine.
+Times scrypt for increasing N and PBKDF2-SHA256 for increasing iterations,
+prints the strongest settings within --budget-ms as env lines, then fires a
+login burst through the bounded pool to show queueing and shedding.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def time_hash(params, samples):
+    from passwords import hash_password_sync
+
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hash_password_sync("correct horse battery staple", params)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Tune password hash cost to a latency budget.")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Target time for one hash (default: 100)")
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--burst", type=int, default=40, help="Concurrent logins in the burst test (default: 40)")
+    args = parser.parse_args()
+
+    print(f"budget {args.budget_ms:.0f} ms per hash\n")
+    best_n = None
+    n = 2 ** 12
+    while n <= 2 ** 20:
+        ms = time_hash(("scrypt", n, 8, 1), args.samples)
+        print(f"scrypt N={n:<8} r=8 p=1  {ms:8.1f} ms")
+        if ms > args.budget_ms:
+            break
+        best_n = n
+        n *= 2
+
+    iterations = 100000
+    ms = time_hash(("pbkdf2_sha256", iterations), args.samples)
+    # PBKDF2 cost is linear in iterations; scale to the budget and round down to 10k.
+    best_iterations = max(10000, int(iterations * args.budget_ms / ms) // 10000 * 10000)
+    ms_best = time_hash(("pbkdf2_sha256", best_iterations), args.samples)
+    print(f"pbkdf2_sha256 iterations={best_iterations:<8} {ms_best:8.1f} ms")
+
+    print("\nSuggested settings:")
+    if best_n:
+        print("PASSWORD_HASH_SCHEME=scrypt")
+        print(f"PASSWORD_SCRYPT_N={best_n}")
+    else:
+        print("PASSWORD_HASH_SCHEME=pbkdf2_sha256  # even N=4096 exceeds the budget")
+    print(f"PASSWORD_PBKDF2_ITERATIONS={best_iterations}")
+
+    # Burst through the real bounded pool with the configured workers and queue depth.
+    from config import Config
+    import passwords
+
+    stored = passwords.hash_password_sync("secret123")
+    latencies = []
+    busy = []
+    lock = threading.Lock()
+
+    def attempt():
+        started = time.perf_counter()
+        try:
+            passwords.verify_password("secret123", stored)
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+        except passwords.HashingBusy:
+            with lock:
+                busy.append(1)
+
+    threads = [threading.Thread(target=attempt) for _ in range(args.burst)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    print(
+        f"\nburst of {args.burst} logins, {Config.PASSWORD_HASH_WORKERS} workers, "
+        f"queue {Config.PASSWORD_HASH_MAX_QUEUE}: {len(latencies)} verified, {len(busy)} shed (503), "
+        f"p50 {statistics.median(latencies):.0f} ms, max {latencies[-1]:.0f} ms, wall {wall * 1000:.0f} ms"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,18 @@
 #!/usr/bin/env python3
+"""
+Update medicine image URLs from a CSV of name,strength,image_url.
+
+The CSV is bulk-loaded into a temporary table keyed by normalized
+(name, strength) and applied with one UPDATE ... FROM join, so the cost is
+one pass over the catalog instead of one table scan per CSV row. A key
+matches every pharmacy's copy of that medicine. Keys listed more than once
+with different URLs are ambiguous and left alone.
+"""
 import argparse
 import csv
 import os
 import sqlite3
+import time
 
 
 def resolve_db_path(user_db_path: str | None) -> str:
@@ -16,6 +26,8 @@ def main() -> int:
     parser = argparse.ArgumentParser(description="Update medicine image URLs from CSV.")
     parser.add_argument("--csv", required=True, help="CSV file path")
     parser.add_argument("--db", help="SQLite DB path (default: backend/dev.db)")
+    parser.add_argument("--dry-run", action="store_true", help="Report matches without writing")
+    parser.add_argument("--show", type=int, default=10, help="Unmatched/ambiguous keys to print (default: 10)")
     args = parser.parse_args()
 
     if not os.path.exists(args.csv):
@@ -27,13 +39,14 @@ def main() -> int:
         print(f"DB not found: {db_path}")
         return 1
 
+    started = time.perf_counter()
     conn = sqlite3.connect(db_path)
     cur = conn.cursor()
+    # Both statements below scan medicines once and probe the temp key index, so they stay
+    # linear even on databases without the normalized-name expression indexes.
+    cur.execute("CREATE TEMP TABLE image_rows (name_key TEXT, strength_key TEXT, image_url TEXT)")
 
-    updated = 0
     skipped = 0
-    missing = 0
-
     with open(args.csv, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         required_cols = {"name", "strength", "image_url"}
@@ -42,35 +55,80 @@ def main() -> int:
             print("CSV must contain columns: name,strength,image_url")
             return 1
 
-        for row in reader:
-            name = (row.get("name") or "").strip()
-            strength = (row.get("strength") or "").strip()
-            image_url = (row.get("image_url") or "").strip()
-            if not name or not image_url:
-                skipped += 1
-                continue
-
-            cur.execute(
-                """
-                UPDATE medicines
-                SET image_url = ?
-                WHERE LOWER(name) = LOWER(?)
-                  AND LOWER(COALESCE(strength, '')) = LOWER(COALESCE(?, ''))
-                """,
-                (image_url, name, strength),
-            )
-            if cur.rowcount == 0:
-                missing += 1
-            else:
-                updated += cur.rowcount
-
-    conn.commit()
+        def keyed_rows():
+            nonlocal skipped
+            for row in reader:
+                name = (row.get("name") or "").strip()
+                image_url = (row.get("image_url") or "").strip()
+                if not name or not image_url:
+                    skipped += 1
+                    continue
+                yield name.lower(), (row.get("strength") or "").strip().lower(), image_url
+
+        cur.executemany("INSERT INTO image_rows VALUES (?, ?, ?)", keyed_rows())
+
+    cur.executescript(
+        """
+        CREATE TEMP TABLE image_keys AS
+        SELECT name_key, strength_key, MIN(image_url) AS image_url,
+               COUNT(DISTINCT image_url) AS urls, COUNT(*) AS csv_rows, 0 AS matched
+        FROM image_rows
+        GROUP BY name_key, strength_key;
+        CREATE UNIQUE INDEX temp.idx_image_keys ON image_keys(name_key, strength_key);
+        """
+    )
+    cur.execute(
+        """
+        UPDATE image_keys SET matched = 1
+        WHERE (name_key, strength_key) IN (
+            SELECT LOWER(TRIM(name)), LOWER(TRIM(COALESCE(strength, ''))) FROM medicines
+        )
+        """
+    )
+    cur.execute(
+        """
+        UPDATE medicines SET image_url = k.image_url
+        FROM image_keys k
+        WHERE k.urls = 1
+          AND LOWER(TRIM(medicines.name)) = k.name_key
+          AND LOWER(TRIM(COALESCE(medicines.strength, ''))) = k.strength_key
+          AND medicines.image_url IS NOT k.image_url
+        """
+    )
+    updated = cur.rowcount
+
+    cur.execute(
+        """
+        SELECT
+            COALESCE(SUM(CASE WHEN matched = 1 AND urls = 1 THEN csv_rows END), 0),
+            COALESCE(SUM(CASE WHEN matched = 0 THEN csv_rows END), 0),
+            COALESCE(SUM(CASE WHEN matched = 1 AND urls > 1 THEN csv_rows END), 0)
+        FROM image_keys
+        """
+    )
+    matched, unmatched, ambiguous = cur.fetchone()
+    cur.execute("SELECT name_key, strength_key FROM image_keys WHERE matched = 0 LIMIT ?", (args.show,))
+    unmatched_keys = cur.fetchall()
+    cur.execute("SELECT name_key, strength_key, urls FROM image_keys WHERE matched = 1 AND urls > 1 LIMIT ?", (args.show,))
+    ambiguous_keys = cur.fetchall()
+
+    if args.dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
     conn.close()
 
-    print("Image update finished")
+    print("Dry run finished (nothing written)" if args.dry_run else "Image update finished")
     print(f"Updated rows: {updated}")
+    print(f"Matched CSV rows: {matched}")
+    print(f"No match rows: {unmatched}")
+    print(f"Ambiguous rows: {ambiguous}")
     print(f"Skipped rows: {skipped}")
-    print(f"No match rows: {missing}")
+    for name_key, strength_key in unmatched_keys:
+        print(f"  no match: {name_key} {strength_key}".rstrip())
+    for name_key, strength_key, urls in ambiguous_keys:
+        print(f"  ambiguous ({urls} different URLs): {name_key} {strength_key}".rstrip())
+    print(f"Finished in {time.perf_counter() - started:.2f}s")
     return 0
 
 
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Production server for Smart Medicine Delivery Network
+Runs create_app() under a pre-fork gunicorn master: the app (schema setup,
+in-memory frontend build) is loaded once in the master and shared by
+threaded worker processes, which start their own background workers after
+fork. Workers are recycled gracefully after SERVER_MAX_REQUESTS requests
+(plus jitter so they do not all restart together); SIGHUP reloads them all
+without dropping connections. Settings come from the SERVER_* environment
+variables in config.py; command-line flags override them.
+
+Rate-limit buckets default to the shared SQLite store here (RATE_LIMIT_STORE
+=sqlite), since per-process memory buckets would multiply every limit by the
+worker count. Token revocation is shared through the revoked_tokens table.
+"""
+import argparse
+import os
+
+
+def _post_fork(server, worker):
+    from app import start_process_resources
+
+    start_process_resources()
+
+
+def server_options(args):
+    from config import Config
+
+    workers = args.workers if args.workers is not None else Config.SERVER_WORKERS
+    return {
+        'bind': args.bind or Config.SERVER_BIND,
+        'workers': workers or os.cpu_count() or 1,
+        'worker_class': 'gthread',
+        'threads': args.threads if args.threads is not None else Config.SERVER_THREADS,
+        'max_requests': Config.SERVER_MAX_REQUESTS,
+        'max_requests_jitter': Config.SERVER_MAX_REQUESTS_JITTER,
+        'timeout': Config.SERVER_TIMEOUT_SECONDS,
+        'graceful_timeout': Config.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        'keepalive': Config.SERVER_KEEPALIVE_SECONDS,
+        'preload_app': True,
+        'post_fork': _post_fork,
+        'accesslog': '-' if args.access_log else None,
+        'errorlog': '-',
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the backend under a multi-process production server.")
+    parser.add_argument("--config", default=os.environ.get("APP_ENV") or "production",
+                        help="development, production or testing (default: APP_ENV, then production)")
+    parser.add_argument("--bind", help="host:port (default: SERVER_BIND)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: SERVER_WORKERS, 0 = one per CPU)")
+    parser.add_argument("--threads", type=int, help="Threads per worker (default: SERVER_THREADS)")
+    parser.add_argument("--access-log", action="store_true", help="Log every request to stdout")
+    args = parser.parse_args()
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn is not installed. Run: pip install gunicorn")
+        return 1
+
+    # Workers are separate processes, so rate-limit buckets must be shared unless explicitly overridden.
+    os.environ.setdefault('RATE_LIMIT_STORE', 'sqlite')
+    from config import Config, activate_config
+
+    # Select the config before the app modules are imported, so import-time reads see it too.
+    activate_config(args.config)
+    options = server_options(args)
+    if options['workers'] > 1 and Config.RATE_LIMIT_STORE == 'memory':
+        print(f"[SERVER] warning: RATE_LIMIT_STORE=memory keeps separate buckets in each of the "
+              f"{options['workers']} workers, so every rate limit is {options['workers']}x looser")
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import create_app
+
+            return create_app(args.config)
+
+    print(f"[SERVER] {args.config} on {options['bind']}: {options['workers']} workers x {options['threads']} threads, "
+          f"recycled every {options['max_requests']}+{options['max_requests_jitter']} requests")
+    ProductionServer().run()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+"""
+In-memory frontend serving for Smart Medicine Delivery Network
+The built frontend (frontend/dist) is read once into a manifest of bytes,
+strong ETags and pre-compressed gzip/brotli variants, so a static request is
+a dict lookup plus Accept-Encoding negotiation: no per-request stat, open or
+compression. The manifest reloads when a new build replaces index.html, and
+hashed files under assets/ from earlier builds stay servable for pages that
+still reference them. Files written at runtime under a generated prefix are
+loaded from disk on first request, so every worker process can serve files
+another one wrote.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+from flask import Response, request
+
+from config import Config
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+HASHED_PREFIX = 'assets/'
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'application/wasm')
+PRECOMPRESSED_SUFFIXES = {'.br': 'br', '.gz': 'gzip'}
+# Preferred first when the client accepts several.
+ENCODINGS = ('br', 'gzip')
+
+
+class StaticAsset:
+    """One dist file: content type, cache policy and its encoded bodies keyed by Content-Encoding."""
+
+    __slots__ = ('content_type', 'cache_control', 'etag', 'bodies')
+
+    def __init__(self, content_type, cache_control, etag, bodies):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = etag
+        self.bodies = bodies
+
+    def pick(self, accept_encodings):
+        for encoding in ENCODINGS:
+            if encoding in self.bodies and accept_encodings.quality(encoding) > 0:
+                return encoding
+        return 'identity'
+
+
+def _compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _brotli_compress(data, quality):
+    try:
+        import brotli  # optional dependency
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=quality)
+
+
+def _load_asset(root, rel_path, brotli_quality=None):
+    full_path = os.path.join(root, rel_path)
+    with open(full_path, 'rb') as f:
+        data = f.read()
+    content_type = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+    if rel_path.startswith(HASHED_PREFIX):
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        # index.html and unhashed public files: always revalidate, which the ETag makes a cheap 304.
+        cache_control = 'no-cache'
+
+    bodies = {'identity': data}
+    if _compressible(content_type) and len(data) >= Config.STATIC_COMPRESS_MIN_BYTES:
+        for suffix, encoding in PRECOMPRESSED_SUFFIXES.items():
+            # Variants written by the frontend build win over compressing here.
+            if os.path.exists(full_path + suffix):
+                with open(full_path + suffix, 'rb') as f:
+                    bodies[encoding] = f.read()
+        if 'gzip' not in bodies:
+            bodies['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+        if 'br' not in bodies:
+            compressed = _brotli_compress(data, brotli_quality or Config.STATIC_BROTLI_QUALITY)
+            if compressed is not None:
+                bodies['br'] = compressed
+        bodies = {k: v for k, v in bodies.items() if k == 'identity' or len(v) < len(data)}
+
+    etag = hashlib.sha256(data).hexdigest()[:32]
+    return StaticAsset(content_type, cache_control, etag, bodies)
+
+
+class StaticSite:
+    """Manifest of the frontend build, served from memory."""
+
+    def __init__(self, root, generated_prefixes=(), generated_brotli_quality=None):
+        self.root = os.path.abspath(root)
+        # Paths written at runtime (see publish()); reload() leaves them to their writer.
+        self.generated_prefixes = tuple(generated_prefixes)
+        self.generated_brotli_quality = generated_brotli_quality
+        self.index_file = os.path.join(self.root, 'index.html')
+        self.assets = {}
+        self._index_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        assets = {path: asset for path, asset in self.assets.items() if path.startswith(HASHED_PREFIX)}
+        total = 0
+        if os.path.isdir(self.root):
+            for dir_path, _, file_names in os.walk(self.root):
+                for name in file_names:
+                    if os.path.splitext(name)[1] in PRECOMPRESSED_SUFFIXES:
+                        continue
+                    rel_path = os.path.relpath(os.path.join(dir_path, name), self.root).replace(os.sep, '/')
+                    if rel_path.startswith(self.generated_prefixes):
+                        continue
+                    assets[rel_path] = _load_asset(self.root, rel_path)
+                    total += sum(len(body) for body in assets[rel_path].bodies.values())
+        self.assets = assets
+        self._index_mtime = self._stat_index()
+        if assets:
+            print(f"[STATIC] {len(assets)} files from {self.root} ({total / 1024:.0f} KB with compressed variants)")
+
+    def publish(self, rel_path, brotli_quality=None):
+        """Load (or replace) one file written under the root after startup."""
+        asset = _load_asset(self.root, rel_path, brotli_quality or self.generated_brotli_quality)
+        with self._lock:
+            self.assets = {**self.assets, rel_path: asset}
+
+    def generated_paths(self):
+        return [path for path in self.assets if path.startswith(self.generated_prefixes)]
+
+    def _load_generated(self, path):
+        """A generated file this process has not loaded yet, e.g. one written by another worker."""
+        if not self.is_generated(path):
+            return None
+        full_path = os.path.realpath(os.path.join(self.root, path))
+        if not full_path.startswith(self.root + os.sep) or not os.path.isfile(full_path):
+            return None
+        try:
+            self.publish(os.path.relpath(full_path, self.root).replace(os.sep, '/'))
+        except OSError:
+            # Removed between the check and the read.
+            return None
+        return self.assets.get(path)
+
+    def discard(self, rel_path):
+        with self._lock:
+            if rel_path in self.assets:
+                self.assets = {path: asset for path, asset in self.assets.items() if path != rel_path}
+
+    def _stat_index(self):
+        try:
+            return os.stat(self.index_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _maybe_reload(self):
+        # A new `npm run build` replaces index.html; notice it without stat()ing on every request.
+        now = time.monotonic()
+        if now - self._checked_at < Config.STATIC_RECHECK_SECONDS:
+            return
+        with self._lock:
+            if now - self._checked_at < Config.STATIC_RECHECK_SECONDS:
+                return
+            self._checked_at = now
+            if self._stat_index() != self._index_mtime:
+                self.reload()
+
+    def get(self, path):
+        self._maybe_reload()
+        asset = self.assets.get(path)
+        if asset is None:
+            asset = self._load_generated(path)
+        return asset
+
+    def is_generated(self, path):
+        return bool(self.generated_prefixes) and path.startswith(self.generated_prefixes)
+
+    @property
+    def has_index(self):
+        self._maybe_reload()
+        return 'index.html' in self.assets
+
+    def response(self, path):
+        """Response for a manifest path, negotiated against the current request; None if unknown."""
+        asset = self.get(path)
+        if asset is None:
+            return None
+
+        encoding = asset.pick(request.accept_encodings)
+        etag = asset.etag if encoding == 'identity' else f"{asset.etag}-{encoding}"
+        headers = {'Cache-Control': asset.cache_control, 'Vary': 'Accept-Encoding'}
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            response = Response(asset.bodies[encoding], mimetype=asset.content_type, headers=headers)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        return response
@@ -0,0 +1,243 @@
+"""
+Stripe webhook ingestion for Smart Medicine Delivery Network
+The webhook route only verifies the signature and stores the raw event in the
+stripe_events inbox; background worker threads apply the order transitions.
+Failed events are retried with exponential backoff and marked 'failed' after
+STRIPE_EVENT_MAX_ATTEMPTS.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import time
+
+from config import Config
+from db import get_connection
+
+# Event type -> (new order status, statuses it may transition from).
+ORDER_TRANSITIONS = {
+    'payment_intent.succeeded': ('paid', ('pending', 'payment_failed')),
+    'payment_intent.payment_failed': ('payment_failed', ('pending',)),
+    'payment_intent.canceled': ('payment_failed', ('pending',)),
+}
+
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+# A forked child inherits the list but not the threads; let it start its own.
+os.register_at_fork(after_in_child=_workers.clear)
+
+
+def verify_stripe_signature(payload, sig_header, secret, tolerance=None, now=None):
+    """
+    Verify a Stripe-Signature header ("t=<ts>,v1=<hex>[,v1=...]") against the raw body.
+    The signed message is "<ts>.<payload>" HMAC-SHA256'd with the endpoint secret.
+    Returns True only if a v1 signature matches and the timestamp is within tolerance.
+    """
+    if not sig_header or not secret:
+        return False
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+
+    timestamp = None
+    signatures = []
+    for part in sig_header.split(','):
+        key, _, value = part.strip().partition('=')
+        if key == 't':
+            timestamp = value
+        elif key == 'v1':
+            signatures.append(value)
+    if not timestamp or not signatures:
+        return False
+
+    try:
+        ts = int(timestamp)
+    except ValueError:
+        return False
+    tolerance = Config.STRIPE_WEBHOOK_TOLERANCE_SECONDS if tolerance is None else tolerance
+    if tolerance and abs((now or time.time()) - ts) > tolerance:
+        return False
+
+    expected = hmac.new(secret.encode('utf-8'), f"{timestamp}.{payload}".encode('utf-8'), hashlib.sha256).hexdigest()
+    return any(hmac.compare_digest(expected, sig) for sig in signatures)
+
+
+def sign_stripe_payload(payload, secret, timestamp=None):
+    """Build a Stripe-Signature header for payload (used by the local stand-in script)."""
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode('utf-8'), f"{timestamp}.{payload}".encode('utf-8'), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def record_stripe_event(event, raw_payload):
+    """
+    Persist an event into the inbox. Returns False if the event id was already stored,
+    so Stripe retries of the same delivery are acknowledged without reprocessing.
+    """
+    data_object = (event.get('data') or {}).get('object') or {}
+    payment_intent_id = data_object.get('id') if data_object.get('object') == 'payment_intent' else None
+    order_id = (data_object.get('metadata') or {}).get('order_id')
+    try:
+        order_id = int(order_id) if order_id not in (None, '') else None
+    except (TypeError, ValueError):
+        order_id = None
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO stripe_events (event_id, event_type, payment_intent_id, order_id, payload)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (event['id'], event.get('type') or '', payment_intent_id, order_id, raw_payload),
+    )
+    inserted = cur.rowcount > 0
+    conn.commit()
+    conn.close()
+    if inserted:
+        _wakeup.set()
+    return inserted
+
+
+def _claim_next_event(cur):
+    # Atomic claim: only one worker (thread or process) can flip a row to processing.
+    # Events waiting out a retry backoff are skipped; an expired lease counts as an attempt.
+    now = time.time()
+    cur.execute(
+        """
+        UPDATE stripe_events
+        SET status = 'processing', attempts = attempts + 1, locked_until = :locked_until
+        WHERE id = (
+            SELECT id FROM stripe_events
+            WHERE (status = 'received' AND COALESCE(next_attempt_at, 0) <= :now)
+               OR (status = 'processing' AND locked_until < :now AND attempts < :max_attempts)
+            ORDER BY id
+            LIMIT 1
+        )
+        RETURNING id, event_type, order_id, payload, attempts
+        """,
+        {'locked_until': now + Config.STRIPE_EVENT_LEASE_SECONDS, 'now': now,
+         'max_attempts': Config.STRIPE_EVENT_MAX_ATTEMPTS},
+    )
+    return cur.fetchone()
+
+
+def _fail_abandoned_events(cur):
+    # Leases that kept expiring (the worker died on every attempt) will not be claimed again.
+    cur.execute(
+        """
+        UPDATE stripe_events
+        SET status = 'failed', locked_until = NULL, last_error = 'Lease expired on the final attempt'
+        WHERE status = 'processing' AND locked_until < ? AND attempts >= ?
+        """,
+        (time.time(), Config.STRIPE_EVENT_MAX_ATTEMPTS),
+    )
+
+
+def _retry_delay_seconds(attempts):
+    base = Config.STRIPE_EVENT_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    return min(Config.STRIPE_EVENT_RETRY_MAX_SECONDS, base) * random.uniform(0.5, 1.0)
+
+
+def _apply_event(cur, event_row):
+    transition = ORDER_TRANSITIONS.get(event_row['event_type'])
+    if not transition:
+        return 'ignored'
+
+    order_id = event_row['order_id']
+    if not order_id:
+        return 'ignored'
+
+    new_status, from_statuses = transition
+    placeholders = ",".join("?" for _ in from_statuses)
+    # Guarded update keeps replays and out-of-order deliveries idempotent.
+    cur.execute(
+        f"UPDATE orders SET status = ? WHERE id = ? AND status IN ({placeholders})",
+        (new_status, order_id, *from_statuses),
+    )
+    return 'processed'
+
+
+def process_pending_stripe_events(max_events=100):
+    """Drain up to max_events from the inbox. Returns the number of events handled."""
+    handled = 0
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        _fail_abandoned_events(cur)
+        conn.commit()
+        while handled < max_events:
+            event_row = _claim_next_event(cur)
+            conn.commit()
+            if not event_row:
+                break
+            handled += 1
+            try:
+                outcome = _apply_event(cur, event_row)
+                cur.execute(
+                    """
+                    UPDATE stripe_events
+                    SET status = ?, processed_at = CURRENT_TIMESTAMP, last_error = ''
+                    WHERE id = ?
+                    """,
+                    (outcome, event_row['id']),
+                )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                retry = event_row['attempts'] < Config.STRIPE_EVENT_MAX_ATTEMPTS
+                cur.execute(
+                    """
+                    UPDATE stripe_events SET status = ?, locked_until = NULL, next_attempt_at = ?, last_error = ?
+                    WHERE id = ?
+                    """,
+                    (
+                        'received' if retry else 'failed',
+                        time.time() + _retry_delay_seconds(event_row['attempts']) if retry else None,
+                        str(e)[:500],
+                        event_row['id'],
+                    ),
+                )
+                conn.commit()
+                print(f"Stripe event {event_row['id']} error: {e}")
+    finally:
+        conn.close()
+    return handled
+
+
+def _worker_loop():
+    while True:
+        _wakeup.wait(Config.STRIPE_EVENT_POLL_SECONDS)
+        _wakeup.clear()
+        try:
+            process_pending_stripe_events()
+        except Exception as e:
+            print(f"Stripe event worker error: {e}")
+
+
+def start_stripe_event_workers(count=None):
+    """Start background inbox workers once per process."""
+    count = Config.STRIPE_EVENT_WORKERS if count is None else count
+    with _workers_lock:
+        if _workers:
+            return
+        for idx in range(count):
+            worker = threading.Thread(target=_worker_loop, name=f"stripe-events-{idx}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def parse_stripe_event(raw_payload):
+    """Decode the webhook body; returns None when it is not a Stripe event object."""
+    try:
+        event = json.loads(raw_payload)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(event, dict) or not event.get('id') or not event.get('type'):
+        return None
+    return event
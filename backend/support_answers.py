@@ -0,0 +1,281 @@
+"""
+Local answers for /support/chat in Smart Medicine Delivery Network
+A compiled keyword router answers deterministic intents (order tracking,
+delivery fees, greetings) without calling Groq, and a normalized-question
+cache replays recent LLM answers until the catalog version changes.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+
+from catalog import get_catalog_version
+from config import Config
+from retrieval import STOPWORDS, TOKEN_RE
+
+
+def _words(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def question_key(message):
+    """Cache key for a question: lowercase words minus punctuation and filler words, hashed."""
+    words = [w for w in _words(message) if w not in STOPWORDS]
+    if not words:
+        return None
+    return hashlib.sha1(' '.join(words).encode('utf-8')).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Intent router
+# ---------------------------------------------------------------------------
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over words: finds every phrase in one left-to-right pass."""
+
+    def __init__(self, phrases):
+        # phrases: iterable of (tuple_of_words, label)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for words, label in phrases:
+            state = 0
+            for word in words:
+                nxt = self.goto[state].get(word)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][word] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append(label)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(word, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find(self, words):
+        """Set of labels whose phrases occur in the word sequence."""
+        found = set()
+        state = 0
+        for word in words:
+            while state and word not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(word, 0)
+            found.update(self.output[state])
+        return found
+
+
+def _order_reply():
+    return 'Order tracking ke liye Orders page open karein. Aap order id se live status dekh sakte hain.'
+
+
+def _delivery_reply():
+    from pricing import get_pricing_rules  # pricing imports helpers, which is heavy for this module
+
+    rules = get_pricing_rules()
+    surcharge = rules.surcharge_tiers[-1] if rules.surcharge_tiers else None
+    reply = f'Standard delivery lagbhag {Config.STANDARD_DELIVERY_MINUTES} min me hoti hai. '
+    if surcharge:
+        reply += f'{surcharge[0]:g} km tak delivery free hai, uske baad Rs {surcharge[1]:.0f} lagta hai. '
+    reply += (
+        f'Express delivery lagbhag {Config.EXPRESS_DELIVERY_MINUTES} min me, Rs {rules.express_fee:.0f} extra par. '
+        'Checkout par exact total dikh jayega.'
+    )
+    return reply
+
+
+def _greeting_reply():
+    return 'Namaste! Medicine search, categories ya order tracking me kya help chahiye?'
+
+
+def _fever_reply():
+    return 'Fever/cold ke liye Paracetamol, Dolo 650, Crocin jaisi options Search me check karein.'
+
+
+def _vitamin_reply():
+    return 'Vitamins section me Vitamin C, Vitamin D3, Multivitamin, Zinc products available hain.'
+
+
+DEFAULT_REPLY = 'Main aapki medicine, category aur order tracking related help ke liye available hoon.'
+
+# (name, answers before Groq?, phrases, reply builder), highest priority first.
+# Fallback-only intents are used when Groq is unavailable; they match broad
+# words that need the LLM's judgement when it is up.
+INTENTS = (
+    ('order_tracking', True, (
+        'order kaha', 'order kahan', 'mera order', 'meri order', 'my order', 'track order',
+        'order track', 'order status', 'track my order', 'order kab', 'tracking',
+    ), _order_reply),
+    ('delivery_info', True, (
+        'delivery charge', 'delivery charges', 'delivery fee', 'delivery fees', 'delivery time',
+        'delivery kitne', 'delivery kab', 'express delivery', 'shipping charge', 'free delivery',
+    ), _delivery_reply),
+    ('greeting', True, ('hi', 'hii', 'hello', 'hey', 'namaste', 'namaskar'), _greeting_reply),
+    ('order_help', False, ('order', 'orders', 'track'), _order_reply),
+    ('fever', False, ('fever', 'cold', 'bukhar', 'sardi'), _fever_reply),
+    ('vitamins', False, ('vitamin', 'vitamins', 'immunity'), _vitamin_reply),
+)
+
+_INTENT_PRIORITY = {name: idx for idx, (name, *_rest) in enumerate(INTENTS)}
+_INTENT_BY_NAME = {name: (local, reply) for name, local, _phrases, reply in INTENTS}
+_GREETING_WORDS = frozenset(next(p for n, _l, p, _r in INTENTS if n == 'greeting'))
+_automaton = KeywordAutomaton(
+    (tuple(phrase.split()), name) for name, _local, phrases, _reply in INTENTS for phrase in phrases
+)
+
+
+def match_intent(message, local_only=True):
+    """Highest-priority intent name for message, or None."""
+    words = _words(message)
+    matched = _automaton.find(words)
+    if 'greeting' in matched and any(w not in _GREETING_WORDS for w in words):
+        # "hi, fever medicine?" is a real question, not a greeting.
+        matched.discard('greeting')
+    if local_only:
+        matched = {name for name in matched if _INTENT_BY_NAME[name][0]}
+    if not matched:
+        return None
+    return min(matched, key=_INTENT_PRIORITY.__getitem__)
+
+
+def fallback_reply(message):
+    intent = match_intent(message, local_only=False)
+    return _INTENT_BY_NAME[intent][1]() if intent else DEFAULT_REPLY
+
+
+# ---------------------------------------------------------------------------
+# Answer cache
+# ---------------------------------------------------------------------------
+
+class AnswerCache:
+    """LRU of LLM replies keyed by normalized question; entries expire by TTL or catalog version."""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (catalog_version, stored_at, reply)
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version or time.monotonic() - entry[1] >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key, version, reply):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AnswerStats:
+    def __init__(self):
+        self.router_hits = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.upstream_calls = 0
+        self.upstream_latency_ms = 0.0
+        self._lock = threading.Lock()
+
+    def bump(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def record_upstream(self, latency_ms):
+        with self._lock:
+            self.upstream_calls += 1
+            self.upstream_latency_ms += latency_ms
+
+    def to_dict(self):
+        with self._lock:
+            answered = self.router_hits + self.cache_hits
+            total = answered + self.cache_misses
+            avg_upstream = self.upstream_latency_ms / self.upstream_calls if self.upstream_calls else 0.0
+            return {
+                'router_hits': self.router_hits,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'local_answer_rate': round(answered / total, 3) if total else 0.0,
+                'upstream_calls': self.upstream_calls,
+                'avg_upstream_latency_ms': round(avg_upstream, 2),
+                # Each local answer skips one upstream round trip of average length.
+                'estimated_saved_ms': round(answered * avg_upstream, 2),
+            }
+
+
+_cache = AnswerCache(Config.SUPPORT_ANSWER_CACHE_SIZE, Config.SUPPORT_ANSWER_CACHE_TTL_SECONDS)
+_stats = AnswerStats()
+
+
+def _is_standalone(message, history):
+    # Follow-up questions depend on the conversation, so only first questions are cached.
+    return not any(
+        m.get('role') == 'user' and (m.get('text') or '').strip() != message for m in history[-8:]
+    )
+
+
+def _cache_key(message, context_mode):
+    # Replies are grounded in the catalog context, so each context mode caches separately.
+    key = question_key(message)
+    return f"{context_mode}:{key}" if key else None
+
+
+def answer_locally(message, history, context_mode):
+    """
+    (reply, source) when the question can be answered without Groq, where
+    source is 'router' or 'cache'; (None, None) otherwise or when
+    SUPPORT_LOCAL_ANSWERS is off.
+    """
+    if not Config.SUPPORT_LOCAL_ANSWERS:
+        return None, None
+    intent = match_intent(message)
+    if intent:
+        _stats.bump('router_hits')
+        return _INTENT_BY_NAME[intent][1](), 'router'
+
+    key = _cache_key(message, context_mode)
+    if key and _is_standalone(message, history):
+        reply = _cache.get(key, get_catalog_version())
+        if reply is not None:
+            _stats.bump('cache_hits')
+            return reply, 'cache'
+    _stats.bump('cache_misses')
+    return None, None
+
+
+def remember_answer(message, history, context_mode, reply, upstream_ms):
+    """Record an upstream answer and cache it for later repeats of the same question."""
+    _stats.record_upstream(upstream_ms)
+    if not Config.SUPPORT_LOCAL_ANSWERS:
+        return
+    key = _cache_key(message, context_mode)
+    if key and reply and _is_standalone(message, history):
+        _cache.put(key, get_catalog_version(), reply)
+
+
+def answer_report():
+    report = _stats.to_dict()
+    report['cache_entries'] = len(_cache)
+    return report
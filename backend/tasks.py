@@ -0,0 +1,28 @@
+"""
+Background job handlers for Smart Medicine Delivery Network
+Slow third-party side effects run here instead of on request threads.
+"""
+
+import time
+
+from db import get_connection
+from helpers import send_otp_twilio
+from jobs import job
+
+
+@job('send_otp_sms')
+def send_otp_sms(user_id):
+    # The code is read at send time, so it never sits in the jobs table and a
+    # retry that runs after expiry (or after a newer code) sends nothing stale.
+    conn = get_connection(readonly=True)
+    try:
+        user = conn.execute(
+            "SELECT phone_number, otp_code, otp_expires_at FROM users WHERE id = ?", (user_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if not user or not user['otp_code'] or (user['otp_expires_at'] or 0) <= time.time():
+        return
+    # send_otp_twilio reports failure by returning False; raise so the job is retried.
+    if not send_otp_twilio(user['phone_number'], user['otp_code']):
+        raise RuntimeError(f"OTP delivery to user {user_id} failed")
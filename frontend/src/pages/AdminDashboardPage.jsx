@@ -34,10 +34,16 @@ export const AdminDashboardPage = () => {
     setLoading(true);
     setError('');
     try {
-      const response = await adminAPI.getStoreDashboard({
-        medical_name: profile.medical_name,
-        location: profile.address || 'Unknown',
-      });
+      const params = { medical_name: profile.medical_name };
+      let response;
+      try {
+        response = await adminAPI.getStoreDashboard(params);
+      } catch (err) {
+        if (err?.response?.status !== 404) throw err;
+        // First visit for this store: register it explicitly, then load the read-only dashboard.
+        await adminAPI.createPharmacy({ ...params, location: profile.address || 'Unknown' });
+        response = await adminAPI.getStoreDashboard(params);
+      }
       setDashboard(response.data);
     } catch (_err) {
       setError('Failed to load admin dashboard.');
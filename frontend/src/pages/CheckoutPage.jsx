@@ -1,26 +1,13 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { useLocation, useNavigate, Link } from 'react-router-dom';
 import { Header, Footer, Button, Card, AlertBox } from '../components/common';
-import { orderAPI, pharmacyAPI } from '../services/api';
+import { orderAPI } from '../services/api';
 import { clearCart, getCartItems } from '../utils/cart';
 import { getLineDiscountAmount, getLineTotal } from '../utils/pricing';
 
 const DISTANCE_SURCHARGE_THRESHOLD_KM = 2.5;
 const DISTANCE_SURCHARGE_AMOUNT = 30;
 
-const calculateDistanceKm = (lat1, lng1, lat2, lng2) => {
-  const R = 6371;
-  const dLat = ((lat2 - lat1) * Math.PI) / 180;
-  const dLng = ((lng2 - lng1) * Math.PI) / 180;
-  const a =
-    Math.sin(dLat / 2) ** 2 +
-    Math.cos((lat1 * Math.PI) / 180) *
-      Math.cos((lat2 * Math.PI) / 180) *
-      Math.sin(dLng / 2) ** 2;
-  const c = 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1 - a));
-  return Math.round(R * c * 100) / 100;
-};
-
 export const CheckoutPage = () => {
   const navigate = useNavigate();
   const location = useLocation();
@@ -30,9 +17,7 @@ export const CheckoutPage = () => {
   const [sharingLocation, setSharingLocation] = useState(false);
   const [locationStatus, setLocationStatus] = useState('');
   const [customerLocation, setCustomerLocation] = useState(null);
-  const [pharmacyCoords, setPharmacyCoords] = useState(null);
-  const [distanceKm, setDistanceKm] = useState(null);
-  const [distanceSurcharge, setDistanceSurcharge] = useState(0);
+  const [quote, setQuote] = useState(null);
   const [formData, setFormData] = useState({
     address: '',
     phone: '',
@@ -42,9 +27,16 @@ export const CheckoutPage = () => {
   const deliveryType = location.state?.deliveryType || 'standard';
   const cartItems = useMemo(() => getCartItems(), []);
   const primaryPharmacyId = cartItems[0]?.pharmacy_id;
-  const subtotal = cartItems.reduce((sum, item) => sum + getLineTotal(item.price, item.quantity), 0);
-  const quantityDiscount = cartItems.reduce((sum, item) => sum + getLineDiscountAmount(item.price, item.quantity), 0);
-  const deliveryCharge = deliveryType === 'express' ? 30 : 0;
+  // Server quote is authoritative; local pricing only fills the gap until it arrives.
+  const subtotal = quote
+    ? quote.subtotal_amount
+    : cartItems.reduce((sum, item) => sum + getLineTotal(item.price, item.quantity), 0);
+  const quantityDiscount = quote
+    ? quote.quantity_discount_amount
+    : cartItems.reduce((sum, item) => sum + getLineDiscountAmount(item.price, item.quantity), 0);
+  const deliveryCharge = quote ? quote.express_fee : deliveryType === 'express' ? 30 : 0;
+  const distanceKm = quote && customerLocation ? quote.distance_km : null;
+  const distanceSurcharge = quote ? quote.distance_surcharge : 0;
   const tax = Math.round(subtotal * 0.05);
   const total = subtotal + deliveryCharge + tax + distanceSurcharge;
 
@@ -61,44 +53,37 @@ export const CheckoutPage = () => {
       return;
     }
     let isMounted = true;
-    const fetchPharmacyCoords = async () => {
+    const fetchQuote = async () => {
       try {
-        const response = await pharmacyAPI.getPharmacy(primaryPharmacyId);
-        const pharmacy = response?.data?.pharmacy;
-        if (!isMounted || !pharmacy) {
+        const response = await orderAPI.quote({
+          pharmacy_id: primaryPharmacyId,
+          is_express: deliveryType === 'express',
+          customer_lat: customerLocation?.lat ?? null,
+          customer_lng: customerLocation?.lng ?? null,
+          items: cartItems.map((item) => ({
+            medicine_id: item.id,
+            quantity: item.quantity,
+          })),
+        });
+        const nextQuote = response?.data?.quote;
+        if (!isMounted || !nextQuote) {
           return;
         }
-        setPharmacyCoords({
-          lat: Number(pharmacy.lat),
-          lng: Number(pharmacy.lng),
-        });
+        setQuote(nextQuote);
+        if (!nextQuote.can_checkout) {
+          setError('Some items are out of stock at this medical. Please update your cart.');
+        }
       } catch (_err) {
         if (isMounted) {
-          setPharmacyCoords(null);
+          setQuote(null);
         }
       }
     };
-    fetchPharmacyCoords();
+    fetchQuote();
     return () => {
       isMounted = false;
     };
-  }, [primaryPharmacyId]);
-
-  useEffect(() => {
-    if (!customerLocation || !pharmacyCoords) {
-      setDistanceKm(null);
-      setDistanceSurcharge(0);
-      return;
-    }
-    const nextDistance = calculateDistanceKm(
-      customerLocation.lat,
-      customerLocation.lng,
-      pharmacyCoords.lat,
-      pharmacyCoords.lng
-    );
-    setDistanceKm(nextDistance);
-    setDistanceSurcharge(nextDistance > DISTANCE_SURCHARGE_THRESHOLD_KM ? DISTANCE_SURCHARGE_AMOUNT : 0);
-  }, [customerLocation, pharmacyCoords]);
+  }, [primaryPharmacyId, cartItems, customerLocation, deliveryType]);
 
   const handleInputChange = (e) => {
     const { name, value } = e.target;
@@ -164,7 +149,6 @@ export const CheckoutPage = () => {
     setError('');
     try {
       const payload = {
-        user_id: 1,
         pharmacy_id: cartItems[0].pharmacy_id,
         is_express: deliveryType === 'express',
         delivery_address: formData.address.trim(),
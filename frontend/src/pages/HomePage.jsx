@@ -2,6 +2,7 @@ import React, { useEffect, useMemo, useRef, useState } from 'react';
 import { Header, Footer, Button, AlertBox, LoadingSpinner, MedicineImage } from '../components/common';
 import { pharmacyAPI, medicineAPI, supportAPI } from '../services/api';
 import { addToCart } from '../utils/cart';
+import { loadSnapshotMedicines } from '../utils/catalogSnapshot';
 import {
   ArrowRight,
   HelpCircle,
@@ -254,15 +255,21 @@ export const HomePage = () => {
     requestCurrentLocation();
   }, []);
 
+  // Popular items plus the tile categories come from the static snapshot; the live search API is the fallback.
+  const loadHomeMedicines = () =>
+    loadSnapshotMedicines({ categories: Object.values(categoryAliases).flat() }).catch(() =>
+      medicineAPI.search('').then((res) => res?.data?.results || [])
+    );
+
   const fetchDashboardData = async (lat, lng) => {
     setLoading(true);
     try {
-      const [pharmacyRes, medicineRes] = await Promise.all([
+      const [pharmacyRes, medicineItems] = await Promise.all([
         pharmacyAPI.nearby(lat, lng),
-        medicineAPI.search(''),
+        loadHomeMedicines(),
       ]);
       setPharmacies(pharmacyRes?.data?.pharmacies || []);
-      setMedicines(medicineRes?.data?.results || []);
+      setMedicines(medicineItems);
     } catch (_err) {
       setError('Failed to load marketplace data. Please refresh.');
     } finally {
@@ -393,17 +400,29 @@ export const HomePage = () => {
     setAiMessages(nextMessages);
     setAiInput('');
     setAiTyping(true);
-    try {
-      const response = await supportAPI.chat({
-        message: userQuestion,
-        history: nextMessages.slice(-8),
+    let streamed = '';
+    const showStreamed = (text) =>
+      setAiMessages((prev) => {
+        const last = prev[prev.length - 1];
+        if (last?.role === 'ai' && last.streaming) {
+          return [...prev.slice(0, -1), { ...last, text }];
+        }
+        return [...prev, { role: 'ai', text, streaming: true }];
       });
-      const reply = response?.data?.reply?.trim() || generateAiReply(userQuestion);
-      setAiMessages((prev) => [...prev, { role: 'ai', text: reply }]);
+    try {
+      await supportAPI.chatStream(
+        { message: userQuestion, history: nextMessages.slice(-8) },
+        (token) => {
+          streamed += token;
+          setAiTyping(false);
+          showStreamed(streamed);
+        }
+      );
+      if (!streamed.trim()) showStreamed(generateAiReply(userQuestion));
     } catch (_err) {
-      const fallback = generateAiReply(userQuestion);
-      setAiMessages((prev) => [...prev, { role: 'ai', text: fallback }]);
+      showStreamed(streamed.trim() ? streamed : generateAiReply(userQuestion));
     } finally {
+      setAiMessages((prev) => prev.map((m) => (m.streaming ? { role: m.role, text: m.text } : m)));
       setAiTyping(false);
     }
   };
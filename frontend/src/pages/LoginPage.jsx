@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { Header, Footer, Button, AlertBox } from '../components/common';
-import { authAPI } from '../services/api';
+import { authAPI, saveSessionTokens } from '../services/api';
 import { useNavigate } from 'react-router-dom';
 import { ShieldCheck, BadgeCheck } from 'lucide-react';
 
@@ -58,6 +58,7 @@ export const LoginPage = () => {
       localStorage.setItem('userRole', 'customer');
       localStorage.setItem('userEmail', response?.data?.email || customerEmail.trim().toLowerCase());
       localStorage.setItem('userName', response?.data?.full_name || 'Customer');
+      saveSessionTokens(response?.data);
       navigate('/home');
     } catch (err) {
       setError(err?.response?.data?.message || 'Login failed. Please check credentials.');
@@ -93,6 +94,7 @@ export const LoginPage = () => {
       localStorage.setItem('userRole', 'customer');
       localStorage.setItem('userEmail', response?.data?.email || customerEmail.trim().toLowerCase());
       localStorage.setItem('userName', response?.data?.full_name || customerName.trim());
+      saveSessionTokens(response?.data);
       navigate('/home');
     } catch (err) {
       setError(err?.response?.data?.message || 'Signup failed. Please try again.');
@@ -1,6 +1,7 @@
 import React from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import { Header, Footer, Button, Card, AlertBox } from '../components/common';
+import { authAPI, clearSessionTokens } from '../services/api';
 
 const readProfileState = () => {
   const role = localStorage.getItem('userRole') || 'customer';
@@ -27,6 +28,8 @@ export const ProfilePage = () => {
   const profile = readProfileState();
 
   const handleLogout = () => {
+    authAPI.logout().catch(() => {});
+    clearSessionTokens();
     localStorage.removeItem('userRole');
     localStorage.removeItem('userEmail');
     localStorage.removeItem('userName');
@@ -1,6 +1,7 @@
 import React, { useState, useMemo, useEffect } from 'react';
 import { Header, Footer, Button, MedicineCard, LoadingSpinner, AlertBox, Card } from '../components/common';
 import { medicineAPI } from '../services/api';
+import { loadSnapshotMedicines } from '../utils/catalogSnapshot';
 import { Search, SlidersHorizontal, ArrowUpDown } from 'lucide-react';
 import { useSearchParams } from 'react-router-dom';
 import { addToCart } from '../utils/cart';
@@ -24,6 +25,15 @@ export const SearchPage = () => {
     setError('');
     setMessage('');
     try {
+      if (!pharmacyId) {
+        // The whole catalog is in the static snapshot; fall through to the API only if it is unavailable.
+        const items = await loadSnapshotMedicines({ popular: false, categories: 'all' }).catch(() => null);
+        if (items) {
+          setResults(items.sort((a, b) => (a.name || '').localeCompare(b.name || '')));
+          return;
+        }
+      }
+
       let response = await medicineAPI.search('', pharmacyId);
       let items = response.data.results || [];
 
@@ -29,16 +29,68 @@ const api = axios.create({
   },
 });
 
+const ACCESS_TOKEN_KEY = 'accessToken';
+const REFRESH_TOKEN_KEY = 'refreshToken';
+
+export const saveSessionTokens = (data) => {
+  if (data?.access_token) localStorage.setItem(ACCESS_TOKEN_KEY, data.access_token);
+  if (data?.refresh_token) localStorage.setItem(REFRESH_TOKEN_KEY, data.refresh_token);
+};
+
+export const clearSessionTokens = () => {
+  localStorage.removeItem(ACCESS_TOKEN_KEY);
+  localStorage.removeItem(REFRESH_TOKEN_KEY);
+};
+
+api.interceptors.request.use((config) => {
+  const token = localStorage.getItem(ACCESS_TOKEN_KEY);
+  if (token && !config.headers.Authorization) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
+// Access tokens are short-lived: on a 401, trade the refresh token for a new pair once and retry.
+api.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    const refreshToken = localStorage.getItem(REFRESH_TOKEN_KEY);
+    if (error.response?.status !== 401 || !refreshToken || original._retried || original.url === '/auth/refresh') {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    try {
+      const { data } = await api.post('/auth/refresh', { refresh_token: refreshToken });
+      saveSessionTokens(data);
+      original.headers.Authorization = `Bearer ${data.access_token}`;
+      return api(original);
+    } catch (_refreshError) {
+      clearSessionTokens();
+      return Promise.reject(error);
+    }
+  }
+);
+
 // Auth endpoints
 export const authAPI = {
   login: (credentials) => api.post('/auth/login', credentials),
   signup: (userData) => api.post('/auth/signup', userData),
+  // Tokens are read synchronously so callers can clear storage right after calling this.
+  logout: () =>
+    api.post(
+      '/auth/logout',
+      { refresh_token: localStorage.getItem(REFRESH_TOKEN_KEY) },
+      { headers: { Authorization: `Bearer ${localStorage.getItem(ACCESS_TOKEN_KEY)}` } }
+    ),
+  me: () => api.get('/auth/me'),
 };
 
 // Pharmacy endpoints
 export const pharmacyAPI = {
   nearby: (lat, lng) => api.get('/pharmacies/nearby', { params: { lat, lng } }),
   getPharmacy: (id) => api.get(`/pharmacies/${id}`),
+  compareCart: (payload) => api.post('/pharmacies/compare', payload),
 };
 
 // Medicine endpoints
@@ -46,10 +98,14 @@ export const medicineAPI = {
   search: (query, pharmacyId = null) =>
     api.get('/medicines/search', { params: { q: query, pharmacy: pharmacyId } }),
   getMedicine: (id) => api.get(`/medicines/${id}`),
+  changes: (since = 0, limit = 1000) => api.get('/medicines/changes', { params: { since, limit } }),
+  snapshot: () => api.get('/medicines/snapshot'),
+  snapshotFile: (url) => api.get(url),
 };
 
 // Order endpoints
 export const orderAPI = {
+  quote: (cartData) => api.post('/orders/quote', cartData),
   create: (orderData) => api.post('/orders/create', orderData),
   getOrder: (id) => api.get(`/orders/${id}`),
   createStripeIntent: (payload) => api.post('/orders/stripe/create-intent', payload),
@@ -60,6 +116,8 @@ export const orderAPI = {
 export const sellerAPI = {
   register: (sellerData) => api.post('/seller/register', sellerData),
   getDashboard: () => api.get('/seller/dashboard'),
+  getInventoryInsights: (params) => api.get('/seller/inventory/insights', { params }),
+  updateInventory: (pharmacyId, items) => api.patch('/seller/inventory', { pharmacy_id: pharmacyId, items }),
 };
 
 // Delivery endpoints
@@ -71,14 +129,52 @@ export const deliveryAPI = {
 // Admin endpoints
 export const adminAPI = {
   getAnalytics: () => api.get('/admin/analytics'),
+  getTimeseries: (params) => api.get('/admin/analytics/timeseries', { params }),
   approveSeller: (sellerId) => api.post('/admin/approve_seller', { seller_id: sellerId }),
   getStoreDashboard: (params) => api.get('/admin/store_dashboard', { params }),
+  createPharmacy: (payload) => api.post('/admin/pharmacies', payload),
   addMedicine: (payload) => api.post('/admin/add_medicine', payload),
 };
 
 // Support / AI endpoints
 export const supportAPI = {
   chat: (payload) => api.post('/support/chat', payload),
+  // Streams the reply over SSE; onToken gets each text chunk. Resolves with the final `done` event.
+  chatStream: async (payload, onToken, signal) => {
+    const response = await fetch(`${API_BASE}/support/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(payload),
+      signal,
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Chat stream failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let done = null;
+    while (true) {
+      const { value, done: finished } = await reader.read();
+      if (finished) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const event = (block.match(/^event: (.*)$/m) || [])[1] || 'message';
+        const data = (block.match(/^data: (.*)$/m) || [])[1];
+        if (data) {
+          const parsed = JSON.parse(data);
+          if (event === 'token') onToken(parsed.token);
+          if (event === 'done') done = parsed;
+        }
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+    return done;
+  },
   scheduleAdvice: (payload) => api.post('/support/schedule-advice', payload),
   walkInBooking: (payload) => api.post('/support/walkin-booking', payload),
 };
@@ -0,0 +1,34 @@
+import { medicineAPI } from '../services/api';
+
+const normalize = (value) => (value || '').toLowerCase().replace(/[^a-z0-9]/g, '');
+
+// Medicines from the static catalog snapshot: one small manifest request, then
+// content-hashed files the browser caches for good. `categories` is a list of
+// category names (matched loosely) or 'all'. Items are de-duplicated by id.
+// Throws when the manifest or any file is not the expected JSON, so callers
+// fall back to the search API instead of rendering an empty page.
+export const loadSnapshotMedicines = async ({ popular = true, categories = [] } = {}) => {
+  const { data: manifest } = await medicineAPI.snapshot();
+  if (!manifest?.ok) {
+    throw new Error('Catalog snapshot is not available');
+  }
+  const wanted = categories === 'all' ? null : new Set(categories.map(normalize));
+  const urls = [
+    ...(popular ? [manifest.popular] : []),
+    ...(manifest.categories || [])
+      .filter((category) => !wanted || wanted.has(normalize(category.name)))
+      .map((category) => category.url),
+  ];
+  const files = await Promise.all(urls.map((url) => medicineAPI.snapshotFile(url)));
+  if (files.some((file) => !Array.isArray(file?.data?.items))) {
+    throw new Error('Catalog snapshot file is missing or not JSON');
+  }
+  const seen = new Set();
+  return files
+    .flatMap((file) => file.data.items)
+    .filter((item) => {
+      if (seen.has(item.id)) return false;
+      seen.add(item.id);
+      return true;
+    });
+};